@@ -2,6 +2,8 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
 from django.contrib.auth import get_user_model
+from django.http import HttpResponseBadRequest
+from church_task_manager.pagination import paginate
 from .models import User
 
 
@@ -29,8 +31,12 @@ def profile_view(request):
 @user_passes_test(is_admin)
 @login_required
 def user_list(request):
-    """List all users for admin management"""
-    users = User.objects.all().order_by('username')
+    """List all users for admin management, a page at a time"""
+    try:
+        users = paginate(User.objects.all(), ('username',),
+                         request.GET.get('cursor') or None)
+    except ValueError:
+        return HttpResponseBadRequest('Invalid cursor')
     context = {'users': users}
     return render(request, 'accounts/user_list.html', context)
 
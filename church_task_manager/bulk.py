@@ -0,0 +1,33 @@
+"""
+Set-based updates.
+
+QuerySet.bulk_update builds a CASE WHEN per row and field, and compiling
+those takes about a millisecond per row: several seconds when a whole
+kanban column is renumbered or a schedule shifts thousands of tasks.
+update_rows sends the same values as one parameterized UPDATE run
+through executemany.
+"""
+
+from django.db import connection
+
+
+def update_rows(objs, fields):
+    """
+    Write the named fields of model instances (all of one model) by
+    primary key, without any signals; returns the number of instances
+    """
+    objs = list(objs)
+    if not objs:
+        return 0
+    meta = type(objs[0])._meta
+    quote = connection.ops.quote_name
+    fields = [meta.get_field(name) for name in fields]
+    assignments = ', '.join(f'{quote(field.column)} = %s' for field in fields)
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'UPDATE {quote(meta.db_table)} SET {assignments} '
+            f'WHERE {quote(meta.pk.column)} = %s',
+            [[field.get_db_prep_save(getattr(obj, field.attname), connection)
+              for field in fields] + [obj.pk]
+             for obj in objs])
+    return len(objs)
@@ -0,0 +1,120 @@
+"""
+Keyset (seek) pagination.
+
+A page is fetched as "the next ``limit`` rows after the last row of the
+previous page" instead of with OFFSET, so every page is a single range
+scan of the index behind the ordering and page 50 costs the same as page
+1. Rows inserted while someone is paging never shift a page or show up
+twice.
+
+The ordering must not contain nullable fields and must end with a
+unique one (usually ``id``) so that every row has a distinct key.
+Cursors are opaque, URL-safe strings holding the key of the last row.
+"""
+
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+PAGE_SIZE = 50
+
+
+class Page:
+    """
+    One page of rows. ``next_cursor`` loads the following page and is
+    None on the last one; ``cursor`` is the cursor this page was loaded
+    with (None on the first page).
+    """
+
+    def __init__(self, items, next_cursor=None, cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.cursor = cursor
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    @property
+    def is_first(self):
+        return self.cursor is None
+
+
+def _keys(ordering):
+    """(field name, descending) for each term of an order_by() ordering"""
+    keys = []
+    for term in ordering:
+        if isinstance(term, str):
+            keys.append((term.lstrip('-'), term.startswith('-')))
+        else:
+            # F('field').asc() / .desc()
+            keys.append((term.expression.name, term.descending))
+    return keys
+
+
+def encode_cursor(obj, ordering):
+    """Cursor pointing just after the given row"""
+    values = []
+    for name, _ in _keys(ordering):
+        value = getattr(obj, obj._meta.get_field(name).attname)
+        values.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+    data = json.dumps(values, separators=(',', ':')).encode()
+    return urlsafe_b64encode(data).decode().rstrip('=')
+
+
+def decode_cursor(value, model, ordering):
+    """Key values held by a cursor, raising ValueError if it is invalid"""
+    data = urlsafe_b64decode(value + '=' * (-len(value) % 4))
+    values = json.loads(data)
+    keys = _keys(ordering)
+    if (not isinstance(values, list) or len(values) != len(keys)
+            or None in values):
+        raise ValueError('Invalid cursor')
+    try:
+        return [model._meta.get_field(name).to_python(raw)
+                for (name, _), raw in zip(keys, values)]
+    except (TypeError, ValidationError):
+        raise ValueError('Invalid cursor')
+
+
+def after_key(ordering, values):
+    """Q object selecting the rows that sort after the given key"""
+    keys = _keys(ordering)
+    later = Q()
+    for position, (name, descending) in enumerate(keys):
+        equal = {key: value for (key, _), value in zip(keys, values[:position])}
+        lookup = f"{name}__{'lt' if descending else 'gt'}"
+        later |= Q(**equal, **{lookup: values[position]})
+
+    # The bound on the leading field is implied by the clauses above, but
+    # spelled out on its own it lets the database seek into the index
+    name, descending = keys[0]
+    lookup = f"{name}__{'lte' if descending else 'gte'}"
+    return Q(**{lookup: values[0]}) & later
+
+
+def seek(queryset, ordering, cursor=None):
+    """The queryset in the given ordering, starting after the cursor"""
+    queryset = queryset.order_by(*ordering)
+    if cursor:
+        values = decode_cursor(cursor, queryset.model, ordering)
+        queryset = queryset.filter(after_key(ordering, values))
+    return queryset
+
+
+def paginate(queryset, ordering, cursor=None, limit=PAGE_SIZE):
+    """
+    The page of the queryset, in the given ordering, that follows the
+    cursor (the first page when cursor is None). Raises ValueError if the
+    cursor cannot be decoded.
+    """
+    items = list(seek(queryset, ordering, cursor)[:limit + 1])
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = encode_cursor(items[-1], ordering)
+    return Page(items, next_cursor, cursor)
@@ -175,6 +175,40 @@ CORS_ALLOW_CREDENTIALS = True
 # X_FRAME_OPTIONS = 'DENY'
 
 
+# Caches
+# The default cache holds dependency graphs and schedules; rendered kanban
+# card bodies go to their own cache so they cannot evict those. Both are
+# per process: graphs and schedules are stored with a version read from the
+# database (tasks.graph.graph_version) and card bodies are keyed by the
+# task's updated_at, so a change made by another process is still seen.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'default',
+    },
+    'template_fragments': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'template-fragments',
+        'TIMEOUT': 60 * 60 * 24,
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    },
+}
+
+
+# Live kanban updates over Server-Sent Events. Needs the ASGI entry point
+# (see start.sh); under WSGI every open stream would pin a worker.
+LIVE_UPDATES = os.environ.get('LIVE_UPDATES', 'false').lower() == 'true'
+
+
+# Recurring tasks: occurrences are created this many days ahead of today
+# by the daily generate_recurring_tasks command (see tasks.recurrence)
+RECURRING_TASK_WINDOW_DAYS = 56
+
+# Tasks due within this many days get a "due soon" notification from the
+# check_overdue_tasks command (see Notification.create_due_notifications)
+DUE_SOON_DAYS = 2
+
+
 # Email Configuration (for notifications - configure for production)
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 # For production, use:
@@ -185,6 +219,11 @@ EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 # EMAIL_HOST_USER = 'your-email@example.com'
 # EMAIL_HOST_PASSWORD = 'your-password'
 
+# Notifications are emailed as one digest per user by the
+# send_notification_digests command, once the oldest one not yet emailed
+# has waited this many minutes (see notifications.digest)
+NOTIFICATION_DIGEST_WINDOW_MINUTES = 60
+
 
 # Logging Configuration
 LOGGING = {
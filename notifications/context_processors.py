@@ -1,15 +1,27 @@
 # notifications/context_processors.py
-from .models import Notification
+from django.utils.functional import SimpleLazyObject
+from .models import NotificationCounter
+
+
+def notification_counter(request):
+    """The user's NotificationCounter (None when logged out), read once per request"""
+    if not hasattr(request, '_notification_counter'):
+        user = request.user
+        request._notification_counter = (
+            NotificationCounter.for_user(user) if user.is_authenticated else None)
+    return request._notification_counter
 
 
 def notification_counts(request):
-    """Add notification counts to all templates"""
-    if request.user.is_authenticated:
-        return {
-            'unread_count': Notification.get_unread_count(request.user),
-            'overdue_count': Notification.get_overdue_count(request.user),
-        }
+    """
+    Add notification counts to all templates. They are looked up only when
+    a template shows them, so fragments without the page header pay nothing.
+    """
+    def count(field):
+        counter = notification_counter(request)
+        return getattr(counter, field) if counter else 0
+
     return {
-        'unread_count': 0,
-        'overdue_count': 0,
+        'unread_count': SimpleLazyObject(lambda: count('unread')),
+        'overdue_count': SimpleLazyObject(lambda: count('overdue')),
     }
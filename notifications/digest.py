@@ -0,0 +1,103 @@
+"""
+Email digests of notifications.
+
+Notifications are not mailed one at a time. ``send_notification_digests``
+collects each user's notifications that have not been emailed yet into
+one message, once the oldest of them has waited
+settings.NOTIFICATION_DIGEST_WINDOW_MINUTES, so a burst of activity ends
+up in a single email. All messages of a run go through one mail
+connection; users are read DIGEST_BATCH_SIZE at a time.
+
+Notification.emailed_at marks what was sent. Each recipient's
+notifications are stamped as soon as their message has gone out, so a
+send that fails part way through a run leaves only the unsent digests
+pending for the next run. Notifications already read on the site, and
+those of users without an email address, are marked without being sent.
+"""
+
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from accounts.models import User
+from .models import Notification
+
+DIGEST_BATCH_SIZE = 100
+
+
+def _digest(user, notifications):
+    count = len(notifications)
+    subject = f"{count} new notification{'s' if count != 1 else ''}"
+    body = render_to_string('notifications/email/digest.txt', {
+        'user': user,
+        'notifications': notifications,
+    })
+    return EmailMessage(subject, body, to=[user.email])
+
+
+def _due_users(cutoff, after, batch_size):
+    """Ids of the next users with a notification pending since the cutoff"""
+    return list(Notification.objects.filter(
+        emailed_at__isnull=True, created_at__lte=cutoff, user_id__gt=after,
+    ).order_by('user_id').values_list('user_id', flat=True).distinct()[:batch_size])
+
+
+def send_digests(window=None, batch_size=DIGEST_BATCH_SIZE, connection=None,
+                 dry_run=False):
+    """
+    Email a digest to every user whose oldest pending notification is
+    older than the window (a timedelta, settings.NOTIFICATION_DIGEST_WINDOW_MINUTES
+    by default). Returns a Counter of 'emails' and 'notifications' sent.
+    With dry_run=True nothing is sent or marked.
+    """
+    if window is None:
+        window = timedelta(minutes=settings.NOTIFICATION_DIGEST_WINDOW_MINUTES)
+    now = timezone.now()
+    cutoff = now - window
+    sent = Counter()
+
+    if connection is None and not dry_run:
+        connection = get_connection()
+    # One connection for the whole run; a caller's open connection is reused
+    opened = connection is not None and connection.open()
+    try:
+        last_user_id = 0
+        while user_ids := _due_users(cutoff, last_user_id, batch_size):
+            last_user_id = user_ids[-1]
+            pending = list(Notification.objects.filter(
+                user_id__in=user_ids, emailed_at__isnull=True, created_at__lte=now,
+            ).select_related('task').order_by('user_id', 'created_at', 'id'))
+            users = User.objects.filter(is_active=True).exclude(
+                email='').in_bulk(user_ids)
+
+            grouped = {}
+            skipped = []
+            for notification in pending:
+                if notification.user_id in users and not notification.is_read:
+                    grouped.setdefault(notification.user_id, []).append(notification)
+                else:
+                    skipped.append(notification.id)
+
+            if dry_run:
+                sent['emails'] += len(grouped)
+                sent['notifications'] += sum(map(len, grouped.values()))
+                continue
+            Notification.objects.filter(id__in=skipped).update(emailed_at=now)
+            for user_id, notifications in grouped.items():
+                # Raises on a failed send, unless the backend was opened
+                # with fail_silently, when it returns 0
+                if not connection.send_messages([_digest(users[user_id], notifications)]):
+                    continue
+                Notification.objects.filter(
+                    id__in=[notification.id for notification in notifications]
+                ).update(emailed_at=now)
+                sent['emails'] += 1
+                sent['notifications'] += len(notifications)
+    finally:
+        if opened:
+            connection.close()
+    return sent
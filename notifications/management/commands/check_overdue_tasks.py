@@ -1,13 +1,30 @@
 # notifications/management/commands/check_overdue_tasks.py
+import time
+
 from django.core.management.base import BaseCommand
-from notifications.models import Notification
+from notifications.models import OVERDUE_BATCH_SIZE, Notification
 
 
 class Command(BaseCommand):
-    help = 'Check for overdue tasks and create notifications'
+    help = ('Create overdue and due-soon notifications for the tasks whose due '
+            'date was reached, or came close, since the previous run')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Check every overdue task, not only those that crossed '
+                 'today since the previous run')
+        parser.add_argument(
+            '--batch-size', type=int, default=OVERDUE_BATCH_SIZE,
+            help=f'Tasks read per query (default: {OVERDUE_BATCH_SIZE})')
 
     def handle(self, *args, **options):
-        count = Notification.create_overdue_notifications()
+        started = time.perf_counter()
+        created = Notification.create_due_notifications(
+            full=options['full'], batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - started
         self.stdout.write(
-            self.style.SUCCESS(f'Created {count} overdue task notifications')
+            self.style.SUCCESS(
+                f"Created {created['overdue']} overdue and {created['due_soon']} "
+                f"due soon task notifications in {elapsed:.2f}s")
         )
@@ -0,0 +1,13 @@
+# notifications/management/commands/rebuild_notification_counters.py
+from django.core.management.base import BaseCommand
+from notifications.models import NotificationCounter
+
+
+class Command(BaseCommand):
+    help = 'Recount the per-user notification badge counters from the notifications table'
+
+    def handle(self, *args, **options):
+        count = NotificationCounter.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(f'Rebuilt {count} notification counter rows')
+        )
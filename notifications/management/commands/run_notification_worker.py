@@ -0,0 +1,27 @@
+# notifications/management/commands/run_notification_worker.py
+import time
+
+from django.core.management.base import BaseCommand
+from notifications.outbox import OUTBOX_BATCH_SIZE, drain
+
+
+class Command(BaseCommand):
+    help = ('Turn queued task events from the notification outbox into '
+            'notifications, in batches')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=OUTBOX_BATCH_SIZE,
+            help=f'Outbox rows delivered per transaction (default: {OUTBOX_BATCH_SIZE})')
+        parser.add_argument(
+            '--watch', type=float, metavar='SECONDS',
+            help='Keep running and look for new events every SECONDS')
+
+    def handle(self, *args, **options):
+        while True:
+            delivered = drain(options['batch_size'])
+            if delivered or not options['watch']:
+                self.stdout.write(self.style.SUCCESS(f'Delivered {delivered} queued events'))
+            if not options['watch']:
+                return
+            time.sleep(options['watch'])
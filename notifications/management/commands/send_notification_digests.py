@@ -0,0 +1,39 @@
+# notifications/management/commands/send_notification_digests.py
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from notifications.digest import DIGEST_BATCH_SIZE, send_digests
+
+
+class Command(BaseCommand):
+    help = ('Email each user one digest of the notifications that have been '
+            'waiting longer than the digest window')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--window', type=int, default=settings.NOTIFICATION_DIGEST_WINDOW_MINUTES,
+            metavar='MINUTES',
+            help='Minutes the oldest pending notification must have waited '
+                 f'(default: {settings.NOTIFICATION_DIGEST_WINDOW_MINUTES})')
+        parser.add_argument(
+            '--batch-size', type=int, default=DIGEST_BATCH_SIZE,
+            help=f'Users per batch of messages (default: {DIGEST_BATCH_SIZE})')
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Show how many digests would be sent without sending them')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        sent = send_digests(
+            window=timedelta(minutes=options['window']),
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run'])
+        elapsed = time.perf_counter() - started
+        verb = 'Would send' if options['dry_run'] else 'Sent'
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{verb} {sent['emails']} digests covering "
+                f"{sent['notifications']} notifications in {elapsed:.2f}s")
+        )
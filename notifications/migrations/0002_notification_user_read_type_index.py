@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notifications", "0001_initial"),
+        ("tasks", "0005_task_board_dates_index"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                fields=["user", "is_read", "type"], name="notif_user_read_type_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:06
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notifications", "0003_archived_notification"),
+        ("tasks", "0010_archived_task"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                fields=["user", "created_at", "id"], name="notif_user_created_idx"
+            ),
+        ),
+    ]
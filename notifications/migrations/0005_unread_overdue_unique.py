@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:08
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef
+
+
+def mark_duplicates_read(apps, schema_editor):
+    """Keep only the newest unread overdue notification per user and task"""
+    Notification = apps.get_model("notifications", "Notification")
+
+    unread = Notification.objects.filter(type="overdue", is_read=False)
+    newer = unread.filter(
+        user=OuterRef("user"), task=OuterRef("task"), id__gt=OuterRef("id")
+    )
+    unread.filter(Exists(newer)).update(is_read=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notifications", "0004_notification_user_created_index"),
+        ("tasks", "0010_archived_task"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(mark_duplicates_read, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="notification",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("is_read", False), ("type", "overdue")),
+                fields=("user", "task"),
+                name="notif_unread_overdue_uniq",
+            ),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:11
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notifications", "0005_unread_overdue_unique"),
+        ("tasks", "0010_archived_task"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DueDateScan",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("overdue_until", models.DateField()),
+                ("due_soon_until", models.DateField()),
+                ("scanned_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "db_table": "due_date_scans",
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="notification",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("is_read", False), ("type", "due_soon")),
+                fields=("user", "task"),
+                name="notif_unread_due_soon_uniq",
+            ),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:13
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0001_initial"),
+        ("notifications", "0006_due_date_scan"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="NotificationCounter",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="notification_counter",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                ("unread", models.IntegerField(default=0)),
+                ("overdue", models.IntegerField(default=0)),
+                ("version", models.IntegerField(default=0)),
+            ],
+            options={
+                "db_table": "notification_counters",
+            },
+        ),
+    ]
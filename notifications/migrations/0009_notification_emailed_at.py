@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:16
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def mark_existing_emailed(apps, schema_editor):
+    """Don't send notifications created before digests existed"""
+    Notification = apps.get_model("notifications", "Notification")
+    Notification.objects.update(emailed_at=F("created_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notifications", "0008_notification_outbox"),
+        ("tasks", "0010_archived_task"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="notification",
+            name="emailed_at",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(mark_existing_emailed, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                condition=models.Q(("emailed_at__isnull", True)),
+                fields=["user", "created_at"],
+                name="notif_digest_pending_idx",
+            ),
+        ),
+    ]
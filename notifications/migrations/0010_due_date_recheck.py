@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notifications", "0009_notification_emailed_at"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DueDateRecheck",
+            fields=[
+                ("task_id", models.BigIntegerField(primary_key=True, serialize=False)),
+            ],
+            options={
+                "db_table": "due_date_rechecks",
+            },
+        ),
+    ]
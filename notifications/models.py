@@ -1,8 +1,41 @@
 # notifications/models.py
 from django.db import models
 from django.conf import settings
+from collections import Counter
+from datetime import timedelta
+
+from django.db.models import Count, Exists, F, OuterRef, Q
 from django.utils import timezone
-from tasks.models import Task
+from church_task_manager.pagination import paginate
+from tasks.models import ArchivedTask, Task
+
+OVERDUE_BATCH_SIZE = 2000
+
+# Open tasks that get overdue and due_soon notifications
+DUE_STATUSES = ['todo', 'in_progress']
+DUE_ORDERING = ('due_date', 'id')
+
+
+def due_scan_window(scan, today, rechecks=()):
+    """
+    Filter for the tasks a watermark run of create_due_notifications
+    checks: those due between the DueDateScan and today, or within
+    settings.DUE_SOON_DAYS of it, and the queued rechecks without an
+    unread notification of their type.
+    """
+    horizon = today + timedelta(days=settings.DUE_SOON_DAYS)
+    window = (
+        Q(due_date__gt=scan.overdue_until, due_date__lte=today) |
+        Q(due_date__gt=max(scan.due_soon_until, today), due_date__lte=horizon)
+    )
+    if rechecks:
+        def unread(type):
+            return Exists(Notification.objects.filter(
+                task=OuterRef('pk'), type=type, is_read=False))
+        window |= Q(id__in=rechecks) & (
+            Q(due_date__lte=today) & ~unread('overdue') |
+            Q(due_date__gt=today, due_date__lte=horizon) & ~unread('due_soon'))
+    return window
 
 
 class Notification(models.Model):
@@ -22,63 +55,398 @@ class Notification(models.Model):
     task = models.ForeignKey(Task, on_delete=models.CASCADE, null=True, blank=True)
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Set once the notification went out in an email digest (see notifications.digest)
+    emailed_at = models.DateTimeField(null=True, blank=True, editable=False)
     
     class Meta:
         db_table = 'notifications'
         ordering = ['-created_at']
+        indexes = [
+            # Unread and overdue badge counts
+            models.Index(fields=['user', 'is_read', 'type'],
+                         name='notif_user_read_type_idx'),
+            # Notification list pages, newest first
+            models.Index(fields=['user', 'created_at', 'id'],
+                         name='notif_user_created_idx'),
+            # Notifications still waiting for an email digest
+            models.Index(fields=['user', 'created_at'],
+                         condition=Q(emailed_at__isnull=True),
+                         name='notif_digest_pending_idx'),
+        ]
+        constraints = [
+            # At most one unread overdue notification per user and task
+            # (see create_overdue_notifications)
+            models.UniqueConstraint(
+                fields=['user', 'task'], condition=Q(type='overdue', is_read=False),
+                name='notif_unread_overdue_uniq'),
+            models.UniqueConstraint(
+                fields=['user', 'task'], condition=Q(type='due_soon', is_read=False),
+                name='notif_unread_due_soon_uniq'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.title}"
     
     @classmethod
-    def create_overdue_notifications(cls):
-        """Create notifications for overdue tasks"""
-        from django.db.models import Q
-        
-        # Find overdue tasks
+    def _due_task_notifications(cls, task, type):
+        """Unsaved overdue or due_soon notifications for a task's assignee and creator"""
+        if type == 'overdue':
+            title = f"Overdue Task: {task.title}"
+            message = f"Task '{task.title}' was due on {task.due_date} and is now overdue."
+            state = 'is overdue'
+        else:
+            title = f"Task Due Soon: {task.title}"
+            message = f"Task '{task.title}' is due on {task.due_date}."
+            state = f'is due on {task.due_date}'
+
+        notifications = []
+        # Create notification for assigned user
+        if task.assigned_to_id:
+            notifications.append(cls(
+                user_id=task.assigned_to_id, type=type, title=title,
+                message=message, task=task))
+
+        # Create notification for task creator if different from assigned user
+        if task.created_by_id != task.assigned_to_id:
+            if task.assigned_to_id:
+                assignee = task.assigned_to.get_full_name() or task.assigned_to.username
+                message = f"Task '{task.title}' assigned to {assignee} {state}."
+            else:
+                message = f"Task '{task.title}' is not assigned to anyone and {state}."
+            notifications.append(cls(
+                user_id=task.created_by_id, type=type, title=title,
+                message=message, task=task))
+        return notifications
+
+    @classmethod
+    def _notify_due_tasks(cls, tasks, type_for, batch_size):
+        """
+        Write the notifications for a task queryset, reading batch_size
+        tasks at a time in (due_date, id) order so every batch is a range
+        of tasks_due_status_idx. type_for(task) picks 'overdue' or
+        'due_soon'. Returns a Counter of notifications per type.
+        """
+        tasks = tasks.select_related('assigned_to').only(
+            'id', 'title', 'due_date', 'created_by_id', 'assigned_to__username',
+            'assigned_to__first_name', 'assigned_to__last_name',
+        )
+
+        created = Counter()
+        cursor = None
+        while True:
+            page = paginate(tasks, DUE_ORDERING, cursor, batch_size)
+            notifications = []
+            for task in page:
+                notifications += cls._due_task_notifications(task, type_for(task))
+            # A concurrent run may have notified some of these users already
+            cls.objects.bulk_create(notifications, ignore_conflicts=True)
+            NotificationCounter.refresh(
+                notification.user_id for notification in notifications)
+            created.update(notification.type for notification in notifications)
+
+            cursor = page.next_cursor
+            if not cursor:
+                return created
+
+    @classmethod
+    def create_overdue_notifications(cls, batch_size=OVERDUE_BATCH_SIZE):
+        """
+        Notify the assignee and the creator of every overdue task that has
+        no unread overdue notification yet. Tasks are selected with a
+        single anti-join and read batch_size at a time; concurrent runs are
+        kept from notifying anyone twice by notif_unread_overdue_uniq.
+        Returns the number of notifications written, counting any that a
+        concurrent run had already inserted.
+        """
+        today = timezone.now().date()
+        unread = cls.objects.filter(task=OuterRef('pk'), type='overdue', is_read=False)
         overdue_tasks = Task.objects.filter(
-            Q(due_date__lt=timezone.now().date()) | 
-            (Q(due_date=timezone.now().date()) & Q(due_date__isnull=False)),
-            status__in=['todo', 'in_progress']
+            ~Exists(unread),
+            due_date__lte=today,
+            status__in=DUE_STATUSES,
         )
-        
-        notifications = []
-        for task in overdue_tasks:
-            # Check if we already have an unread overdue notification for this task
-            existing = cls.objects.filter(task=task, type='overdue', is_read=False).exists()
-            
-            if not existing:
-                # Create notification for assigned user
-                if task.assigned_to:
-                    notifications.append(cls(
-                        user=task.assigned_to,
-                        type='overdue',
-                        title=f"Overdue Task: {task.title}",
-                        message=f"Task '{task.title}' was due on {task.due_date} and is now overdue.",
-                        task=task
-                    ))
-                
-                # Create notification for task creator if different from assigned user
-                if task.created_by != task.assigned_to:
-                    notifications.append(cls(
-                        user=task.created_by,
-                        type='overdue',
-                        title=f"Overdue Task: {task.title}",
-                        message=f"Task '{task.title}' assigned to {task.assigned_to.get_full_name() or task.assigned_to.username} is overdue.",
-                        task=task
-                    ))
-        
-        if notifications:
-            cls.objects.bulk_create(notifications)
-            return len(notifications)
-        return 0
+        created = cls._notify_due_tasks(
+            overdue_tasks, lambda task: 'overdue', batch_size)
+        return created['overdue']
+
+    @classmethod
+    def create_due_notifications(cls, full=False, batch_size=OVERDUE_BATCH_SIZE):
+        """
+        Overdue and due_soon notifications for the tasks whose due date
+        crossed today, or came within settings.DUE_SOON_DAYS of it, since
+        the previous run. DueDateScan records how far that run got, so the
+        new tasks are found with one range query on tasks_due_status_idx.
+
+        Tasks created, reopened or moved to an earlier due date behind the
+        watermark are queued in DueDateRecheck and checked here as well.
+
+        With full=True, and on the very first run, every overdue task
+        without an unread overdue notification is checked instead (see
+        create_overdue_notifications). Returns a Counter of notifications
+        created per type.
+        """
+        today = timezone.now().date()
+        horizon = today + timedelta(days=settings.DUE_SOON_DAYS)
+        scan = DueDateScan.objects.first()
+        rechecks = list(DueDateRecheck.objects.values_list('task_id', flat=True))
+
+        created = Counter()
+        if full or scan is None:
+            created['overdue'] = cls.create_overdue_notifications(batch_size)
+            unread = cls.objects.filter(
+                task=OuterRef('pk'), type='due_soon', is_read=False)
+            window = Q(due_date__gt=today, due_date__lte=horizon) & ~Exists(unread)
+        else:
+            window = due_scan_window(scan, today, rechecks)
+
+        tasks = Task.objects.filter(window, status__in=DUE_STATUSES)
+        created += cls._notify_due_tasks(
+            tasks, lambda task: 'overdue' if task.due_date <= today else 'due_soon',
+            batch_size)
+
+        if scan is None:
+            scan = DueDateScan(overdue_until=today, due_soon_until=horizon)
+        # Never move the watermark back, e.g. after DUE_SOON_DAYS shrinks
+        scan.overdue_until = max(scan.overdue_until, today)
+        scan.due_soon_until = max(scan.due_soon_until, horizon)
+        scan.save()
+        DueDateRecheck.objects.filter(task_id__in=rechecks).delete()
+        return created
     
     @classmethod
     def get_unread_count(cls, user):
         """Get count of unread notifications for a user"""
-        return cls.objects.filter(user=user, is_read=False).count()
+        return NotificationCounter.for_user(user).unread
     
     @classmethod
     def get_overdue_count(cls, user):
         """Get count of overdue task notifications for a user"""
-        return cls.objects.filter(user=user, type='overdue', is_read=False).count()
+        return NotificationCounter.for_user(user).overdue
+
+    @classmethod
+    def mark_all_read(cls, user):
+        """Mark every notification of the user as read"""
+        updated = cls.objects.filter(user=user, is_read=False).update(is_read=True)
+        if updated:
+            NotificationCounter.refresh([user.id])
+        return updated
+
+
+class NotificationCounter(models.Model):
+    """
+    Unread and unread overdue notification counts of one user, so the
+    badge on every page is one primary key lookup instead of two COUNT
+    queries.
+
+    Single notifications adjust the row through the signal handlers in
+    notifications.signals; bulk writes (create_due_notifications,
+    mark_all_read, archiving and purging tasks) recount the users they
+    touched with refresh(). Rows are created on first read.
+    ``rebuild_notification_counters`` repairs any drift.
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True,
+        related_name='notification_counter')
+    unread = models.IntegerField(default=0)
+    overdue = models.IntegerField(default=0)
+    # Bumped on every change; part of the page ETags (see tasks.etags)
+    version = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'notification_counters'
+
+    def __str__(self):
+        return f"{self.user_id}: {self.unread} unread, {self.overdue} overdue"
+
+    @staticmethod
+    def deltas_for(notification, sign=1):
+        """(unread, overdue) deltas a notification contributes"""
+        if notification.is_read:
+            return (0, 0)
+        return (sign, sign if notification.type == 'overdue' else 0)
+
+    @classmethod
+    def apply(cls, user_id, unread, overdue):
+        """
+        Adjust a user's counts with an atomic update. A user without a row
+        is left alone: the row is counted from scratch on first read.
+        """
+        if unread or overdue:
+            cls.objects.filter(user_id=user_id).update(
+                unread=F('unread') + unread,
+                overdue=F('overdue') + overdue,
+                version=F('version') + 1,
+            )
+
+    @classmethod
+    def refresh(cls, user_ids):
+        """Recount the given users from the notifications table"""
+        user_ids = set(user_ids)
+        if not user_ids:
+            return
+        counts = {
+            row['user_id']: row for row in Notification.objects.filter(
+                user_id__in=user_ids, is_read=False,
+            ).values('user_id').annotate(
+                unread=Count('id'),
+                overdue=Count('id', filter=Q(type='overdue')),
+            ).order_by()
+        }
+        for user_id in user_ids:
+            row = counts.get(user_id, {'unread': 0, 'overdue': 0})
+            updated = cls.objects.filter(user_id=user_id).update(
+                unread=row['unread'], overdue=row['overdue'],
+                version=F('version') + 1)
+            if not updated:
+                cls.objects.get_or_create(user_id=user_id, defaults={
+                    'unread': row['unread'], 'overdue': row['overdue']})
+
+    @classmethod
+    def for_user(cls, user):
+        """The user's counter row, counted on first use"""
+        counter = cls.objects.filter(user_id=user.id).first()
+        if counter is None:
+            cls.refresh([user.id])
+            counter = cls.objects.get(user_id=user.id)
+        return counter
+
+    @classmethod
+    def rebuild(cls):
+        """Recount every user that has a counter row; returns rows written"""
+        user_ids = list(cls.objects.values_list('user_id', flat=True))
+        cls.refresh(user_ids)
+        return len(user_ids)
+
+
+class NotificationOutbox(models.Model):
+    """
+    A task event waiting to be turned into a notification. queue() writes
+    these rows in the same transaction as the task change, called by the
+    signal handlers in notifications.signals and by the bulk writes that
+    skip them, and the ``run_notification_worker`` command delivers and
+    deletes them in batches (see notifications.outbox).
+    """
+    EVENT_CHOICES = [
+        ('assigned', 'Task Assigned'),
+        ('completed', 'Task Completed'),
+    ]
+
+    event = models.CharField(max_length=20, choices=EVENT_CHOICES)
+    recipient = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE,
+        related_name='+')
+    # Not a foreign key: the task may be deleted before delivery
+    task_id = models.BigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'notification_outbox'
+
+    def __str__(self):
+        return f"{self.event} task {self.task_id} for user {self.recipient_id}"
+
+    @classmethod
+    def queue(cls, changes):
+        """
+        Queue the events of saved tasks. changes holds (task, created,
+        previous_status) tuples; a new task assigned to someone other than
+        its creator notifies the assignee, and a task that became completed
+        notifies its creator. Returns the number of rows queued.
+        """
+        rows = []
+        for task, created, previous_status in changes:
+            if (created and task.assigned_to_id
+                    and task.assigned_to_id != task.created_by_id):
+                rows.append(cls(event='assigned', recipient_id=task.assigned_to_id,
+                                task_id=task.pk))
+            if (task.status == 'completed'
+                    and (created or previous_status != 'completed')
+                    and task.created_by_id != task.assigned_to_id):
+                rows.append(cls(event='completed', recipient_id=task.created_by_id,
+                                task_id=task.pk))
+        if rows:
+            cls.objects.bulk_create(rows)
+        return len(rows)
+
+
+class DueDateScan(models.Model):
+    """
+    Watermark of Notification.create_due_notifications, kept in a single
+    row: tasks due on or before overdue_until have been checked for
+    overdue notifications, and tasks due on or before due_soon_until for
+    due_soon ones.
+    """
+    overdue_until = models.DateField()
+    due_soon_until = models.DateField()
+    scanned_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'due_date_scans'
+
+    def __str__(self):
+        return f"Due dates scanned until {self.overdue_until}"
+
+
+class DueDateRecheck(models.Model):
+    """
+    A task whose due date fell behind the DueDateScan watermark because it
+    was created, reopened or moved to an earlier due date after the scan.
+    queue() writes these rows, called by the Task signal handlers and by
+    the bulk writes that skip them; the next create_due_notifications run
+    checks the tasks and deletes the rows.
+    """
+    # Not a foreign key: the task may be deleted before the next run
+    task_id = models.BigIntegerField(primary_key=True)
+
+    class Meta:
+        db_table = 'due_date_rechecks'
+
+    def __str__(self):
+        return f"Recheck due date of task {self.task_id}"
+
+    @classmethod
+    def queue(cls, changes):
+        """
+        Queue the saved tasks that became due behind the watermark. changes
+        holds (task, previous_status, previous_due_date) tuples, with None
+        for both on new tasks. Returns the number of tasks queued.
+        """
+        # The task views assign the submitted date strings before saving
+        to_date = Task._meta.get_field('due_date').to_python
+        candidates = []
+        for task, previous_status, previous_due_date in changes:
+            due_date = to_date(task.due_date)
+            if due_date and task.status in DUE_STATUSES and (
+                    previous_status not in DUE_STATUSES or previous_due_date is None
+                    or due_date < previous_due_date):
+                candidates.append((task.pk, due_date))
+        if not candidates:
+            return 0
+        scan = DueDateScan.objects.first()
+        if scan is None:
+            # Nothing was scanned yet; the first run checks every task
+            return 0
+        rows = [cls(task_id=task_id) for task_id, due_date in candidates
+                if due_date <= scan.due_soon_until]
+        cls.objects.bulk_create(rows, ignore_conflicts=True)
+        return len(rows)
+
+
+class ArchivedNotification(models.Model):
+    """Notification about a task that archive_tasks moved to the archive"""
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='archived_notifications')
+    type = models.CharField(max_length=20, choices=Notification.TYPE_CHOICES)
+    title = models.CharField(max_length=200)
+    message = models.TextField()
+    task = models.ForeignKey(ArchivedTask, on_delete=models.CASCADE, related_name='notifications')
+    is_read = models.BooleanField(default=False)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'archived_notifications'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.user.username} - {self.title}"
@@ -0,0 +1,114 @@
+"""
+Delivery of queued task events as notifications.
+
+The task signal handlers only add a NotificationOutbox row to the
+transaction that changed the task, so a request never builds
+notifications itself. ``run_notification_worker`` turns the rows into
+notifications here, OUTBOX_BATCH_SIZE rows per transaction, with one
+bulk_create per batch.
+
+Events are coalesced per user within a batch: repeated events for the
+same task count once, and a user with more than COALESCE_LIMIT events of
+one kind (say, a bulk reassignment) gets a single summary notification
+instead of one per task. Events that no longer hold when delivered (the
+task was deleted, reassigned or reopened) are dropped.
+"""
+
+from django.db import transaction
+
+from tasks.models import Task
+from .models import Notification, NotificationCounter, NotificationOutbox
+
+OUTBOX_BATCH_SIZE = 500
+
+# More events than this per user and kind are sent as one summary
+COALESCE_LIMIT = 3
+
+# Task titles listed in a summary notification
+SUMMARY_TITLES = 5
+
+
+def _still_holds(event, recipient_id, task):
+    if event == 'assigned':
+        return task.assigned_to_id == recipient_id
+    return task.status == 'completed'
+
+
+def _completed_by(task):
+    if task.assigned_to_id:
+        return task.assigned_to.get_full_name() or task.assigned_to.username
+    return "Someone"
+
+
+def _notification(recipient_id, event, task):
+    if event == 'assigned':
+        title = f"New Task Assigned: {task.title}"
+        message = f"You have been assigned a new task: {task.title}"
+    else:
+        title = f"Task Completed: {task.title}"
+        message = f"Task '{task.title}' has been completed by {_completed_by(task)}."
+    return Notification(
+        user_id=recipient_id, type=event, title=title, message=message, task=task)
+
+
+def _summary(recipient_id, event, tasks):
+    titles = ', '.join(task.title for task in tasks[:SUMMARY_TITLES])
+    if len(tasks) > SUMMARY_TITLES:
+        titles += f" and {len(tasks) - SUMMARY_TITLES} more"
+    if event == 'assigned':
+        title = f"{len(tasks)} New Tasks Assigned"
+        message = f"You have been assigned {len(tasks)} new tasks: {titles}."
+    else:
+        title = f"{len(tasks)} Tasks Completed"
+        message = f"{len(tasks)} of your tasks have been completed: {titles}."
+    return Notification(user_id=recipient_id, type=event, title=title, message=message)
+
+
+def deliver_batch(batch_size=OUTBOX_BATCH_SIZE):
+    """
+    Deliver the oldest outbox rows in one transaction. Returns the number
+    of rows taken off the outbox; 0 means it is empty.
+    """
+    with transaction.atomic():
+        rows = list(NotificationOutbox.objects.select_for_update(
+            skip_locked=True).order_by('id')[:batch_size])
+        if not rows:
+            return 0
+
+        tasks = Task.objects.select_related('assigned_to').only(
+            'id', 'title', 'status', 'assigned_to__username',
+            'assigned_to__first_name', 'assigned_to__last_name',
+        ).in_bulk({row.task_id for row in rows})
+
+        # (recipient, event) -> {task id: task}, in event order
+        groups = {}
+        for row in rows:
+            task = tasks.get(row.task_id)
+            if task is None or not _still_holds(row.event, row.recipient_id, task):
+                continue
+            groups.setdefault((row.recipient_id, row.event), {})[task.id] = task
+
+        notifications = []
+        for (recipient_id, event), grouped in groups.items():
+            grouped = list(grouped.values())
+            if len(grouped) > COALESCE_LIMIT:
+                notifications.append(_summary(recipient_id, event, grouped))
+            else:
+                notifications += [
+                    _notification(recipient_id, event, task) for task in grouped]
+
+        Notification.objects.bulk_create(notifications)
+        NotificationCounter.refresh(
+            notification.user_id for notification in notifications)
+        NotificationOutbox.objects.filter(id__in=[row.id for row in rows]).delete()
+    return len(rows)
+
+
+def drain(batch_size=OUTBOX_BATCH_SIZE):
+    """Deliver everything queued; returns the number of outbox rows processed"""
+    total = 0
+    while True:
+        delivered = deliver_batch(batch_size)
+        if not delivered:
+            return total
+        total += delivered
@@ -1,36 +1,66 @@
 # notifications/signals.py
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 from django.contrib.auth.models import User
 from django.utils import timezone
 from tasks.models import Task
-from .models import Notification
+from .models import (
+    DueDateRecheck, Notification, NotificationCounter, NotificationOutbox)
 
 
 @receiver(post_save, sender=Task)
-def task_assigned_notification(sender, instance, created, **kwargs):
-    """Create notification when a task is assigned"""
-    if created and instance.assigned_to and instance.assigned_to != instance.created_by:
-        Notification.objects.create(
-            user=instance.assigned_to,
-            type='assigned',
-            title=f"New Task Assigned: {instance.title}",
-            message=f"You have been assigned a new task: {instance.title}",
-            task=instance
-        )
+def queue_task_notifications(sender, instance, created, raw=False, **kwargs):
+    """Queue the assigned and completed notifications (see notifications.outbox)"""
+    if raw:
+        return
+    # State before this save, captured by tasks.signals.remember_task_counters
+    stored = getattr(instance, '_stored_state', None)
+    NotificationOutbox.queue(
+        [(instance, created, stored[3] if stored is not None else None)])
 
 
 @receiver(post_save, sender=Task)
-def task_completed_notification(sender, instance, **kwargs):
-    """Create notification when a task is completed"""
-    if instance.status == 'done':
-        # Notify the task creator if different from who completed it
-        if instance.created_by != instance.assigned_to:
-            completed_by = instance.assigned_to.get_full_name() or instance.assigned_to.username if instance.assigned_to else "Someone"
-            Notification.objects.create(
-                user=instance.created_by,
-                type='completed',
-                title=f"Task Completed: {instance.title}",
-                message=f"Task '{instance.title}' has been completed by {completed_by}.",
-                task=instance
-            )
+def queue_due_date_recheck(sender, instance, created, raw=False, **kwargs):
+    """Recheck a task that became due behind the scan watermark"""
+    if raw:
+        return
+    stored = getattr(instance, '_stored_state', None)
+    if stored is None:
+        DueDateRecheck.queue([(instance, None, None)])
+    else:
+        DueDateRecheck.queue([(instance, stored[3], stored[4])])
+
+
+@receiver(pre_save, sender=Notification)
+def remember_notification_state(sender, instance, raw=False, **kwargs):
+    """Keep the stored state so post_save can adjust the counters by the difference"""
+    instance._counter_state_before = None
+    if raw or instance.pk is None:
+        return
+    instance._counter_state_before = Notification.objects.filter(
+        pk=instance.pk).values('user_id', 'type', 'is_read').first()
+
+
+@receiver(post_save, sender=Notification)
+def update_notification_counter(sender, instance, created, raw=False, **kwargs):
+    """Keep the user's unread and overdue counts in step with the notification"""
+    if raw:
+        return
+    changes = [(instance.user_id, NotificationCounter.deltas_for(instance))]
+    before = getattr(instance, '_counter_state_before', None)
+    if before:
+        stored = Notification(**before)
+        changes.append((stored.user_id, NotificationCounter.deltas_for(stored, sign=-1)))
+
+    deltas = {}
+    for user_id, (unread, overdue) in changes:
+        total_unread, total_overdue = deltas.get(user_id, (0, 0))
+        deltas[user_id] = (total_unread + unread, total_overdue + overdue)
+    for user_id, (unread, overdue) in deltas.items():
+        NotificationCounter.apply(user_id, unread, overdue)
+
+
+@receiver(post_delete, sender=Notification)
+def release_notification_counter(sender, instance, **kwargs):
+    NotificationCounter.apply(
+        instance.user_id, *NotificationCounter.deltas_for(instance, sign=-1))
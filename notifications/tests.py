@@ -0,0 +1,266 @@
+from datetime import timedelta
+from smtplib import SMTPException
+
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from accounts.models import User
+from projects.models import Board, Project
+from tasks.importer import TaskImporter
+from tasks.kanban import apply_moves
+from tasks.models import RecurringTask, Task
+from tasks.recurrence import materialize
+from .digest import send_digests
+from .models import DueDateRecheck, Notification, NotificationOutbox
+
+
+class OverdueNotificationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.creator = User.objects.create_user('creator', 'creator@example.com', 'password')
+        cls.assignee = User.objects.create_user('assignee', 'assignee@example.com', 'password')
+        project = Project.objects.create(name='Outreach', created_by=cls.creator)
+        cls.board = Board.objects.create(project=project, name='Main')
+
+    def make_overdue(self, count, **fields):
+        due_date = timezone.now().date() - timedelta(days=3)
+        for index in range(count):
+            Task.objects.create(
+                board=self.board, title=f'Task {index}', due_date=due_date,
+                created_by=self.creator, **fields)
+
+    def run_check(self):
+        with CaptureQueriesContext(connection) as queries:
+            created = Notification.create_overdue_notifications(batch_size=50)
+        return created, len(queries)
+
+    def test_query_count_does_not_grow_with_overdue_tasks(self):
+        # The first run also creates both users' notification counter rows
+        self.make_overdue(5, assigned_to=self.assignee)
+        self.run_check()
+        Notification.objects.all().delete()
+        created, small = self.run_check()
+        self.assertEqual(created, 10)
+
+        # One batch of tasks: the anti-join, one insert and the counters
+        Notification.objects.all().delete()
+        self.make_overdue(45, assigned_to=self.assignee)
+        created, large = self.run_check()
+        self.assertEqual(created, 100)
+        self.assertEqual(large, small)
+
+    def test_rerun_creates_nothing_in_one_query(self):
+        self.make_overdue(5, assigned_to=self.assignee)
+        self.run_check()
+        self.assertEqual(self.run_check(), (0, 1))
+
+    def test_unassigned_task_notifies_its_creator(self):
+        self.make_overdue(1)
+        created, _ = self.run_check()
+        self.assertEqual(created, 1)
+        notification = Notification.objects.get()
+        self.assertEqual(notification.user, self.creator)
+        self.assertIn('not assigned to anyone', notification.message)
+
+
+class OutboxTests(TestCase):
+    """Bulk task writes queue the same outbox rows as the signal handlers"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.creator = User.objects.create_user(
+            'creator', 'creator@example.com', 'password', role='admin')
+        cls.assignee = User.objects.create_user('assignee', 'assignee@example.com', 'password')
+        project = Project.objects.create(name='Outreach', created_by=cls.creator)
+        cls.board = Board.objects.create(project=project, name='Main')
+
+    def queued(self):
+        return sorted(NotificationOutbox.objects.values_list('event', 'recipient_id'))
+
+    def test_saved_task(self):
+        task = Task.objects.create(board=self.board, title='Flyers',
+                                   created_by=self.creator, assigned_to=self.assignee)
+        task.status = 'completed'
+        task.save()
+        task.save()
+        self.assertEqual(self.queued(), [
+            ('assigned', self.assignee.id), ('completed', self.creator.id)])
+
+    def test_kanban_move_to_completed(self):
+        task = Task.objects.create(board=self.board, title='Flyers',
+                                   created_by=self.creator, assigned_to=self.assignee)
+        NotificationOutbox.objects.all().delete()
+        apply_moves(self.creator, [
+            {'task_id': task.id, 'status': 'completed', 'after': None}])
+        apply_moves(self.creator, [
+            {'task_id': task.id, 'status': 'completed', 'after': None}])
+        self.assertEqual(self.queued(), [('completed', self.creator.id)])
+
+    def test_import(self):
+        importer = TaskImporter(self.creator).run([
+            (2, {'title': 'Flyers', 'board': str(self.board.id),
+                 'assigned_to': 'assignee'}),
+            (3, {'title': 'Posters', 'board': str(self.board.id),
+                 'assigned_to': 'assignee', 'status': 'completed'}),
+        ])
+        self.assertEqual(importer.created, 2)
+        self.assertEqual(self.queued(), [
+            ('assigned', self.assignee.id), ('assigned', self.assignee.id),
+            ('completed', self.creator.id)])
+
+    def test_recurring_occurrences(self):
+        rule = RecurringTask.objects.create(
+            board=self.board, title='Bulletin', frequency='weekly',
+            starts_on=timezone.now().date(), assigned_to=self.assignee,
+            created_by=self.creator)
+        created = materialize(RecurringTask.objects.filter(pk=rule.pk))
+        self.assertGreater(created, 0)
+        self.assertEqual(self.queued(), [('assigned', self.assignee.id)] * created)
+
+
+class DueDateRecheckTests(TestCase):
+    """Tasks that become due behind the scan watermark are still notified"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.creator = User.objects.create_user(
+            'creator', 'creator@example.com', 'password', role='admin')
+        project = Project.objects.create(name='Outreach', created_by=cls.creator)
+        cls.board = Board.objects.create(project=project, name='Main')
+
+    def setUp(self):
+        self.today = timezone.now().date()
+        self.task = Task.objects.create(
+            board=self.board, title='Flyers', created_by=self.creator,
+            due_date=self.today + timedelta(days=30))
+        # The first run sets the watermark
+        Notification.create_due_notifications()
+
+    def move_due_date(self, days):
+        self.task.due_date = self.today + timedelta(days=days)
+        self.task.save()
+
+    def test_due_date_moved_into_the_past(self):
+        self.move_due_date(-3)
+        self.assertTrue(DueDateRecheck.objects.filter(task_id=self.task.id).exists())
+        created = Notification.create_due_notifications()
+        self.assertEqual(created['overdue'], 1)
+        self.assertFalse(DueDateRecheck.objects.exists())
+        self.assertEqual(sum(Notification.create_due_notifications().values()), 0)
+
+    def test_due_date_moved_into_the_due_soon_window(self):
+        self.move_due_date(1)
+        created = Notification.create_due_notifications()
+        self.assertEqual(created['due_soon'], 1)
+
+    def test_due_date_moved_later_is_not_queued(self):
+        self.move_due_date(-3)
+        Notification.create_due_notifications()
+        self.move_due_date(-1)
+        self.assertFalse(DueDateRecheck.objects.exists())
+
+    def test_reopened_task_is_notified_again(self):
+        self.move_due_date(-3)
+        Notification.create_due_notifications()
+        Notification.objects.update(is_read=True)
+        apply_moves(self.creator, [
+            {'task_id': self.task.id, 'status': 'completed', 'after': None}])
+        apply_moves(self.creator, [
+            {'task_id': self.task.id, 'status': 'todo', 'after': None}])
+        created = Notification.create_due_notifications()
+        self.assertEqual(created['overdue'], 1)
+
+
+class FailingBackend(EmailBackend):
+    """Delivers the first `deliver` messages, then fails like a dropped SMTP link"""
+
+    def __init__(self, deliver, **kwargs):
+        super().__init__(**kwargs)
+        self.deliver = deliver
+
+    def send_messages(self, messages):
+        if self.deliver < len(messages):
+            raise SMTPException('Connection unexpectedly closed')
+        self.deliver -= len(messages)
+        return super().send_messages(messages)
+
+
+class DigestTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [User.objects.create_user(name, f'{name}@example.com', 'password')
+                     for name in ('ann', 'ben', 'cat')]
+
+    def notify(self, user, minutes_ago=90, **fields):
+        notification = Notification.objects.create(
+            user=user, type='system', title=f'For {user.username}', message='Hello',
+            **fields)
+        Notification.objects.filter(id=notification.id).update(
+            created_at=timezone.now() - timedelta(minutes=minutes_ago))
+        return notification
+
+    def pending(self):
+        return sorted(Notification.objects.filter(emailed_at__isnull=True)
+                      .values_list('user__username', flat=True))
+
+    def test_one_digest_per_user_once_the_window_has_passed(self):
+        ann, ben, cat = self.users
+        self.notify(ann)
+        self.notify(ann)
+        self.notify(ben)
+        self.notify(cat, minutes_ago=5)
+
+        sent = send_digests(window=timedelta(minutes=60))
+        self.assertEqual(sent, {'emails': 2, 'notifications': 3})
+        self.assertEqual(sorted((message.to[0], message.subject) for message in mail.outbox), [
+            ('ann@example.com', '2 new notifications'),
+            ('ben@example.com', '1 new notification'),
+        ])
+        self.assertEqual(self.pending(), ['cat'])
+
+        self.assertEqual(send_digests(window=timedelta(minutes=60))['emails'], 0)
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_read_and_unreachable_are_stamped_without_sending(self):
+        ann, ben, _ = self.users
+        self.notify(ann, is_read=True)
+        ben.email = ''
+        ben.save()
+        self.notify(ben)
+
+        self.assertEqual(send_digests(window=timedelta(minutes=60))['emails'], 0)
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(self.pending(), [])
+
+    def test_failed_send_leaves_only_the_unsent_digests_pending(self):
+        for user in self.users:
+            self.notify(user)
+
+        with self.assertRaises(SMTPException):
+            send_digests(window=timedelta(minutes=60), connection=FailingBackend(1))
+        self.assertEqual([message.to for message in mail.outbox], [['ann@example.com']])
+        self.assertEqual(self.pending(), ['ben', 'cat'])
+
+        sent = send_digests(window=timedelta(minutes=60))
+        self.assertEqual(sent, {'emails': 2, 'notifications': 2})
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox),
+                         ['ann@example.com', 'ben@example.com', 'cat@example.com'])
+
+    def test_batches_share_one_connection(self):
+        for user in self.users:
+            self.notify(user)
+        backend = FailingBackend(3)
+        sent = send_digests(window=timedelta(minutes=60), batch_size=2, connection=backend)
+        self.assertEqual(sent['emails'], 3)
+        self.assertEqual(backend.deliver, 0)
+
+    def test_dry_run_sends_and_stamps_nothing(self):
+        self.notify(self.users[0])
+        sent = send_digests(window=timedelta(minutes=60), dry_run=True)
+        self.assertEqual(sent, {'emails': 1, 'notifications': 1})
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(self.pending(), ['ann'])
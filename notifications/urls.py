@@ -7,4 +7,5 @@ urlpatterns = [
     path('mark-read/<int:notification_id>/', views.mark_as_read, name='mark_notification_read'),
     path('mark-all-read/', views.mark_all_as_read, name='mark_all_notifications_read'),
     path('counts/', views.get_notification_counts, name='notification_counts'),
+    path('api/', views.notification_feed, name='notification_feed'),
 ]
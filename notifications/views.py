@@ -1,22 +1,28 @@
 # notifications/views.py
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse
-from .models import Notification
+from django.http import HttpResponseBadRequest, JsonResponse
+from church_task_manager.pagination import paginate
+from .models import Notification, NotificationCounter
+
+NOTIFICATION_ORDERING = ('-created_at', '-id')
 
 
 @login_required
 def notification_list(request):
-    """View to list all notifications for the current user"""
-    notifications = Notification.objects.filter(user=request.user).order_by('-created_at')
-    
+    """View to list the current user's notifications, newest first, a page at a time"""
     # Mark notifications as read when viewed
-    Notification.objects.filter(user=request.user, is_read=False).update(is_read=True)
+    Notification.mark_all_read(request.user)
+
+    try:
+        notifications = paginate(
+            Notification.objects.filter(user=request.user).select_related('task'),
+            NOTIFICATION_ORDERING, request.GET.get('cursor') or None)
+    except ValueError:
+        return HttpResponseBadRequest('Invalid cursor')
     
     context = {
         'notifications': notifications,
-        'unread_count': Notification.get_unread_count(request.user),
-        'overdue_count': Notification.get_overdue_count(request.user),
     }
     return render(request, 'notifications/notification_list.html', context)
 
@@ -36,14 +42,42 @@ def mark_as_read(request, notification_id):
 @login_required
 def mark_all_as_read(request):
     """Mark all notifications as read for the current user"""
-    Notification.objects.filter(user=request.user, is_read=False).update(is_read=True)
+    Notification.mark_all_read(request.user)
     return JsonResponse({'success': True})
 
 
 @login_required
 def get_notification_counts(request):
     """Get notification counts for the current user"""
+    counter = NotificationCounter.for_user(request.user)
+    return JsonResponse({
+        'unread_count': counter.unread,
+        'overdue_count': counter.overdue,
+    })
+
+
+@login_required
+def notification_feed(request):
+    """
+    API endpoint returning a page of the current user's notifications,
+    newest first. Takes an optional ?cursor= from the previous page.
+    """
+    try:
+        page = paginate(
+            Notification.objects.filter(user=request.user),
+            NOTIFICATION_ORDERING, request.GET.get('cursor') or None)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid cursor'}, status=400)
+
     return JsonResponse({
-        'unread_count': Notification.get_unread_count(request.user),
-        'overdue_count': Notification.get_overdue_count(request.user),
+        'results': [{
+            'id': notification.id,
+            'type': notification.type,
+            'title': notification.title,
+            'message': notification.message,
+            'task_id': notification.task_id,
+            'is_read': notification.is_read,
+            'created_at': notification.created_at.isoformat(),
+        } for notification in page],
+        'next_cursor': page.next_cursor,
     })
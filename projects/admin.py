@@ -1,12 +1,49 @@
 from django.contrib import admin
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
 from .models import Project, Board
+from .purge import delete_boards, delete_projects, remaining_tasks
+from tasks.models import TaskCounter
+
+
+class SoftDeleteAdmin(admin.ModelAdmin):
+    """
+    Deleting only marks the objects; projects.purge removes them and
+    everything under them in the background, and the deletion column
+    shows how far it got.
+    """
+    soft_delete = None
+    # Lookup from a task to the objects of this admin, see remaining_tasks
+    task_scope = None
+
+    def get_deleted_objects(self, objs, request):
+        # Listing every task that would cascade could take minutes
+        return ([str(obj) for obj in objs],
+                {self.model._meta.verbose_name_plural: len(objs)}, set(), [])
+
+    def delete_model(self, request, obj):
+        self.soft_delete(self.model.objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        self.soft_delete(queryset)
+
+    def get_queryset(self, request):
+        # Counted in the changelist query rather than once per row
+        return super().get_queryset(request).annotate(
+            remaining_tasks=remaining_tasks(self.task_scope))
+
+    def deletion(self, obj):
+        if obj.deleted_at is None:
+            return ''
+        return f'Deleting: {obj.remaining_tasks} tasks left'
+    deletion.short_description = 'Deletion'
 
 
 @admin.register(Project)
-class ProjectAdmin(admin.ModelAdmin):
+class ProjectAdmin(SoftDeleteAdmin):
     list_display = ['name', 'created_by',
-                    'created_at', 'updated_at', 'is_active']
-    list_filter = ['is_active', 'created_at', 'created_by']
+                    'created_at', 'updated_at', 'is_active', 'deletion']
+    list_filter = ['is_active', 'deleted_at', 'created_at', 'created_by']
     search_fields = ['name', 'description']
     date_hierarchy = 'created_at'
     readonly_fields = ['created_at', 'updated_at']
@@ -20,16 +57,27 @@ class ProjectAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+    soft_delete = staticmethod(delete_projects)
+    task_scope = 'board__project'
 
 
 @admin.register(Board)
-class BoardAdmin(admin.ModelAdmin):
-    list_display = ['name', 'project', 'created_at', 'task_count']
-    list_filter = ['project', 'created_at']
+class BoardAdmin(SoftDeleteAdmin):
+    list_display = ['name', 'project', 'created_at', 'task_count', 'deletion']
+    list_filter = ['project', 'deleted_at', 'created_at']
     search_fields = ['name', 'description', 'project__name']
     date_hierarchy = 'created_at'
     readonly_fields = ['created_at']
+    soft_delete = staticmethod(delete_boards)
+    task_scope = 'board'
+
+    def get_queryset(self, request):
+        totals = (TaskCounter.objects.filter(
+            scope_type='board', scope_id=OuterRef('pk')).order_by()
+            .values('scope_id').annotate(total=Sum('count')).values('total'))
+        return super().get_queryset(request).annotate(
+            task_total=Coalesce(Subquery(totals), 0))
 
     def task_count(self, obj):
-        return obj.tasks.count()
+        return obj.task_total
     task_count.short_description = 'Tasks'
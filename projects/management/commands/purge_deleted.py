@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+from projects.purge import PURGE_CHUNK_SIZE, PURGE_PAUSE, purge_deleted
+
+
+class Command(BaseCommand):
+    help = ('Remove deleted projects and boards with everything under them, '
+            'in short chunked transactions')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=PURGE_CHUNK_SIZE,
+            help=f'Rows removed per transaction (default: {PURGE_CHUNK_SIZE})')
+        parser.add_argument(
+            '--pause', type=float, default=PURGE_PAUSE,
+            help=f'Seconds to wait between chunks (default: {PURGE_PAUSE})')
+        parser.add_argument(
+            '--watch', type=int, metavar='SECONDS',
+            help='Keep running and look for new deletions every SECONDS')
+
+    def handle(self, *args, **options):
+        while True:
+            removed = purge_deleted(options['chunk_size'], options['pause'])
+            if removed or not options['watch']:
+                self.stdout.write(self.style.SUCCESS(f'Purged {removed} rows'))
+            if not options['watch']:
+                return
+            time.sleep(options['watch'])
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("projects", "0003_remove_project_team"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="board",
+            name="deleted_at",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="project",
+            name="deleted_at",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -3,6 +3,19 @@ from django.db import models
 from django.conf import settings
 
 
+class ProjectQuerySet(models.QuerySet):
+    def live(self):
+        """Projects not waiting to be purged"""
+        return self.filter(deleted_at__isnull=True)
+
+
+class BoardQuerySet(models.QuerySet):
+    def live(self):
+        """Boards not waiting to be purged, nor in a project that is"""
+        return self.filter(
+            deleted_at__isnull=True, project__deleted_at__isnull=True)
+
+
 class Project(models.Model):
     name = models.CharField(max_length=200)
     description = models.TextField(blank=True)
@@ -14,10 +27,19 @@ class Project(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
+    # Set when the project is deleted; purge_deleted removes it and its
+    # tasks in the background (see projects.purge)
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    objects = ProjectQuerySet.as_manager()
 
     class Meta:
         db_table = 'projects'
         ordering = ['-created_at']
+        indexes = [
+            # Project list pages (see church_task_manager.pagination)
+            models.Index(fields=['created_at', 'id'], name='projects_created_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -29,6 +51,9 @@ class Board(models.Model):
     name = models.CharField(max_length=200)
     description = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    objects = BoardQuerySet.as_manager()
 
     class Meta:
         db_table = 'boards'
@@ -0,0 +1,153 @@
+"""
+Soft deletion of projects and boards.
+
+Deleting a project or board only stamps ``deleted_at``, which hides it
+at once (see ProjectQuerySet.live and BoardQuerySet.live). Its tasks,
+dependencies, notifications and archived rows are then removed by
+purge_deleted() in chunks of PURGE_CHUNK_SIZE rows, each in a short
+transaction of its own, so the database is never locked for long. The
+board and project rows go last, once nothing is left under them.
+
+The purge runs in a background thread of the process that deleted the
+object, and ``purge_deleted`` (a management command) finishes anything a
+restarted process left behind.
+"""
+
+import logging
+import threading
+import time
+
+from django.db import connection, transaction
+from django.db.models import Case, Count, OuterRef, Q, Subquery, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from tasks.models import ArchivedTask, RecurringTask, Task
+from tasks.purge import purge_archived_tasks, purge_tasks
+from .models import Board, Project
+
+logger = logging.getLogger(__name__)
+
+PURGE_CHUNK_SIZE = 500
+
+# Seconds the purge sleeps between chunks so other writers get the lock
+PURGE_PAUSE = 0.05
+
+
+def delete_projects(projects):
+    """Hide the projects now and schedule their removal"""
+    ids = list(projects.values_list('id', flat=True))
+    with transaction.atomic():
+        count = Project.objects.filter(id__in=ids).update(
+            deleted_at=timezone.now(), is_active=False)
+        # Stop new occurrences from appearing on the hidden boards
+        RecurringTask.objects.filter(board__project_id__in=ids).update(
+            is_active=False)
+        transaction.on_commit(start_background_purge)
+    return count
+
+
+def delete_boards(boards):
+    """Hide the boards now and schedule their removal"""
+    ids = list(boards.values_list('id', flat=True))
+    with transaction.atomic():
+        count = Board.objects.filter(id__in=ids).update(deleted_at=timezone.now())
+        RecurringTask.objects.filter(board_id__in=ids).update(is_active=False)
+        transaction.on_commit(start_background_purge)
+    return count
+
+
+def pending_boards():
+    return Board.objects.filter(
+        Q(deleted_at__isnull=False) | Q(project__deleted_at__isnull=False))
+
+
+def remaining_tasks(scope):
+    """
+    Live and archived tasks still waiting to be purged, as an annotation
+    for a project (scope 'board__project') or board (scope 'board')
+    queryset. It is only counted for deleted rows, and is None for others.
+    """
+    def count(model):
+        rows = (model.objects.filter(**{scope: OuterRef('pk')}).order_by()
+                .values(scope).annotate(count=Count('id')).values('count'))
+        return Coalesce(Subquery(rows), 0)
+
+    return Case(When(deleted_at__isnull=False,
+                     then=count(Task) + count(ArchivedTask)))
+
+
+def purge_step(chunk_size=PURGE_CHUNK_SIZE):
+    """
+    Remove one chunk of rows under a deleted board or project, or the
+    board or project row itself once it is empty. Returns the number of
+    rows removed; 0 means there is nothing left to purge.
+
+    The rows are locked before they are checked for emptiness, so a task
+    or board added meanwhile is purged in chunks instead of going in one
+    cascading DELETE.
+    """
+    while True:
+        board_ids = list(pending_boards().values_list('id', flat=True))
+        if board_ids:
+            with transaction.atomic():
+                board_ids = list(pending_boards().select_for_update(of=('self',))
+                                 .filter(id__in=board_ids).values_list('id', flat=True))
+                ids = list(Task.objects.filter(board_id__in=board_ids)
+                           .values_list('id', flat=True)[:chunk_size])
+                if ids:
+                    return purge_tasks(ids)
+                ids = list(ArchivedTask.objects.filter(board_id__in=board_ids)
+                           .values_list('id', flat=True)[:chunk_size])
+                if ids:
+                    return purge_archived_tasks(ids)
+                RecurringTask.objects.filter(board_id__in=board_ids).delete()
+                deleted, _ = Board.objects.filter(id__in=board_ids).delete()
+                return deleted
+
+        with transaction.atomic():
+            project_ids = list(Project.objects.select_for_update()
+                               .filter(deleted_at__isnull=False).values_list('id', flat=True))
+            if not Board.objects.filter(project_id__in=project_ids).exists():
+                deleted, _ = Project.objects.filter(id__in=project_ids).delete()
+                return deleted
+        # A board was added to a deleted project since pending_boards()
+        # was read: empty it first
+
+
+def purge_deleted(chunk_size=PURGE_CHUNK_SIZE, pause=PURGE_PAUSE):
+    """Purge everything pending; returns the number of rows removed"""
+    total = 0
+    while True:
+        removed = purge_step(chunk_size)
+        if not removed:
+            return total
+        total += removed
+        time.sleep(pause)
+
+
+_purge_lock = threading.Lock()
+_purge_requested = threading.Event()
+
+
+def start_background_purge():
+    """Run purge_deleted in a daemon thread unless one is already running"""
+    _purge_requested.set()
+    if not _purge_lock.acquire(blocking=False):
+        # The running thread sees the request before it exits
+        return
+
+    def run():
+        try:
+            while _purge_requested.is_set():
+                _purge_requested.clear()
+                purge_deleted()
+        except Exception:
+            logger.exception('Purging deleted projects and boards failed')
+        finally:
+            connection.close()
+            _purge_lock.release()
+        if _purge_requested.is_set():
+            start_background_purge()
+
+    threading.Thread(target=run, name='purge-deleted', daemon=True).start()
@@ -1,3 +1,163 @@
+import json
+from base64 import urlsafe_b64encode
+from unittest import mock
+
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import User
+from church_task_manager.pagination import encode_cursor, paginate
+from tasks.models import Task
+from tasks.purge import purge_tasks
+from .models import Board, Project
+from .purge import delete_boards, delete_projects, pending_boards, purge_deleted
+from .views import PROJECT_ORDERING
+
+
+class SoftDeleteAdminTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password')
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def make_projects(self, count):
+        for index in range(count):
+            project = Project.objects.create(
+                name=f'Project {index}', created_by=self.admin)
+            board = Board.objects.create(project=project, name='Main')
+            for title in ('First', 'Second'):
+                Task.objects.create(board=board, title=title, created_by=self.admin)
+        delete_projects(Project.objects.all())
+        delete_boards(Board.objects.all())
+
+    def changelist_queries(self, model):
+        url = reverse(f'admin:projects_{model}_changelist')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertContains(response, 'Deleting: 2 tasks left')
+        return len(queries)
+
+    def test_changelists_do_not_query_per_row(self):
+        self.make_projects(2)
+        few = {model: self.changelist_queries(model) for model in ('project', 'board')}
+        self.make_projects(8)
+        many = {model: self.changelist_queries(model) for model in ('project', 'board')}
+        self.assertEqual(many, few)
+
+
+class PurgeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            'admin', 'admin@example.com', 'password', role='admin')
+        cls.project = Project.objects.create(name='Old', created_by=cls.admin)
+
+    def purge(self, pending=pending_boards):
+        with mock.patch('projects.purge.pending_boards', pending), \
+                mock.patch('projects.purge.purge_tasks', wraps=purge_tasks) as chunks:
+            purge_deleted(chunk_size=2, pause=0)
+        self.assertFalse(Project.objects.exists())
+        self.assertFalse(Board.objects.exists())
+        self.assertFalse(Task.objects.exists())
+        return [call.args[0] for call in chunks.call_args_list]
+
+    def test_tasks_go_in_chunks_before_the_project(self):
+        board = Board.objects.create(project=self.project, name='Main')
+        tasks = [Task.objects.create(board=board, title=f'Task {index}', created_by=self.admin)
+                 for index in range(5)]
+        delete_projects(Project.objects.filter(id=self.project.id))
+        chunks = self.purge()
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 2, 1])
+        self.assertEqual(sorted(sum(chunks, [])), [task.id for task in tasks])
+
+    def test_board_added_to_a_deleted_project_is_purged_in_chunks(self):
+        delete_projects(Project.objects.filter(id=self.project.id))
+        added = []
+
+        def added_after_the_read():
+            if added:
+                return pending_boards()
+            # Another process adds a board and a task right after the read
+            board = Board.objects.create(project=self.project, name='Late')
+            added.append(Task.objects.create(board=board, title='Late', created_by=self.admin))
+            return Board.objects.none()
+
+        self.assertEqual(self.purge(added_after_the_read), [[added[0].id]])
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            'admin', 'admin@example.com', 'password', role='admin')
+        # One timestamp for all, so only the id tie-break orders them
+        created_at = timezone.now()
+        cls.projects = [Project.objects.create(name=f'Project {index % 3}',
+                                               created_by=cls.admin)
+                        for index in range(7)]
+        Project.objects.update(created_at=created_at)
+
+    def all_pages(self, ordering, limit, queryset=None):
+        queryset = Project.objects.all() if queryset is None else queryset
+        pages, cursor = [], None
+        while True:
+            page = paginate(queryset, ordering, cursor, limit)
+            pages.append([project.id for project in page])
+            cursor = page.next_cursor
+            if cursor is None:
+                return pages
+
+    def test_pages_cover_equal_keys_exactly_once(self):
+        pages = self.all_pages(PROJECT_ORDERING, 3)
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+        self.assertEqual(sum(pages, []),
+                         sorted((project.id for project in self.projects), reverse=True))
+
+    def test_mixed_directions(self):
+        pages = self.all_pages(('name', '-id'), 2)
+        expected = sorted(self.projects, key=lambda project: (project.name, -project.id))
+        self.assertEqual(sum(pages, []), [project.id for project in expected])
+
+    def test_full_last_page_has_no_cursor(self):
+        page = paginate(Project.objects.all(), PROJECT_ORDERING, limit=7)
+        self.assertEqual(len(page), 7)
+        self.assertIsNone(page.next_cursor)
+        self.assertTrue(page.is_first)
+
+    def test_rows_added_while_paging_do_not_shift_pages(self):
+        first = paginate(Project.objects.all(), PROJECT_ORDERING, limit=3)
+        Project.objects.create(name='Newest', created_by=self.admin)
+        second = paginate(Project.objects.all(), PROJECT_ORDERING, first.next_cursor, 3)
+        seen = [project.id for project in first] + [project.id for project in second]
+        self.assertEqual(len(set(seen)), 6)
+        self.assertFalse(second.is_first)
+
+    def test_tampered_cursors_are_rejected(self):
+        def encode(value):
+            return urlsafe_b64encode(value).decode().rstrip('=')
 
-# Create your tests here.
+        valid = encode_cursor(self.projects[0], PROJECT_ORDERING)
+        url = reverse('project_list')
+        self.client.force_login(self.admin)
+        self.assertEqual(self.client.get(url, {'cursor': valid}).status_code, 200)
+        for cursor in [
+            'not base64!',
+            valid[:-3],
+            encode(b'\xff\xfe'),
+            encode(b'{"created_at": 1}'),
+            encode(json.dumps([self.projects[0].id]).encode()),
+            encode(json.dumps([None, 1]).encode()),
+            encode(json.dumps(['yesterday', 1]).encode()),
+            encode(json.dumps(['2026-01-01T00:00:00+00:00', 'x']).encode()),
+            encode(json.dumps(['2026-01-01T00:00:00+00:00', [1]]).encode()),
+        ]:
+            with self.subTest(cursor=cursor):
+                with self.assertRaises(ValueError):
+                    paginate(Project.objects.all(), PROJECT_ORDERING, cursor)
+                self.assertEqual(self.client.get(url, {'cursor': cursor}).status_code, 400)
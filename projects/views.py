@@ -3,28 +3,38 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.db.models import Q
 from django.db import OperationalError
+from django.http import HttpResponseBadRequest
+from church_task_manager.pagination import Page, paginate
 from .models import Project, Board
-from tasks.models import Task
+from .purge import delete_projects
+from tasks.models import Task, TaskCounter
+
+PROJECT_ORDERING = ('-created_at', '-id')
 
 
 @login_required
 def project_list(request):
-    """List all projects"""
+    """List all projects, a page at a time"""
     try:
         if request.user.is_admin():
-            projects = Project.objects.filter(is_active=True)
+            projects = Project.objects.live().filter(is_active=True)
         else:
             # Team members see projects they created or have tasks in
-            projects = Project.objects.filter(
+            projects = Project.objects.live().filter(
                 is_active=True
             ).filter(
                 Q(created_by=request.user) |
                 Q(boards__tasks__assigned_to=request.user)
             ).distinct()
+        projects = paginate(
+            projects.select_related('created_by'), PROJECT_ORDERING,
+            request.GET.get('cursor') or None)
+    except ValueError:
+        return HttpResponseBadRequest('Invalid cursor')
     except OperationalError as e:
         if "no such column" in str(e) or "no such table" in str(e):
             messages.error(request, 'Database schema not updated. Please run migrations first.')
-            projects = Project.objects.none()
+            projects = Page([])
         else:
             raise e
 
@@ -35,8 +45,13 @@ def project_list(request):
 @login_required
 def project_detail(request, project_id):
     """Project detail with boards"""
-    project = get_object_or_404(Project, id=project_id)
-    boards = project.boards.all()
+    project = get_object_or_404(Project.objects.live(), id=project_id)
+    boards = list(project.boards.filter(deleted_at__isnull=True))
+
+    board_totals = TaskCounter.status_totals_by_scope(
+        'board', [board.id for board in boards])
+    for board in boards:
+        board.task_count = sum(board_totals.get(board.id, {}).values())
 
     context = {
         'project': project,
@@ -111,7 +126,7 @@ def project_edit(request, project_id):
         messages.error(request, 'Only admins can edit projects')
         return redirect('project_list')
 
-    project = get_object_or_404(Project, id=project_id)
+    project = get_object_or_404(Project.objects.live(), id=project_id)
 
     if request.method == 'POST':
         project.name = request.POST.get('name')
@@ -132,11 +147,11 @@ def project_delete(request, project_id):
         messages.error(request, 'Only admins can delete projects')
         return redirect('project_list')
 
-    project = get_object_or_404(Project, id=project_id)
+    project = get_object_or_404(Project.objects.live(), id=project_id)
 
     if request.method == 'POST':
-        project.is_active = False
-        project.save()
+        # Hidden at once; its boards and tasks are removed in the background
+        delete_projects(Project.objects.filter(id=project.id))
         messages.success(
             request, f'Project "{project.name}" deleted successfully!')
         return redirect('project_list')
@@ -1,64 +1,125 @@
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
-from django.http import HttpResponse
+from django.http import HttpResponse, HttpResponseBadRequest
 from django.db.models import Count, Q
-from tasks.models import Task
+from church_task_manager.pagination import paginate
+from tasks.models import ArchivedTask, Task, TaskCounter
 from projects.models import Project
 from django.contrib.auth import get_user_model
+from collections import Counter
+from itertools import chain, islice
 import csv
 from datetime import datetime
 
 User = get_user_model()
 
+# Most overdue first; served by tasks_due_status_idx
+OVERDUE_ORDERING = ('due_date', 'id')
+
+
+def report_filters(request):
+    """Filter parameters shared by the report page and its exports"""
+    return {
+        'start_date': request.GET.get('start_date'),
+        'end_date': request.GET.get('end_date'),
+        'project_id': request.GET.get('project'),
+        'user_id': request.GET.get('user'),
+        'status': request.GET.get('status'),
+    }
+
+
+def _filter_tasks(tasks, user, filters):
+    if not user.is_admin():
+        tasks = tasks.filter(assigned_to=user)
+    if filters['start_date']:
+        tasks = tasks.filter(created_at__gte=filters['start_date'])
+    if filters['end_date']:
+        tasks = tasks.filter(created_at__lte=filters['end_date'])
+    if filters['project_id']:
+        tasks = tasks.filter(board__project_id=filters['project_id'])
+    if filters['user_id']:
+        tasks = tasks.filter(assigned_to_id=filters['user_id'])
+    if filters['status']:
+        tasks = tasks.filter(status=filters['status'])
+    return tasks
+
+
+def report_sources(user, filters):
+    """
+    Querysets of the tasks matching the filters: the live tasks first,
+    then the archived ones (see tasks.archive) when a date filter asks
+    for history.
+    """
+    sources = [_filter_tasks(Task.objects.all(), user, filters)]
+    if filters['start_date'] or filters['end_date']:
+        sources.append(_filter_tasks(ArchivedTask.objects.all(), user, filters))
+    return sources
+
+
+def _count_by(querysets, field, **extra):
+    """Task counts per value of a field, summed over several querysets"""
+    totals = Counter()
+    for tasks in querysets:
+        totals.update(dict(
+            tasks.values_list(field).annotate(total=Count('id', **extra)).order_by()))
+    return totals
+
 
 @login_required
 def report_view(request):
     """Reporting view with filters"""
-    # Get filter parameters
-    start_date = request.GET.get('start_date')
-    end_date = request.GET.get('end_date')
-    project_id = request.GET.get('project')
-    user_id = request.GET.get('user')
-    status = request.GET.get('status')
-
-    # Base queryset
-    if request.user.is_admin():
-        tasks = Task.objects.all()
-    else:
-        tasks = Task.objects.filter(assigned_to=request.user)
-
-    # Apply filters
-    if start_date:
-        tasks = tasks.filter(created_at__gte=start_date)
-    if end_date:
-        tasks = tasks.filter(created_at__lte=end_date)
-    if project_id:
-        tasks = tasks.filter(board__project_id=project_id)
-    if user_id:
-        tasks = tasks.filter(assigned_to_id=user_id)
-    if status:
-        tasks = tasks.filter(status=status)
+    filters = report_filters(request)
+    sources = report_sources(request.user, filters)
+    tasks = sources[0]
 
     # Generate reports
+    unfiltered = request.user.is_admin() and not any(filters.values())
+
     tasks_completed_per_user = {}
     if request.user.is_admin():
+        if unfiltered:
+            completed_by_user = {
+                scope_id: totals['completed'] for scope_id, totals
+                in TaskCounter.status_totals_by_scope('user').items()
+            }
+        else:
+            completed_by_user = _count_by(
+                [source.filter(status='completed', assigned_to__isnull=False)
+                 for source in sources], 'assigned_to_id')
         for user in User.objects.filter(is_active=True):
-            user_tasks = tasks.filter(assigned_to=user, status='completed')
             tasks_completed_per_user[user.get_full_name(
-            ) or user.username] = user_tasks.count()
+            ) or user.username] = completed_by_user.get(user.id, 0)
 
     overdue_tasks = tasks.filter(
         due_date__lt=datetime.now().date(),
         status__in=['todo', 'in_progress', 'waiting']
     )
+    try:
+        overdue_page = paginate(
+            overdue_tasks.select_related('board__project', 'assigned_to'),
+            OVERDUE_ORDERING, request.GET.get('cursor') or None)
+    except ValueError:
+        return HttpResponseBadRequest('Invalid cursor')
 
     # Project completion
     projects = Project.objects.filter(is_active=True)
+    if unfiltered:
+        project_totals = {
+            scope_id: (sum(totals.values()), totals['completed'])
+            for scope_id, totals
+            in TaskCounter.status_totals_by_scope('project').items()
+        }
+    else:
+        totals = _count_by(sources, 'board__project_id')
+        completed = _count_by(
+            sources, 'board__project_id', filter=Q(status='completed'))
+        project_totals = {
+            project_id: (total, completed[project_id])
+            for project_id, total in totals.items()
+        }
     project_completion = []
     for project in projects:
-        project_tasks = tasks.filter(board__project=project)
-        total = project_tasks.count()
-        completed = project_tasks.filter(status='completed').count()
+        total, completed = project_totals.get(project.id, (0, 0))
         percentage = (completed / total * 100) if total > 0 else 0
         project_completion.append({
             'project': project.name,
@@ -73,18 +134,14 @@ def report_view(request):
 
     context = {
         'tasks_completed_per_user': tasks_completed_per_user,
-        'overdue_tasks': overdue_tasks,
+        'overdue_tasks': overdue_page,
+        'overdue_total': overdue_tasks.count(),
         'project_completion': project_completion,
         'all_projects': all_projects,
         'all_users': all_users,
         'task_statuses': Task.STATUS_CHOICES,
-        'filters': {
-            'start_date': start_date,
-            'end_date': end_date,
-            'project_id': project_id,
-            'user_id': user_id,
-            'status': status,
-        }
+        'includes_archived': len(sources) > 1,
+        'filters': filters,
     }
 
     return render(request, 'reports/report_view.html', context)
@@ -93,29 +150,7 @@ def report_view(request):
 @login_required
 def export_report_csv(request):
     """Export report to CSV"""
-    # Get same filters as report_view
-    start_date = request.GET.get('start_date')
-    end_date = request.GET.get('end_date')
-    project_id = request.GET.get('project')
-    user_id = request.GET.get('user')
-    status = request.GET.get('status')
-
-    if request.user.is_admin():
-        tasks = Task.objects.all()
-    else:
-        tasks = Task.objects.filter(assigned_to=request.user)
-
-    # Apply filters
-    if start_date:
-        tasks = tasks.filter(created_at__gte=start_date)
-    if end_date:
-        tasks = tasks.filter(created_at__lte=end_date)
-    if project_id:
-        tasks = tasks.filter(board__project_id=project_id)
-    if user_id:
-        tasks = tasks.filter(assigned_to_id=user_id)
-    if status:
-        tasks = tasks.filter(status=status)
+    sources = report_sources(request.user, report_filters(request))
 
     response = HttpResponse(content_type='text/csv')
     response['Content-Disposition'] = 'attachment; filename="tasks_report.csv"'
@@ -124,7 +159,10 @@ def export_report_csv(request):
     writer.writerow(['Title', 'Project', 'Board', 'Assigned To', 'Status',
                     'Priority', 'Progress', 'Due Date', 'Created At', 'Created By'])
 
-    for task in tasks.select_related('board__project', 'assigned_to', 'created_by'):
+    rows = chain.from_iterable(
+        source.select_related('board__project', 'assigned_to', 'created_by')
+        for source in sources)
+    for task in rows:
         writer.writerow([
             task.title,
             task.board.project.name,
@@ -151,29 +189,7 @@ def export_report_pdf(request):
     from reportlab.lib.styles import getSampleStyleSheet
     from io import BytesIO
 
-    # Get same filters
-    start_date = request.GET.get('start_date')
-    end_date = request.GET.get('end_date')
-    project_id = request.GET.get('project')
-    user_id = request.GET.get('user')
-    status = request.GET.get('status')
-
-    if request.user.is_admin():
-        tasks = Task.objects.all()
-    else:
-        tasks = Task.objects.filter(assigned_to=request.user)
-
-    # Apply filters
-    if start_date:
-        tasks = tasks.filter(created_at__gte=start_date)
-    if end_date:
-        tasks = tasks.filter(created_at__lte=end_date)
-    if project_id:
-        tasks = tasks.filter(board__project_id=project_id)
-    if user_id:
-        tasks = tasks.filter(assigned_to_id=user_id)
-    if status:
-        tasks = tasks.filter(status=status)
+    sources = report_sources(request.user, report_filters(request))
 
     buffer = BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=landscape(letter))
@@ -189,7 +205,10 @@ def export_report_pdf(request):
              'Status', 'Priority', 'Progress', 'Due Date']]
 
     # Limit to 50 for PDF
-    for task in tasks.select_related('board__project', 'assigned_to')[:50]:
+    rows = chain.from_iterable(
+        source.select_related('board__project', 'assigned_to')[:50]
+        for source in sources)
+    for task in islice(rows, 50):
         data.append([
             task.title[:30],
             task.board.project.name[:20],
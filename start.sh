@@ -29,11 +29,23 @@ python manage.py migrate
 echo "Collecting static files..."
 python manage.py collectstatic --noinput
 
+# Besides the web server, a deployment needs these processes (render.yaml
+# sets them up on Render). With cron, times in UTC:
+#
+#   python manage.py run_notification_worker --watch 5   (always running)
+#   5 0 * * *     python manage.py check_overdue_tasks
+#   15 0 * * *    python manage.py generate_recurring_tasks
+#   */15 * * * *  python manage.py send_notification_digests
+#   30 * * * *    python manage.py purge_deleted
+
 # Start the server based on mode
 if [ "$MODE" = "prod" ]; then
-    echo "Starting production server with Gunicorn..."
-    gunicorn church_task_manager.wsgi:application --bind 0.0.0.0:8000
+    echo "Starting production server with Gunicorn (ASGI workers)..."
+    # The ASGI workers serve the live kanban event streams
+    LIVE_UPDATES=${LIVE_UPDATES:-true} gunicorn church_task_manager.asgi:application \
+        -k uvicorn_worker.UvicornWorker --bind 0.0.0.0:8000
 else
     echo "Starting development server..."
+    echo "Queued notifications are delivered by: python manage.py run_notification_worker --watch 5"
     python manage.py runserver 0.0.0.0:8000
 fi
@@ -1,31 +1,258 @@
 // Gantt Chart JavaScript
+//
+// Rows are fetched from the gantt data API one date window at a time and
+// more windows are loaded lazily as the user scrolls towards either end of
+// the timeline.
+const GANTT_WINDOW_DAYS = 90;
+const GANTT_SCROLL_MARGIN = 200; // pixels from the edge that trigger a load
+
 document.addEventListener("DOMContentLoaded", function () {
-  // Simple Gantt chart enhancements
+  const chart = document.getElementById("gantt-chart");
+  if (!chart) {
+    return;
+  }
 
-  // Add date range indicator
-  const addDateRangeIndicator = () => {
-    const today = new Date();
-    const indicators = document.querySelectorAll("[data-date-indicator]");
+  const rowsBody = document.getElementById("gantt-rows");
+  const emptyRow = document.getElementById("gantt-empty");
+  const status = document.getElementById("gantt-status");
+  const seen = new Set();
+  const today = new Date();
+  today.setHours(0, 0, 0, 0);
 
-    indicators.forEach((indicator) => {
-      const taskDate = new Date(indicator.dataset.date);
-      if (taskDate < today) {
-        indicator.classList.add("text-red-600", "font-semibold");
-      }
-    });
+  if (!chart.dataset.first) {
+    emptyRow.classList.remove("hidden");
+    return;
+  }
+
+  const first = parseDate(chart.dataset.first);
+  const last = parseDate(chart.dataset.last);
+  let anchor = today < first ? first : today > last ? last : today;
+  let loadedFrom = addDays(anchor, -30);
+  let loadedTo = addDays(loadedFrom, -1);
+  let loading = false;
+
+  const statusClasses = {
+    completed: "bg-green-100 text-green-800",
+    in_progress: "bg-yellow-100 text-yellow-800",
+    waiting: "bg-red-100 text-red-800",
+  };
+  const barClasses = {
+    completed: "bg-green-500",
+    in_progress: "bg-yellow-500",
+  };
+  const statusLabels = {
+    todo: "To Do",
+    in_progress: "In Progress",
+    waiting: "Waiting/Blocked",
+    completed: "Completed",
   };
 
-  addDateRangeIndicator();
+  function fetchWindow(from, to) {
+    const url = `${chart.dataset.url}?from=${formatDate(from)}&to=${formatDate(to)}`;
+    status.textContent = "Loading…";
+    return fetch(url, { headers: { Accept: "application/json" } })
+      .then((response) => response.json())
+      .then((data) => {
+        status.textContent = "";
+        if (data.error) {
+          throw new Error(data.error);
+        }
+        return data;
+      });
+  }
 
-  // Add tooltips for task details
-  const taskRows = document.querySelectorAll("tbody tr");
-  taskRows.forEach((row) => {
-    row.addEventListener("mouseenter", function () {
-      this.style.backgroundColor = "#f9fafb";
-    });
+  function buildRows(data) {
+    const columns = data.columns;
+    const fragment = document.createDocumentFragment();
+    for (let i = 0; i < data.count; i++) {
+      const id = columns.id[i];
+      if (seen.has(id)) {
+        continue;
+      }
+      seen.add(id);
+      fragment.appendChild(
+        buildRow({
+          title: columns.title[i],
+          board: data.boards[columns.board[i]] || "",
+          assignee:
+            columns.assignee[i] === null
+              ? "Unassigned"
+              : data.users[columns.assignee[i]],
+          start: columns.start[i],
+          due: columns.due[i],
+          status: columns.status[i],
+          progress: columns.progress[i],
+          critical: columns.critical[i],
+          slack: columns.slack[i],
+        })
+      );
+    }
+    return fragment;
+  }
+
+  function buildRow(task) {
+    const row = document.createElement("tr");
+    row.className = "hover:bg-gray-50";
+
+    const titleCell = cell(task.critical ? "border-l-4 border-l-red-500" : "");
+    const title = document.createElement("div");
+    title.className = "font-medium";
+    title.textContent = task.title;
+    if (task.critical) {
+      const badge = document.createElement("span");
+      badge.className =
+        "ml-1 px-2 py-0.5 text-xs rounded-full bg-red-100 text-red-800";
+      badge.textContent = "Critical";
+      title.appendChild(badge);
+    }
+    const board = document.createElement("div");
+    board.className = "text-xs text-gray-600";
+    board.textContent = task.board;
+    if (task.slack && !task.critical) {
+      board.textContent += ` · ${task.slack} day${task.slack === 1 ? "" : "s"} slack`;
+    }
+    titleCell.append(title, board);
+
+    const assigneeCell = cell("text-sm");
+    assigneeCell.textContent = task.assignee;
+
+    const progressBar = document.createElement("div");
+    progressBar.className = "relative h-8 bg-gray-200 rounded";
+    progressBar.innerHTML =
+      `<div class="absolute h-full rounded ${barClasses[task.status] || "bg-blue-500"}"` +
+      ` style="left: 0%; width: ${Number(task.progress)}%;"></div>` +
+      `<span class="absolute inset-0 flex items-center justify-center text-xs font-medium">${Number(task.progress)}%</span>`;
+    const timelineCell = cell();
+    timelineCell.appendChild(progressBar);
 
-    row.addEventListener("mouseleave", function () {
-      this.style.backgroundColor = "";
+    const statusBadge = document.createElement("span");
+    statusBadge.className = `px-2 py-1 text-xs rounded-full ${
+      statusClasses[task.status] || "bg-gray-100 text-gray-800"
+    }`;
+    statusBadge.textContent = statusLabels[task.status] || task.status;
+    const statusCell = cell();
+    statusCell.appendChild(statusBadge);
+
+    row.append(
+      titleCell,
+      assigneeCell,
+      dateCell(task.start),
+      dateCell(task.due),
+      statusCell,
+      timelineCell
+    );
+    return row;
+  }
+
+  function cell(extraClass = "") {
+    const td = document.createElement("td");
+    td.className = `border border-gray-300 px-4 py-2 ${extraClass}`;
+    return td;
+  }
+
+  function dateCell(value) {
+    const td = cell("text-sm");
+    const date = parseDate(value);
+    const span = document.createElement("span");
+    span.textContent = date.toLocaleDateString(undefined, {
+      month: "short",
+      day: "2-digit",
+      year: "numeric",
     });
+    // Add date range indicator
+    if (date < today) {
+      span.classList.add("text-red-600", "font-semibold");
+    }
+    td.appendChild(span);
+    return td;
+  }
+
+  function loadLater() {
+    if (loading || loadedTo >= last) {
+      return Promise.resolve();
+    }
+    loading = true;
+    const from = addDays(loadedTo, 1);
+    const to = addDays(from, GANTT_WINDOW_DAYS - 1);
+    return fetchWindow(from, to)
+      .then((data) => {
+        loadedTo = to;
+        rowsBody.appendChild(buildRows(data));
+      })
+      .catch(showError)
+      .finally(() => {
+        loading = false;
+      });
+  }
+
+  function loadEarlier() {
+    if (loading || loadedFrom <= first) {
+      return Promise.resolve();
+    }
+    loading = true;
+    const to = addDays(loadedFrom, -1);
+    const from = addDays(to, -(GANTT_WINDOW_DAYS - 1));
+    return fetchWindow(from, to)
+      .then((data) => {
+        loadedFrom = from;
+        // Keep the rows the user is looking at in place
+        const previousHeight = chart.scrollHeight;
+        rowsBody.insertBefore(buildRows(data), rowsBody.firstChild);
+        chart.scrollTop += chart.scrollHeight - previousHeight;
+      })
+      .catch(showError)
+      .finally(() => {
+        loading = false;
+      });
+  }
+
+  function fillViewport() {
+    // Keep loading until the chart can scroll or the timeline is exhausted
+    if (loading) {
+      setTimeout(fillViewport, 100);
+      return;
+    }
+    const scrollable = chart.scrollHeight > chart.clientHeight;
+    if (!scrollable && loadedTo < last) {
+      loadLater().then(fillViewport);
+    } else if (!scrollable && loadedFrom > first) {
+      loadEarlier().then(fillViewport);
+    } else if (seen.size === 0) {
+      emptyRow.classList.remove("hidden");
+    }
+  }
+
+  function showError(error) {
+    console.error("Error:", error);
+    status.textContent = "Failed to load tasks. Please refresh the page.";
+  }
+
+  chart.addEventListener("scroll", function () {
+    const distanceToBottom =
+      chart.scrollHeight - chart.scrollTop - chart.clientHeight;
+    if (distanceToBottom < GANTT_SCROLL_MARGIN) {
+      loadLater();
+    } else if (chart.scrollTop < GANTT_SCROLL_MARGIN) {
+      loadEarlier();
+    }
   });
+
+  loadLater().then(fillViewport);
 });
+
+function parseDate(value) {
+  const [year, month, day] = value.split("-").map(Number);
+  return new Date(year, month - 1, day);
+}
+
+function formatDate(date) {
+  const month = String(date.getMonth() + 1).padStart(2, "0");
+  const day = String(date.getDate()).padStart(2, "0");
+  return `${date.getFullYear()}-${month}-${day}`;
+}
+
+function addDays(date, days) {
+  const result = new Date(date);
+  result.setDate(result.getDate() + days);
+  return result;
+}
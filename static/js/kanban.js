@@ -1,59 +1,273 @@
 // Kanban Board Drag and Drop Functionality
-document.addEventListener("DOMContentLoaded", function () {
-  const columns = document.querySelectorAll(".kanban-column");
+//
+// Drops are queued and flushed as a single batch request once the user
+// pauses, so rapid reorganizing costs one round trip instead of dozens.
+// Changes made by others are pushed over Server-Sent Events when the
+// server has live updates enabled, or pulled from the change feed API
+// otherwise, and patched into the board in place. When a patch is not
+// possible, only the affected columns are re-fetched as HTML fragments.
+const MOVE_FLUSH_DELAY = 400; // milliseconds
+const CHANGES_POLL_INTERVAL = 30000; // milliseconds
+
+const pendingMoves = new Set();
+const movedStatuses = new Set();
+let moveFlushTimer = null;
+let moveRequestInFlight = false;
+let pollTimer = null;
 
-  columns.forEach((column) => {
+function initColumns(root) {
+  root.querySelectorAll(".kanban-column").forEach((column) => {
+    if (Sortable.get(column)) {
+      return;
+    }
     new Sortable(column, {
       group: "kanban",
+      draggable: ".task-card",
       animation: 150,
       ghostClass: "sortable-ghost",
       dragClass: "sortable-drag",
       chosenClass: "sortable-chosen",
       onEnd: function (evt) {
-        const taskId = evt.item.dataset.taskId;
-        const newStatus = evt.to.dataset.status;
-
-        // Show loading state
+        if (evt.from === evt.to && evt.oldIndex === evt.newIndex) {
+          return;
+        }
         evt.item.classList.add("loading");
-
-        // Update task status via API
-        fetch("/tasks/api/task/status/", {
-          method: "POST",
-          headers: {
-            "Content-Type": "application/json",
-            "X-CSRFToken": getCookie("csrftoken"),
-          },
-          body: JSON.stringify({
-            task_id: taskId,
-            status: newStatus,
-          }),
-        })
-          .then((response) => response.json())
-          .then((data) => {
-            evt.item.classList.remove("loading");
-            if (!data.success) {
-              // Revert on failure
-              alert("Failed to update task status");
-              evt.item.remove();
-              evt.from.insertBefore(evt.item, evt.from.children[evt.oldIndex]);
-            } else {
-              // Show success feedback
-              showToast("Task status updated successfully", "success");
-            }
-          })
-          .catch((error) => {
-            evt.item.classList.remove("loading");
-            console.error("Error:", error);
-            alert("Failed to update task. Please refresh the page.");
-            // Revert on error
-            evt.item.remove();
-            evt.from.insertBefore(evt.item, evt.from.children[evt.oldIndex]);
-          });
+        movedStatuses.add(evt.from.dataset.status);
+        movedStatuses.add(evt.to.dataset.status);
+        queueMove(evt.item.dataset.taskId);
       },
     });
   });
+}
+
+document.addEventListener("DOMContentLoaded", function () {
+  initColumns(document);
+  // Columns swapped in by htmx need their own Sortable
+  document.body.addEventListener("htmx:load", (evt) =>
+    initColumns(evt.detail.elt)
+  );
+
+  const board = document.getElementById("kanban-board");
+  if (board && board.dataset.streamUrl && window.EventSource) {
+    streamChanges(board);
+  } else if (board) {
+    schedulePoll(board, CHANGES_POLL_INTERVAL);
+  }
 });
 
+function refreshColumns(statuses) {
+  // Re-render just these columns from their fragment endpoint
+  statuses.forEach((status) => {
+    const panel = document.querySelector(
+      `.kanban-column-panel[data-status="${status}"]`
+    );
+    if (panel) {
+      htmx.ajax("GET", panel.dataset.url, { target: panel, swap: "outerHTML" });
+    }
+  });
+}
+
+function refreshBoard() {
+  const panels = document.querySelectorAll(".kanban-column-panel");
+  refreshColumns(Array.from(panels, (panel) => panel.dataset.status));
+}
+
+function streamChanges(board) {
+  const source = new EventSource(
+    `${board.dataset.streamUrl}?since=${board.dataset.cursor}`
+  );
+  source.addEventListener("changes", (event) => {
+    const data = JSON.parse(event.data);
+    board.dataset.cursor = data.cursor;
+    if (data.reset) {
+      refreshBoard();
+      return;
+    }
+    applyChanges(board, data);
+  });
+  source.onerror = () => {
+    // EventSource reconnects by itself unless the server turned it away
+    if (source.readyState === EventSource.CLOSED) {
+      schedulePoll(board, CHANGES_POLL_INTERVAL);
+    }
+  };
+}
+
+function schedulePoll(board, delay) {
+  clearTimeout(pollTimer);
+  pollTimer = setTimeout(() => pollChanges(board), delay);
+}
+
+function pollChanges(board) {
+  const next = () => schedulePoll(board, CHANGES_POLL_INTERVAL);
+  // Don't patch cards the user is still moving
+  if (document.hidden || pendingMoves.size > 0 || moveRequestInFlight) {
+    next();
+    return;
+  }
+
+  fetch(`${board.dataset.changesUrl}&since=${board.dataset.cursor}`, {
+    headers: { Accept: "application/json" },
+  })
+    .then((response) => response.json())
+    .then((data) => {
+      if (data.error) {
+        throw new Error(data.error);
+      }
+      board.dataset.cursor = data.cursor;
+      if (data.reset) {
+        refreshBoard();
+        return;
+      }
+      applyChanges(board, data);
+    })
+    .catch((error) => console.error("Error:", error))
+    .finally(next);
+}
+
+function applyChanges(board, data) {
+  data.removed.forEach((taskId) => {
+    const card = board.querySelector(`.task-card[data-task-id="${taskId}"]`);
+    if (card) {
+      card.remove();
+    }
+  });
+
+  data.cards.forEach((change) => {
+    if (pendingMoves.has(String(change.id))) {
+      return; // the user's own pending drop wins
+    }
+    const existing = board.querySelector(
+      `.task-card[data-task-id="${change.id}"]`
+    );
+    if (existing) {
+      existing.remove();
+    }
+    const template = document.createElement("template");
+    template.innerHTML = change.html.trim();
+    placeCard(board, template.content.firstElementChild, change);
+  });
+
+  if (data.totals) {
+    board.querySelectorAll(".kanban-total").forEach((total) => {
+      total.textContent = data.totals[total.dataset.status] || 0;
+    });
+  }
+}
+
+function placeCard(board, card, change) {
+  const column = board.querySelector(
+    `.kanban-column[data-status="${change.status}"]`
+  );
+  if (!column) {
+    return;
+  }
+  const next = Array.from(column.querySelectorAll(".task-card")).find(
+    (other) => Number(other.dataset.order) > change.order
+  );
+  if (next) {
+    column.insertBefore(card, next);
+    return;
+  }
+  const loadMore = column.querySelector(".kanban-load-more");
+  if (loadMore) {
+    // Sorts after the loaded page; "Load more" will fetch it
+    return;
+  }
+  column.appendChild(card);
+}
+
+function queueMove(taskId) {
+  // A card dragged several times is only sent once, at its final position
+  pendingMoves.add(taskId);
+  clearTimeout(moveFlushTimer);
+  moveFlushTimer = setTimeout(flushMoves, MOVE_FLUSH_DELAY);
+}
+
+function collectMoves(taskIds) {
+  const moves = [];
+  taskIds.forEach((taskId) => {
+    const card = document.querySelector(
+      `.task-card[data-task-id="${taskId}"]`
+    );
+    if (!card) {
+      return;
+    }
+    const column = card.closest(".kanban-column");
+    const cards = Array.from(column.querySelectorAll(".task-card"));
+    const index = cards.indexOf(card);
+    moves.push({
+      task_id: taskId,
+      status: column.dataset.status,
+      // The card above it, or null at the top of the column
+      after: index > 0 ? cards[index - 1].dataset.taskId : null,
+      index: index,
+      card: card,
+    });
+  });
+
+  // Each move is placed after its neighbour as the server finds it, so
+  // moves go top to bottom: a moved neighbour is then already in place
+  moves.sort((a, b) => a.status.localeCompare(b.status) || a.index - b.index);
+  return moves;
+}
+
+function flushMoves() {
+  if (moveRequestInFlight) {
+    moveFlushTimer = setTimeout(flushMoves, MOVE_FLUSH_DELAY);
+    return;
+  }
+  if (pendingMoves.size === 0) {
+    return;
+  }
+
+  const moves = collectMoves(Array.from(pendingMoves));
+  const statuses = Array.from(movedStatuses);
+  pendingMoves.clear();
+  movedStatuses.clear();
+  moveRequestInFlight = true;
+
+  fetch("/tasks/api/tasks/move/", {
+    method: "POST",
+    headers: {
+      "Content-Type": "application/json",
+      "X-CSRFToken": getCookie("csrftoken"),
+    },
+    body: JSON.stringify({
+      moves: moves.map(({ task_id, status, after }) => ({
+        task_id,
+        status,
+        after,
+      })),
+    }),
+  })
+    .then((response) => response.json())
+    .then((data) => {
+      moves.forEach((move) => move.card.classList.remove("loading"));
+      if (!data.success) {
+        alert(data.error || "Failed to update tasks");
+        // Several cards may have moved; re-render the columns involved
+        refreshColumns(statuses);
+      } else {
+        const label = moves.length === 1 ? "Task" : `${moves.length} tasks`;
+        showToast(`${label} updated successfully`, "success");
+      }
+    })
+    .catch((error) => {
+      console.error("Error:", error);
+      alert("Failed to update tasks. The affected columns will be reloaded.");
+      refreshColumns(statuses);
+    })
+    .finally(() => {
+      moveRequestInFlight = false;
+      // Pick up server-side effects (progress, totals) right away
+      const board = document.getElementById("kanban-board");
+      if (board && !board.dataset.streamUrl) {
+        schedulePoll(board, 0);
+      }
+    });
+}
+
 // Helper function to get CSRF token
 function getCookie(name) {
   let cookieValue = null;
@@ -1,5 +1,10 @@
-from django.contrib import admin
-from .models import Task, TaskDependency
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied
+from django.shortcuts import render
+from django.urls import path
+from .importer import ImportFormatError, TaskImporter, format_for, read_rows, text_stream
+from .models import RecurringTask, Task, TaskDependency
+from .recurrence import materialize, reschedule
 
 
 @admin.register(Task)
@@ -11,7 +16,9 @@ class TaskAdmin(admin.ModelAdmin):
     search_fields = ['title', 'description',
                      'board__name', 'board__project__name']
     date_hierarchy = 'due_date'
-    readonly_fields = ['created_at', 'updated_at', 'created_by']
+    change_list_template = 'admin/tasks/task/change_list.html'
+    readonly_fields = ['created_at', 'updated_at', 'created_by',
+                       'recurrence', 'occurrence_date']
 
     fieldsets = (
         ('Task Information', {
@@ -24,7 +31,8 @@ class TaskAdmin(admin.ModelAdmin):
             'fields': ('start_date', 'due_date')
         }),
         ('Metadata', {
-            'fields': ('created_by', 'created_at', 'updated_at', 'order'),
+            'fields': ('created_by', 'created_at', 'updated_at', 'order',
+                       'recurrence', 'occurrence_date'),
             'classes': ('collapse',)
         }),
     )
@@ -34,9 +42,84 @@ class TaskAdmin(admin.ModelAdmin):
     is_overdue.boolean = True
     is_overdue.short_description = 'Overdue'
 
+    def get_urls(self):
+        return [
+            path('import/', self.admin_site.admin_view(self.import_view),
+                 name='tasks_task_import'),
+        ] + super().get_urls()
+
+    def import_view(self, request):
+        """Upload a CSV or JSON Lines file of tasks (see tasks.importer)"""
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+
+        importer = None
+        upload = request.FILES.get('file')
+        if request.method == 'POST' and upload:
+            importer = TaskImporter(
+                request.user, dry_run=bool(request.POST.get('dry_run')))
+            try:
+                importer.run(read_rows(text_stream(upload), format_for(upload.name)))
+            except (ImportFormatError, UnicodeDecodeError) as exc:
+                self.message_user(request, str(exc), messages.ERROR)
+                importer = None
+            else:
+                verb = 'Validated' if importer.dry_run else 'Imported'
+                level = messages.WARNING if importer.error_count else messages.SUCCESS
+                self.message_user(
+                    request, f'{verb} {importer.created} tasks; '
+                    f'{importer.error_count} rows rejected.', level)
+
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Import tasks',
+            'importer': importer,
+        }
+        return render(request, 'admin/tasks/task/import.html', context)
+
 
 @admin.register(TaskDependency)
 class TaskDependencyAdmin(admin.ModelAdmin):
     list_display = ['task', 'depends_on']
     search_fields = ['task__title', 'depends_on__title']
     autocomplete_fields = ['task', 'depends_on']
+
+
+@admin.register(RecurringTask)
+class RecurringTaskAdmin(admin.ModelAdmin):
+    list_display = ['title', 'board', 'assigned_to', 'frequency', 'interval',
+                    'starts_on', 'ends_on', 'is_active', 'generated_until']
+    list_filter = ['frequency', 'is_active', 'board__project']
+    search_fields = ['title', 'description', 'board__name']
+    readonly_fields = ['generated_until', 'created_by', 'created_at', 'updated_at']
+    actions = ['generate_occurrences']
+
+    fieldsets = (
+        ('Task Template', {
+            'fields': ('board', 'title', 'description', 'assigned_to', 'priority')
+        }),
+        ('Schedule', {
+            'fields': ('frequency', 'interval', 'starts_on', 'ends_on',
+                       'lead_days', 'is_active', 'generated_until')
+        }),
+        ('Metadata', {
+            'fields': ('created_by', 'created_at', 'updated_at'),
+            'classes': ('collapse',)
+        }),
+    )
+
+    def save_model(self, request, obj, form, change):
+        if not change:
+            obj.created_by = request.user
+        super().save_model(request, obj, form, change)
+        if change and form.changed_data:
+            # Future occurrences that have not been started follow the edit
+            reschedule(obj)
+        else:
+            materialize(RecurringTask.objects.filter(pk=obj.pk))
+
+    @admin.action(description='Generate upcoming occurrences')
+    def generate_occurrences(self, request, queryset):
+        created = materialize(queryset)
+        self.message_user(request, f'Created {created} occurrence(s).')
@@ -1,7 +1,10 @@
 from django.http import JsonResponse
-from django.views.decorators.http import require_http_methods
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_http_methods
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.csrf import csrf_exempt
+from . import etags
+from .kanban import MoveError, apply_moves, board_changes
 from .models import Task
 import json
 
@@ -33,6 +36,25 @@ def update_task_status(request):
         return JsonResponse({'error': str(e)}, status=400)
 
 
+@login_required
+@require_http_methods(["POST"])
+def move_tasks(request):
+    """API endpoint to apply a batch of kanban drag-and-drop moves"""
+    try:
+        data = json.loads(request.body)
+        moves = data.get('moves') if isinstance(data, dict) else None
+        if not isinstance(moves, list) or not moves:
+            return JsonResponse({'error': 'No moves given'}, status=400)
+
+        updated = apply_moves(request.user, moves)
+        return JsonResponse({'success': True, 'updated': updated})
+    except MoveError as e:
+        return JsonResponse({'error': str(e)}, status=e.status)
+    except ValueError:
+        # Also covers json.JSONDecodeError
+        return JsonResponse({'error': 'Invalid JSON body'}, status=400)
+
+
 @login_required
 @require_http_methods(["POST"])
 def update_task_progress(request, task_id):
@@ -59,3 +81,191 @@ def update_task_progress(request, task_id):
         return JsonResponse({'error': 'Task not found'}, status=404)
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=400)
+
+
+def _changes_payload(request, board, since):
+    """board_changes() as JSON-ready data with each card rendered to HTML"""
+    from django.middleware.csrf import get_token
+    from django.template.loader import get_template
+
+    changes = board_changes(request.user, board, since)
+    card = get_template('tasks/partials/task_card.html')
+    context = {'user': request.user, 'csrf_token': get_token(request)}
+    return {
+        'cursor': changes['cursor'],
+        'reset': changes['reset'],
+        'cards': [{
+            'id': task.id,
+            'status': task.status,
+            'order': task.order,
+            'html': card.render({**context, 'task': task}),
+        } for task in changes['cards']],
+        'removed': changes['removed'],
+        'totals': changes['totals'],
+    }
+
+
+@login_required
+@require_http_methods(["GET"])
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=etags.task_changes_etag)
+def task_changes(request):
+    """
+    API endpoint returning the kanban cards of a board changed since an
+    event cursor, rendered as card HTML, plus tombstones for cards that
+    left the board. Polled by static/js/kanban.js.
+    """
+    from projects.models import Board
+
+    try:
+        board = Board.objects.live().select_related('project').get(
+            id=int(request.GET['board']))
+        since = int(request.GET.get('since') or 0)
+    except Board.DoesNotExist:
+        return JsonResponse({'error': 'Board not found'}, status=404)
+    except (KeyError, ValueError):
+        return JsonResponse(
+            {'error': 'board and since must be integers'}, status=400)
+
+    return JsonResponse(_changes_payload(request, board, since))
+
+
+@login_required
+@require_http_methods(["GET"])
+async def board_events(request, board_id):
+    """
+    Server-Sent Events stream of a board's changes, in the same format as
+    task_changes. Only served when settings.LIVE_UPDATES is on, which
+    requires the ASGI entry point; otherwise answers 204 so EventSource
+    gives up and kanban.js keeps polling.
+    """
+    from django.conf import settings
+    from django.http import Http404, HttpResponse, StreamingHttpResponse
+    from projects.models import Board
+    from .live import board_stream
+
+    if not settings.LIVE_UPDATES:
+        return HttpResponse(status=204)
+    try:
+        board = await Board.objects.live().select_related('project').aget(
+            id=board_id)
+    except Board.DoesNotExist:
+        raise Http404('Board not found')
+    try:
+        since = int(request.headers.get('Last-Event-ID')
+                    or request.GET.get('since') or 0)
+    except ValueError:
+        return JsonResponse({'error': 'since must be an integer'}, status=400)
+
+    await request.auser()
+    response = StreamingHttpResponse(
+        board_stream(board, since,
+                     lambda cursor: _changes_payload(request, board, cursor)),
+        content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+GANTT_MAX_WINDOW_DAYS = 366
+
+
+def gantt_window(board_ids, start, end):
+    """Rows of the dated tasks on the boards that overlap [start, end]"""
+    return Task.objects.filter(
+        board_id__in=board_ids,
+        start_date__lte=end,
+        due_date__gte=start,
+    ).order_by('start_date', 'id').values_list(
+        'id', 'title', 'board_id', 'assigned_to_id', 'assigned_to__first_name',
+        'assigned_to__last_name', 'start_date', 'due_date', 'status', 'progress',
+    )
+
+
+@login_required
+@require_http_methods(["GET"])
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=etags.gantt_data_etag)
+def gantt_data(request, project_id):
+    """
+    API endpoint returning the dated tasks of a project that overlap a
+    date window, as a columnar payload for static/js/gantt.js
+    """
+    from datetime import date, timedelta
+    from projects.models import Project
+    from .scheduling import get_schedule
+
+    try:
+        project = Project.objects.live().get(id=project_id)
+        start = date.fromisoformat(request.GET['from'])
+        end = date.fromisoformat(request.GET['to'])
+    except Project.DoesNotExist:
+        return JsonResponse({'error': 'Project not found'}, status=404)
+    except (KeyError, ValueError):
+        return JsonResponse(
+            {'error': 'from and to must be dates (YYYY-MM-DD)'}, status=400)
+    if end < start or (end - start).days > GANTT_MAX_WINDOW_DAYS:
+        return JsonResponse(
+            {'error': f'Window must span 0-{GANTT_MAX_WINDOW_DAYS} days'},
+            status=400)
+
+    boards = dict(project.boards.filter(deleted_at__isnull=True)
+                  .values_list('id', 'name'))
+    rows = gantt_window(list(boards), start, end)
+
+    schedule = get_schedule(project.id)
+    columns = {name: [] for name in (
+        'id', 'title', 'board', 'assignee', 'start', 'due', 'status',
+        'progress', 'critical', 'slack')}
+    users = {}
+    for (task_id, title, board_id, user_id, first_name, last_name,
+         start_date, due_date, status, progress) in rows:
+        if user_id is not None and user_id not in users:
+            users[user_id] = f'{first_name} {last_name}'.strip()
+        scheduled = schedule is not None and task_id in schedule.graph.index
+        columns['id'].append(task_id)
+        columns['title'].append(title)
+        columns['board'].append(board_id)
+        columns['assignee'].append(user_id)
+        columns['start'].append(start_date.isoformat())
+        columns['due'].append(due_date.isoformat())
+        columns['status'].append(status)
+        columns['progress'].append(progress)
+        columns['critical'].append(
+            scheduled and schedule.is_critical(task_id))
+        columns['slack'].append(
+            schedule.slack(task_id) if scheduled else None)
+
+    return JsonResponse({
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'count': len(columns['id']),
+        'columns': columns,
+        'boards': boards,
+        'users': users,
+    })
+
+
+@login_required
+@require_http_methods(["GET"])
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=etags.search_api_etag)
+def search_tasks(request):
+    """
+    API endpoint for full-text task search. Takes ?q= and an optional
+    ?cursor= from the previous page; results are ranked best first.
+    """
+    from .search import search_tasks as run_search
+
+    query = request.GET.get('q', '').strip()
+    try:
+        results, next_cursor = run_search(
+            request.user, query, after=request.GET.get('cursor') or None)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid cursor'}, status=400)
+
+    return JsonResponse({
+        'query': query,
+        'results': results,
+        'next_cursor': next_cursor,
+    })
@@ -0,0 +1,122 @@
+"""
+Hot/cold split of the tasks table.
+
+Completed tasks that have not changed for a while are moved, with their
+dependencies and notifications, into the archive tables by the
+``archive_tasks`` command. The live ``tasks`` table then only holds
+current work, which keeps the kanban, dashboard and report queries
+small. Reports filtered by date read both tables (see
+reports.views.report_sources).
+
+Each chunk is copied and deleted in its own transaction. The deletes
+bypass the per-row signal handlers, so this module adjusts the task
+and notification counters, the change feed and the cached graphs and
+schedules itself.
+"""
+
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Q
+
+from .graph import invalidate_graph
+from .models import (
+    ArchivedTask, ArchivedTaskDependency, Task, TaskCounter, TaskDependency,
+    TaskEvent)
+from .purge import delete_rows
+from .scheduling import invalidate_schedule
+
+ARCHIVE_BATCH_SIZE = 1000
+
+# Task columns copied as they are; ArchivedTask has the same fields
+ARCHIVED_FIELDS = [
+    field.attname for field in ArchivedTask._meta.concrete_fields
+    if field.name != 'archived_at'
+]
+
+
+def archivable_tasks(cutoff):
+    """Completed tasks last changed before the cutoff datetime"""
+    return Task.objects.filter(status='completed', updated_at__lt=cutoff)
+
+
+def archive_batch(ids):
+    """Move the given tasks and everything attached to them to the archive"""
+    from notifications.models import (
+        ArchivedNotification, Notification, NotificationCounter)
+
+    with transaction.atomic():
+        rows = list(Task.objects.filter(id__in=ids, status='completed')
+                    .select_related('board').order_by('id'))
+        if not rows:
+            return 0
+        ids = [task.id for task in rows]
+
+        ArchivedTask.objects.bulk_create([
+            ArchivedTask(**{field: getattr(task, field) for field in ARCHIVED_FIELDS})
+            for task in rows
+        ])
+
+        dependencies = TaskDependency.objects.filter(
+            Q(task_id__in=ids) | Q(depends_on_id__in=ids))
+        ArchivedTaskDependency.objects.bulk_create([
+            ArchivedTaskDependency(task_id=task_id, depends_on_id=depends_on_id)
+            for task_id, depends_on_id
+            in dependencies.values_list('task_id', 'depends_on_id')
+        ], ignore_conflicts=True)
+
+        notifications = list(Notification.objects.filter(task_id__in=ids))
+        ArchivedNotification.objects.bulk_create([
+            ArchivedNotification(
+                id=notification.id,
+                user_id=notification.user_id,
+                type=notification.type,
+                title=notification.title,
+                message=notification.message,
+                task_id=notification.task_id,
+                is_read=notification.is_read,
+                created_at=notification.created_at,
+            ) for notification in notifications
+        ])
+
+        # Children first: the foreign keys are checked at commit
+        delete_rows(Notification._meta.db_table, 'id',
+                    [notification.id for notification in notifications])
+        NotificationCounter.refresh(
+            notification.user_id for notification in notifications
+            if not notification.is_read)
+        dependency_ids = list(dependencies.values_list('id', flat=True))
+        delete_rows(TaskDependency._meta.db_table, 'id', dependency_ids)
+        delete_rows(Task._meta.db_table, 'id', ids)
+
+        deltas = Counter()
+        for task in rows:
+            for key in TaskCounter.keys_for(
+                    task.board.project_id, task.board_id, task.assigned_to_id,
+                    task.status):
+                deltas[key] -= 1
+        TaskCounter.apply(deltas)
+        TaskEvent.record('deleted', [(task.board_id, task.id) for task in rows])
+
+    project_ids = {task.board.project_id for task in rows}
+    invalidate_graph(*project_ids)
+    invalidate_schedule(*project_ids)
+    return len(rows)
+
+
+def archive_completed_tasks(cutoff, batch_size=ARCHIVE_BATCH_SIZE):
+    """
+    Archive every completed task last changed before the cutoff,
+    batch_size tasks per transaction. Yields the running total after each
+    batch so callers can report progress.
+    """
+    archived = 0
+    last_id = 0
+    while True:
+        ids = list(archivable_tasks(cutoff).filter(id__gt=last_id)
+                   .order_by('id').values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return
+        archived += archive_batch(ids)
+        last_id = ids[-1]
+        yield archived
@@ -0,0 +1,138 @@
+"""
+ETag validators for conditional GET on the task pages and APIs.
+
+Each validator is built from a few indexed lookups of data versions (the
+newest task event of a board or project, the user's unread notification
+totals, ...) rather than from the rendered response, so an unchanged
+reload is answered with 304 before any of the view's queries run.
+"""
+
+import hashlib
+
+from django.contrib import messages
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from notifications.context_processors import notification_counter
+from projects.models import Board, Project
+from .models import TaskDependency, TaskEvent
+
+
+def notification_version(request):
+    """Changes whenever the user's notification badges can change"""
+    counter = notification_counter(request)
+    return counter and (counter.unread, counter.overdue, counter.version)
+
+
+def latest_event(board_ids=None):
+    """Id of the newest task event, optionally limited to some boards"""
+    if board_ids is None:
+        return TaskEvent.latest_cursor()
+    return TaskEvent.objects.filter(board_id__in=board_ids).aggregate(
+        latest=Max('id'))['latest'] or 0
+
+
+def _digest(*parts):
+    return hashlib.md5(repr(parts).encode()).hexdigest()
+
+
+def page_etag(request, *parts, badges=True):
+    """
+    Hash the parts with everything else a page depends on: the user and
+    role, the CSRF cookie baked into forms, today's date (overdue
+    highlighting), the query string and, unless badges is False (htmx
+    fragments without the page header), the notification badges. Returns
+    None while flash messages are waiting to be shown, so that response is
+    always rendered.
+    """
+    if len(messages.get_messages(request)):
+        return None
+    user = request.user
+    return _digest(
+        user.id, user.role, request.COOKIES.get('csrftoken'),
+        timezone.now().date(), request.GET.urlencode(),
+        notification_version(request) if badges else None, *parts)
+
+
+def api_etag(request, *parts):
+    """Like page_etag for JSON responses, which carry no badges or forms"""
+    user = request.user
+    return _digest(
+        user.id, user.role, timezone.now().date(), request.GET.urlencode(),
+        *parts)
+
+
+def board_version(board_id):
+    # Soft deletion does not touch updated_at, so deleted rows get no tag
+    board = Board.objects.live().filter(id=board_id).values_list(
+        'name', 'project__name', 'project__created_by_id',
+        'project__updated_at').first()
+    if board is None:
+        return None
+    return (board, latest_event([board_id]))
+
+
+def project_version(project_id):
+    project = Project.objects.live().filter(id=project_id).values_list(
+        'name', 'created_by_id', 'updated_at').first()
+    if project is None:
+        return None
+    board_ids = list(Board.objects.live().filter(project_id=project_id)
+                     .values_list('id', flat=True))
+    # Dependencies feed the critical path and slack
+    dependencies = TaskDependency.objects.filter(
+        task__board__project_id=project_id).aggregate(Count('id'), Max('id'))
+    return (project, board_ids, latest_event(board_ids), dependencies)
+
+
+def kanban_etag(request, board_id):
+    version = board_version(board_id)
+    return version and page_etag(request, 'kanban', version)
+
+
+def dashboard_version(user):
+    # Soft deletion hides tasks from the lists without a task event
+    parts = (latest_event(), Project.objects.aggregate(
+        Max('updated_at'), Max('deleted_at'), Max('boards__deleted_at')))
+    if user.is_admin():
+        # The per-user chart lists every active user
+        from django.contrib.auth import get_user_model
+        parts += (get_user_model().objects.filter(is_active=True).aggregate(
+            Count('id'), Max('id')),)
+    return parts
+
+
+def dashboard_etag(request):
+    return page_etag(request, 'dashboard', dashboard_version(request.user))
+
+
+def dashboard_widget_etag(request, widget):
+    return page_etag(
+        request, 'dashboard-widget', widget, dashboard_version(request.user),
+        badges=False)
+
+
+def gantt_etag(request, project_id):
+    version = project_version(project_id)
+    return version and page_etag(request, 'gantt', version)
+
+
+def gantt_data_etag(request, project_id):
+    version = project_version(project_id)
+    return version and api_etag(request, 'gantt-data', version)
+
+
+def task_changes_etag(request):
+    try:
+        version = board_version(int(request.GET['board']))
+    except (KeyError, ValueError):
+        return None
+    return version and api_etag(request, 'changes', version)
+
+
+def search_etag(request):
+    return page_etag(request, 'search', latest_event())
+
+
+def search_api_etag(request):
+    return api_etag(request, 'search', latest_event())
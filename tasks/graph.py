@@ -0,0 +1,197 @@
+"""
+In-memory dependency graph for a project's tasks.
+
+All TaskDependency edges of a project are loaded with one query into
+compressed adjacency arrays (CSR), so cycle checks, blocked/ready lookups
+and topological ordering run in O(V+E) without touching the ORM per edge.
+Graphs are kept in the default cache together with the project's
+graph_version(), which every process sees change when a task or
+dependency is written anywhere, so a graph cached by another process's
+stale copy is never used. The signal handlers in tasks.signals also drop
+the entry right away. Writes (the cycle check in TaskDependency.save()
+and scheduling.propagate_dates) still load the edges from the database.
+"""
+
+from array import array
+from collections import deque
+
+from django.core.cache import cache
+from django.db.models import Count, Max
+
+from projects.models import Board
+from .models import Task, TaskDependency, TaskEvent
+
+GRAPH_CACHE_TIMEOUT = 60 * 60
+
+
+class DependencyCycleError(Exception):
+    """The dependencies of a project contain a cycle"""
+
+
+def _csr(count, pairs):
+    """Build (offsets, targets) arrays from (source, target) index pairs"""
+    offsets = array('l', [0] * (count + 1))
+    for source, _ in pairs:
+        offsets[source + 1] += 1
+    for i in range(count):
+        offsets[i + 1] += offsets[i]
+    targets = array('l', [0] * len(pairs))
+    fill = array('l', offsets[:-1])
+    for source, target in pairs:
+        targets[fill[source]] = target
+        fill[source] += 1
+    return offsets, targets
+
+
+class DependencyGraph:
+    """
+    Dependency graph of one project.
+
+    An edge task -> depends_on means the task cannot start before
+    depends_on is completed. Nodes are the project's tasks, addressed by
+    task id in the public API and by dense index internally.
+    """
+
+    def __init__(self, project_id, tasks, edges):
+        self.project_id = project_id
+        self.ids = array('q', [task_id for task_id, _ in tasks])
+        self.index = {task_id: i for i, task_id in enumerate(self.ids)}
+        self.completed = bytearray(
+            status == 'completed' for _, status in tasks)
+
+        pairs = [(self.index[task_id], self.index[depends_on_id])
+                 for task_id, depends_on_id in edges
+                 if task_id in self.index and depends_on_id in self.index]
+        count = len(self.ids)
+        self.dep_offsets, self.dep_targets = _csr(count, pairs)
+        self.rev_offsets, self.rev_targets = _csr(
+            count, [(target, source) for source, target in pairs])
+
+    @classmethod
+    def load(cls, project_id):
+        """Build the graph for a project with one query per table"""
+        tasks = list(Task.objects.filter(board__project_id=project_id)
+                     .order_by('id').values_list('id', 'status'))
+        edges = TaskDependency.objects.filter(
+            task__board__project_id=project_id
+        ).values_list('task_id', 'depends_on_id')
+        return cls(project_id, tasks, list(edges))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _dependencies(self, i):
+        return self.dep_targets[self.dep_offsets[i]:self.dep_offsets[i + 1]]
+
+    def _dependents(self, i):
+        return self.rev_targets[self.rev_offsets[i]:self.rev_offsets[i + 1]]
+
+    def dependencies_of(self, task_id):
+        """Ids of the tasks the given task directly depends on"""
+        return [self.ids[j] for j in self._dependencies(self.index[task_id])]
+
+    def dependents_of(self, task_id):
+        """Ids of the tasks that directly depend on the given task"""
+        return [self.ids[j] for j in self._dependents(self.index[task_id])]
+
+    def would_create_cycle(self, task_id, depends_on_id):
+        """True if adding task_id -> depends_on_id would close a cycle"""
+        if task_id == depends_on_id:
+            return True
+        start = self.index.get(depends_on_id)
+        goal = self.index.get(task_id)
+        if start is None or goal is None:
+            return False
+
+        # Is task_id already reachable from depends_on_id?
+        seen = bytearray(len(self.ids))
+        seen[start] = 1
+        stack = [start]
+        while stack:
+            i = stack.pop()
+            if i == goal:
+                return True
+            for j in self._dependencies(i):
+                if not seen[j]:
+                    seen[j] = 1
+                    stack.append(j)
+        return False
+
+    def topological_order(self):
+        """
+        Task ids ordered so every task comes after all of its dependencies.
+        Raises DependencyCycleError if the graph is not acyclic.
+        """
+        count = len(self.ids)
+        remaining = array('l', (
+            self.dep_offsets[i + 1] - self.dep_offsets[i] for i in range(count)))
+        queue = deque(i for i in range(count) if not remaining[i])
+        order = []
+        while queue:
+            i = queue.popleft()
+            order.append(i)
+            for j in self._dependents(i):
+                remaining[j] -= 1
+                if not remaining[j]:
+                    queue.append(j)
+        if len(order) != count:
+            raise DependencyCycleError(
+                f'Project {self.project_id} has cyclic task dependencies')
+        return [self.ids[i] for i in order]
+
+    def blocked(self):
+        """Ids of unfinished tasks waiting on at least one unfinished task"""
+        return {
+            self.ids[i] for i in range(len(self.ids))
+            if not self.completed[i] and any(
+                not self.completed[j] for j in self._dependencies(i))
+        }
+
+    def is_blocked(self, task_id):
+        i = self.index[task_id]
+        return any(not self.completed[j] for j in self._dependencies(i))
+
+    def ready_after(self, task_id):
+        """Ids of tasks that become unblocked once the given task completes"""
+        i = self.index[task_id]
+        ready = []
+        for j in self._dependents(i):
+            if self.completed[j]:
+                continue
+            if all(k == i or self.completed[k] for k in self._dependencies(j)):
+                ready.append(self.ids[j])
+        return ready
+
+
+def _cache_key(project_id):
+    return f'tasks:dependency-graph:{project_id}'
+
+
+def graph_version(project_id):
+    """
+    Changes whenever a task or dependency of the project changes: the
+    newest task event on its boards (every task write records one) and
+    the count and newest id of its dependencies
+    """
+    latest_event = TaskEvent.objects.filter(
+        board_id__in=Board.objects.filter(project_id=project_id).values('id'),
+    ).aggregate(Max('id'))['id__max']
+    dependencies = TaskDependency.objects.filter(
+        task__board__project_id=project_id).aggregate(Count('id'), Max('id'))
+    return (latest_event, dependencies['id__count'], dependencies['id__max'])
+
+
+def get_graph(project_id):
+    """Cached dependency graph of a project"""
+    version = graph_version(project_id)
+    cached = cache.get(_cache_key(project_id))
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    graph = DependencyGraph.load(project_id)
+    cache.set(_cache_key(project_id), (version, graph), GRAPH_CACHE_TIMEOUT)
+    return graph
+
+
+def invalidate_graph(*project_ids):
+    """Drop cached graphs after their tasks or dependencies changed"""
+    cache.delete_many([_cache_key(project_id) for project_id in project_ids])
@@ -0,0 +1,303 @@
+"""
+Bulk import of tasks from CSV or JSON Lines files.
+
+The file is read one row at a time. Boards and users are resolved
+through lookup dicts loaded once up front, and valid rows are inserted
+IMPORT_BATCH_SIZE at a time with bulk_create, one transaction per
+batch. Rows that fail validation are skipped and reported with their
+line number; they never abort the import.
+
+CSV headers are matched case-insensitively, so the file written by the
+reports CSV export can be imported again. Columns:
+
+    title (required), board (required: id, name or "Project - Board"),
+    project, description, notes, status, priority, progress,
+    assigned_to, created_by, start_date, due_date
+
+Users may be given by username, email or full name. Statuses and
+priorities may be given by value or label.
+"""
+
+import csv
+import io
+import json
+from collections import Counter
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from notifications.models import DueDateRecheck, NotificationOutbox
+from projects.models import Board
+from .graph import invalidate_graph
+from .models import Task, TaskCounter, TaskEvent
+from .ordering import ORDER_GAP, bottom_of_column_order
+from .scheduling import invalidate_schedule
+
+IMPORT_BATCH_SIZE = 2000
+
+# Most row errors kept for the report; the rest are only counted
+IMPORT_ERROR_LIMIT = 1000
+
+NO_VALUE = {'', 'n/a', 'none', 'unassigned'}
+
+
+class ImportFormatError(Exception):
+    """The file as a whole cannot be read"""
+
+
+def _normalize(header):
+    return str(header).strip().lower().replace(' ', '_')
+
+
+def read_rows(stream, fmt):
+    """
+    Yield (line_number, row dict) from a text stream in the 'csv' or
+    'jsonl' format without loading the whole file.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        if not reader.fieldnames:
+            raise ImportFormatError('The CSV file has no header row')
+        reader.fieldnames = [_normalize(name) for name in reader.fieldnames]
+        for row in reader:
+            yield reader.line_num, row
+    elif fmt == 'jsonl':
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as exc:
+                yield line_number, ValueError(f'Invalid JSON: {exc}')
+                continue
+            if not isinstance(row, dict):
+                yield line_number, ValueError('Each line must be a JSON object')
+                continue
+            yield line_number, {_normalize(key): value for key, value in row.items()}
+    else:
+        raise ImportFormatError(f'Unknown import format: {fmt}')
+
+
+def format_for(filename):
+    """Import format implied by a file name"""
+    name = filename.lower()
+    if name.endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    if name.endswith('.csv'):
+        return 'csv'
+    raise ImportFormatError('Upload a .csv or .jsonl file')
+
+
+def text_stream(binary):
+    """Decode an uploaded or opened binary file lazily, BOM included"""
+    return io.TextIOWrapper(binary, encoding='utf-8-sig', newline='')
+
+
+class TaskImporter:
+    """
+    Validates rows and writes them in batches. After run(), ``created``
+    holds the number of tasks inserted, ``errors`` a list of
+    (line_number, message) and ``error_count`` the total number of rows
+    rejected.
+    """
+
+    def __init__(self, default_creator, batch_size=IMPORT_BATCH_SIZE, dry_run=False):
+        self.default_creator = default_creator
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.created = 0
+        self.errors = []
+        self.error_count = 0
+        self._load_lookups()
+
+    def _load_lookups(self):
+        self.boards = {}
+        self.board_names = {}
+        self.project_of = {}
+        boards = Board.objects.live().values_list(
+            'id', 'name', 'project_id', 'project__name')
+        for board_id, name, project_id, project_name in boards:
+            self.project_of[board_id] = project_id
+            self.boards[str(board_id)] = board_id
+            self.boards[f'{project_name} - {name}'.lower()] = board_id
+            self.boards[(project_name.lower(), name.lower())] = board_id
+            # A bare board name only resolves when no other board shares it
+            self.board_names.setdefault(name.lower(), set()).add(board_id)
+
+        self.users = {}
+        ambiguous = set()
+        users = get_user_model().objects.filter(is_active=True).values_list(
+            'id', 'username', 'email', 'first_name', 'last_name')
+        for user_id, username, email, first_name, last_name in users:
+            keys = {username.lower(), email.lower(),
+                    f'{first_name} {last_name}'.strip().lower()}
+            for key in keys - {''}:
+                if self.users.setdefault(key, user_id) != user_id:
+                    ambiguous.add(key)
+        for key in ambiguous:
+            self.users[key] = None
+
+        self.statuses = {}
+        for value, label in Task.STATUS_CHOICES:
+            self.statuses[value] = self.statuses[label.lower()] = value
+        self.priorities = {}
+        for value, label in Task.PRIORITY_CHOICES:
+            self.priorities[value] = self.priorities[label.lower()] = value
+        self.next_order = {}
+
+    def _text(self, row, field):
+        value = row.get(field)
+        return '' if value is None else str(value).strip()
+
+    def _board(self, row):
+        board = self._text(row, 'board')
+        project = self._text(row, 'project')
+        if not board:
+            raise ValueError('board is required')
+        if project:
+            board_id = self.boards.get((project.lower(), board.lower()))
+        else:
+            board_id = self.boards.get(board.lower())
+            if board_id is None:
+                matches = self.board_names.get(board.lower(), set())
+                if len(matches) > 1:
+                    raise ValueError(
+                        f'board "{board}" exists in several projects; '
+                        'add a project column')
+                board_id = next(iter(matches), None)
+        if board_id is None:
+            raise ValueError(f'unknown board "{board}"')
+        return board_id
+
+    def _user(self, row, field):
+        name = self._text(row, field)
+        if name.lower() in NO_VALUE:
+            return None
+        if name.lower() not in self.users:
+            raise ValueError(f'unknown user "{name}" in {field}')
+        user_id = self.users[name.lower()]
+        if user_id is None:
+            raise ValueError(f'{field} "{name}" matches several users')
+        return user_id
+
+    def _choice(self, row, field, choices, default):
+        value = self._text(row, field).lower()
+        if not value:
+            return default
+        if value not in choices:
+            raise ValueError(f'invalid {field} "{value}"')
+        return choices[value]
+
+    def _date(self, row, field):
+        value = self._text(row, field)
+        if value.lower() in NO_VALUE:
+            return None
+        try:
+            return date.fromisoformat(value[:10])
+        except ValueError:
+            raise ValueError(f'{field} must be a YYYY-MM-DD date, got "{value}"')
+
+    def _progress(self, row):
+        value = self._text(row, 'progress').rstrip('%')
+        if not value:
+            return 0
+        try:
+            progress = int(float(value))
+        except ValueError:
+            raise ValueError(f'progress must be a number, got "{value}"')
+        if not 0 <= progress <= 100:
+            raise ValueError('progress must be between 0 and 100')
+        return progress
+
+    def build_task(self, row):
+        """A validated, unsaved Task for the row; raises ValueError"""
+        title = self._text(row, 'title')
+        if not title:
+            raise ValueError('title is required')
+        if len(title) > 200:
+            raise ValueError('title is longer than 200 characters')
+
+        board_id = self._board(row)
+        start_date = self._date(row, 'start_date')
+        due_date = self._date(row, 'due_date')
+        # Same rule as the task form
+        if start_date and due_date and start_date > due_date:
+            raise ValueError('start date must be before due date')
+        created_by_id = self._user(row, 'created_by') or self.default_creator.id
+        status = self._choice(row, 'status', self.statuses, 'todo')
+
+        return Task(
+            board_id=board_id,
+            title=title,
+            description=self._text(row, 'description'),
+            notes=self._text(row, 'notes'),
+            status=status,
+            priority=self._choice(row, 'priority', self.priorities, 'medium'),
+            progress=self._progress(row),
+            assigned_to_id=self._user(row, 'assigned_to'),
+            created_by_id=created_by_id,
+            start_date=start_date,
+            due_date=due_date,
+        )
+
+    def _error(self, line_number, message):
+        self.error_count += 1
+        if len(self.errors) < IMPORT_ERROR_LIMIT:
+            self.errors.append((line_number, message))
+
+    def run(self, rows):
+        """Import an iterable of (line_number, row) as built by read_rows"""
+        batch = []
+        project_ids = set()
+        for line_number, row in rows:
+            if isinstance(row, Exception):
+                self._error(line_number, str(row))
+                continue
+            try:
+                task = self.build_task(row)
+            except ValueError as exc:
+                self._error(line_number, str(exc))
+                continue
+            batch.append(task)
+            if len(batch) >= self.batch_size:
+                project_ids |= self._write(batch)
+                batch = []
+        if batch:
+            project_ids |= self._write(batch)
+
+        if project_ids:
+            invalidate_graph(*project_ids)
+            invalidate_schedule(*project_ids)
+        return self
+
+    def _write(self, tasks):
+        """Insert one batch with the bookkeeping bulk_create skips"""
+        if self.dry_run:
+            self.created += len(tasks)
+            return set()
+
+        with transaction.atomic():
+            # Imported cards go below the existing ones, in file order
+            for task in tasks:
+                column = (task.board_id, task.status)
+                if column not in self.next_order:
+                    self.next_order[column] = bottom_of_column_order(*column)
+                task.order = self.next_order[column]
+                self.next_order[column] += ORDER_GAP
+
+            Task.objects.bulk_create(tasks)
+
+            deltas = Counter()
+            for task in tasks:
+                for key in TaskCounter.keys_for(
+                        self.project_of[task.board_id], task.board_id,
+                        task.assigned_to_id, task.status):
+                    deltas[key] += 1
+            TaskCounter.apply(deltas)
+            TaskEvent.record('created', [(task.board_id, task.id) for task in tasks])
+            NotificationOutbox.queue([(task, True, None) for task in tasks])
+            DueDateRecheck.queue([(task, None, None) for task in tasks])
+
+        self.created += len(tasks)
+        return {self.project_of[task.board_id] for task in tasks}
@@ -0,0 +1,301 @@
+"""
+Kanban board data loading.
+
+All columns of a board are fetched in a single windowed query that only
+selects the fields a card displays, so a board renders in constant time
+no matter how many tasks it holds. Further cards are paged per column by
+an (order, created_at, id) keyset cursor (see
+church_task_manager.pagination).
+"""
+
+from django.db.models import Count, F, Window
+from django.db.models.functions import RowNumber
+
+from church_task_manager import pagination
+from church_task_manager.bulk import update_rows
+
+from .graph import invalidate_graph
+from .models import Task
+from .ordering import COLUMN_ORDERING, ORDER_GAP, order_between
+
+CARDS_PER_COLUMN = 50
+
+# Most events a change feed poll patches in place before asking for a reload
+CHANGES_LIMIT = 200
+
+# Fields needed to render a kanban card (see tasks/partials/task_card.html)
+CARD_FIELDS = (
+    'id', 'board_id', 'title', 'status', 'priority', 'progress',
+    'due_date', 'order', 'created_at', 'updated_at', 'created_by_id',
+    'assigned_to__id', 'assigned_to__first_name',
+)
+
+CARD_ORDERING = COLUMN_ORDERING
+
+
+def board_tasks_for(user, board):
+    """Tasks on a board that the user is allowed to see"""
+    tasks = Task.objects.filter(board=board)
+    if not user.is_admin() and board.project.created_by_id != user.id:
+        tasks = tasks.filter(assigned_to=user)
+    return tasks
+
+
+def card_queryset(tasks):
+    """Restrict a task queryset to the slim card projection"""
+    return tasks.select_related('assigned_to').only(*CARD_FIELDS)
+
+
+def encode_cursor(task):
+    """Build an opaque cursor pointing just after the given card"""
+    return pagination.encode_cursor(task, CARD_ORDERING)
+
+
+def board_queryset(tasks, per_column=CARDS_PER_COLUMN):
+    """The first cards of every status column, with each column's total"""
+    return card_queryset(tasks).annotate(
+        column_position=Window(
+            RowNumber(), partition_by=F('status'), order_by=CARD_ORDERING),
+        column_total=Window(Count('id'), partition_by=F('status')),
+    ).filter(column_position__lte=per_column).order_by('status', *CARD_ORDERING)
+
+
+def load_board(tasks, per_column=CARDS_PER_COLUMN):
+    """
+    Load the first cards of every status column in one query.
+
+    Returns a list of column dicts in Task.STATUS_CHOICES order, each with
+    the column's cards, its total card count and the cursor for the next
+    page (None when every card is already loaded).
+    """
+    rows = board_queryset(tasks, per_column)
+    grouped = {status: [] for status, _ in Task.STATUS_CHOICES}
+    totals = dict.fromkeys(grouped, 0)
+    for task in rows:
+        grouped.setdefault(task.status, []).append(task)
+        totals[task.status] = task.column_total
+
+    columns = []
+    for status, label in Task.STATUS_CHOICES:
+        cards = grouped[status]
+        has_more = totals[status] > len(cards)
+        columns.append({
+            'status': status,
+            'label': label,
+            'tasks': cards,
+            'total': totals[status],
+            'next_cursor': encode_cursor(cards[-1]) if has_more else None,
+        })
+    return columns
+
+
+def load_board_column(tasks, status, per_column=CARDS_PER_COLUMN):
+    """One column dict as built by load_board, still in a single query"""
+    columns = load_board(tasks.filter(status=status), per_column)
+    return next(column for column in columns if column['status'] == status)
+
+
+def column_queryset(tasks, status):
+    """The cards of one status column, paged over CARD_ORDERING"""
+    return card_queryset(tasks).filter(status=status)
+
+
+def load_column(tasks, status, after=None, limit=CARDS_PER_COLUMN):
+    """
+    Load one page of a single status column.
+
+    Returns (cards, next_cursor); next_cursor is None on the last page.
+    """
+    page = pagination.paginate(
+        column_queryset(tasks, status), CARD_ORDERING, after, limit)
+    return page.items, page.next_cursor
+
+
+def board_changes(user, board, since, limit=CHANGES_LIMIT):
+    """
+    Cards of a board that changed after the event cursor ``since``.
+
+    Returns a dict with the new cursor, the changed cards the user can
+    see (in column order), the ids of cards to drop from the board and
+    the column totals. ``reset`` is set instead when the client is too
+    far behind to be patched: its cursor was pruned or more than
+    ``limit`` events are pending.
+    """
+    from .models import TaskEvent
+
+    changes = {'cursor': since, 'reset': False, 'cards': [], 'removed': [],
+               'totals': None}
+    events = list(
+        TaskEvent.objects.filter(board_id=board.id, id__gt=since)
+        .order_by('id').values_list('id', 'task_id')[:limit + 1])
+    if not events:
+        return changes
+    if len(events) > limit or (
+            since and not TaskEvent.objects.filter(id=since).exists()):
+        changes.update(reset=True, cursor=TaskEvent.latest_cursor())
+        return changes
+
+    task_ids = {task_id for _, task_id in events}
+    tasks = board_tasks_for(user, board)
+    cards = list(card_queryset(tasks).filter(id__in=task_ids)
+                 .order_by('status', *CARD_ORDERING))
+    totals = dict.fromkeys(dict(Task.STATUS_CHOICES), 0)
+    totals.update(
+        tasks.order_by().values_list('status').annotate(Count('id')))
+
+    changes.update(
+        cursor=events[-1][0],
+        cards=cards,
+        removed=sorted(task_ids - {task.id for task in cards}),
+        totals=totals,
+    )
+    return changes
+
+
+class MoveError(Exception):
+    """A batch of card moves could not be applied"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _column_entries(board, status):
+    return [
+        list(row) for row in
+        Task.objects.filter(board=board, status=status)
+        .order_by(*CARD_ORDERING).values_list('id', 'assigned_to_id', 'order')
+    ]
+
+
+def apply_moves(user, moves):
+    """
+    Apply a batch of kanban moves in one transaction.
+
+    Each move is a dict with task_id, status and after, the id of the card
+    it now follows in the target column, or None for the top of the cards
+    the user can see there. Moves are applied in the given order, which
+    the board sends top to bottom, so every card named in ``after`` is
+    already in its final place. A moved card takes the
+    midpoint of its new neighbours' sparse order keys, so each move writes
+    one row; a column is renumbered only when that gap is exhausted.
+    Returns the number of rows written.
+    """
+    from collections import Counter
+    from django.db import transaction
+    from django.utils import timezone
+    from notifications.models import DueDateRecheck, NotificationOutbox
+    from .models import TaskCounter, TaskEvent
+
+    statuses = dict(Task.STATUS_CHOICES)
+    try:
+        moves = [(int(move['task_id']), move['status'],
+                  None if move['after'] is None else int(move['after']))
+                 for move in moves]
+    except (KeyError, TypeError, ValueError):
+        raise MoveError('Each move needs task_id, status and after')
+    if any(status not in statuses for _, status, _ in moves):
+        raise MoveError('Unknown status')
+    if any(task_id == after for task_id, _, after in moves):
+        raise MoveError('A card cannot follow itself')
+
+    with transaction.atomic():
+        tasks = Task.objects.select_related('board__project').select_for_update(
+            of=('self',)).in_bulk({task_id for task_id, _, _ in moves})
+        if len(tasks) != len({task_id for task_id, _, _ in moves}):
+            raise MoveError('Task not found', status=404)
+        for task in tasks.values():
+            if not user.is_admin() and task.assigned_to_id != user.id:
+                raise MoveError('Permission denied', status=403)
+
+        # (board_id, status) -> [[task_id, assigned_to_id, order], ...]
+        columns = {}
+        # task_id -> new order key for rows that have to be written
+        new_orders = {}
+        original_status = {task.id: task.status for task in tasks.values()}
+
+        def column(board, status):
+            key = (board.id, status)
+            if key not in columns:
+                columns[key] = _column_entries(board, status)
+            return columns[key]
+
+        for task_id, status, after_id in moves:
+            task = tasks[task_id]
+            board = task.board
+            source = column(board, task.status)
+            entry = next(item for item in source if item[0] == task_id)
+            source.remove(entry)
+
+            target = column(board, status)
+            if after_id is not None:
+                previous = next(
+                    (item for item in target if item[0] == after_id), None)
+                if previous is None:
+                    # Moved or deleted by someone else since the page loaded
+                    raise MoveError('The board has changed, reload it', status=409)
+                index = target.index(previous) + 1
+            elif user.is_admin() or board.project.created_by_id == user.id:
+                index = 0
+            else:
+                visible = [item for item in target if item[1] == user.id]
+                index = target.index(visible[0]) if visible else len(target)
+            target.insert(index, entry)
+            task.status = status
+
+            before = target[index - 1][2] if index > 0 else None
+            after = target[index + 1][2] if index + 1 < len(target) else None
+            order = order_between(before, after)
+            if order is None:
+                # Out of room between the neighbours: renumber the column
+                for rank, item in enumerate(target, start=1):
+                    if item[2] != rank * ORDER_GAP:
+                        item[2] = rank * ORDER_GAP
+                        new_orders[item[0]] = item[2]
+            else:
+                entry[2] = order
+                new_orders[task_id] = order
+
+        now = timezone.now()
+        deltas = Counter()
+        moved, reordered = [], []
+        for task in tasks.values():
+            if original_status[task.id] == task.status:
+                continue
+            if task.status == 'completed':
+                task.progress = 100
+            for key in TaskCounter.keys_for(
+                    task.board.project_id, task.board_id, task.assigned_to_id,
+                    original_status[task.id]):
+                deltas[key] -= 1
+            for key in TaskCounter.keys_for(
+                    task.board.project_id, task.board_id, task.assigned_to_id,
+                    task.status):
+                deltas[key] += 1
+            task.order = new_orders.pop(task.id, task.order)
+            task.updated_at = now
+            moved.append(task)
+        for task_id, order in new_orders.items():
+            task = tasks.get(task_id) or Task(id=task_id)
+            task.order = order
+            task.updated_at = now
+            reordered.append(task)
+
+        Task.objects.bulk_update(
+            moved, ['status', 'order', 'progress', 'updated_at'],
+            batch_size=500)
+        # A renumbered column can be thousands of rows
+        update_rows(reordered, ['order', 'updated_at'])
+        TaskCounter.apply(deltas)
+        # bulk_update skips the signal that queues completed notifications
+        NotificationOutbox.queue(
+            [(task, False, original_status[task.id]) for task in moved])
+        DueDateRecheck.queue(
+            [(task, original_status[task.id], task.due_date) for task in moved])
+        board_of = {item[0]: board_id
+                    for (board_id, _), items in columns.items() for item in items}
+        TaskEvent.record('updated', [
+            (board_of[task.id], task.id) for task in moved + reordered])
+        if moved:
+            invalidate_graph(*{task.board.project_id for task in moved})
+    return len(moved) + len(reordered)
@@ -0,0 +1,170 @@
+"""
+Live kanban updates over Server-Sent Events.
+
+Every worker process runs one broker on its event loop. While at least
+one browser is connected, the broker tails the task_events table and
+wakes the streams of the boards that changed. Because every process
+writes its changes to that table, this also fans events out across
+processes. Writes made in the same process wake the broker as soon as
+they commit, so it does not have to wait for the next poll. Each stream
+then sends its client the board_changes payload the polling feed uses.
+
+The endpoint needs the ASGI entry point (see start.sh). Under WSGI each
+open stream would pin a worker, so it is gated by settings.LIVE_UPDATES.
+"""
+
+import asyncio
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections, connection
+
+logger = logging.getLogger(__name__)
+
+# Seconds between reads of the event table while clients are connected
+LIVE_POLL_INTERVAL = 0.05
+
+# Seconds between keep-alive comments on an idle stream
+LIVE_KEEPALIVE_INTERVAL = 15
+
+
+class BoardBroker:
+    """In-process pub/sub of board change notifications"""
+
+    def __init__(self):
+        self._loop = None
+        self._subscribers = {}
+        self._wakeup = None
+        self._pump = None
+        self._ready = None
+        # One thread, so the pump keeps a single database connection
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix='board-broker')
+
+    def _bind(self):
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._subscribers = {}
+            self._wakeup = asyncio.Event()
+            self._pump = None
+
+    def subscribe(self, board_id):
+        """Queue that receives the id of every new event on the board"""
+        self._bind()
+        queue = asyncio.Queue()
+        self._subscribers.setdefault(board_id, set()).add(queue)
+        if self._pump is None or self._pump.done():
+            self._ready = asyncio.Event()
+            self._pump = self._loop.create_task(self._run(self._ready))
+        return queue
+
+    async def ready(self):
+        """Wait until events after this point are sure to be delivered"""
+        await self._ready.wait()
+
+    def unsubscribe(self, board_id, queue):
+        queues = self._subscribers.get(board_id, set())
+        queues.discard(queue)
+        if not queues:
+            self._subscribers.pop(board_id, None)
+
+    def wakeup(self):
+        """Ask the pump to read new events now; safe from any thread"""
+        loop, event = self._loop, self._wakeup
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(event.set)
+
+    def _read_events(self, after):
+        from .models import TaskEvent
+
+        if after is None:
+            return TaskEvent.latest_cursor(), []
+        return after, list(
+            TaskEvent.objects.filter(id__gt=after).order_by('id')
+            .values_list('id', 'board_id')[:1000])
+
+    async def _run(self, ready):
+        loop = asyncio.get_running_loop()
+        after = None
+        while self._subscribers:
+            try:
+                after, events = await loop.run_in_executor(
+                    self._executor, self._read_events, after)
+                ready.set()
+            except Exception:
+                logger.exception('Reading task events failed')
+                # Reconnect on the next read
+                await loop.run_in_executor(self._executor, connection.close)
+                events = []
+            latest = {}
+            for event_id, board_id in events:
+                latest[board_id] = event_id
+                after = event_id
+            for board_id, event_id in latest.items():
+                for queue in self._subscribers.get(board_id, ()):
+                    queue.put_nowait(event_id)
+            if len(events) == 1000:
+                continue
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(
+                    self._wakeup.wait(), LIVE_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+
+broker = BoardBroker()
+
+
+def format_event(event, data, event_id=None):
+    lines = [f'id: {event_id}'] if event_id is not None else []
+    lines += [f'event: {event}', f'data: {json.dumps(data)}']
+    return '\n'.join(lines) + '\n\n'
+
+
+async def board_stream(board, since, render_changes):
+    """
+    Yield SSE messages for a board until the client disconnects.
+
+    render_changes(since) is a sync callable returning the JSON-ready
+    change payload of the board after the given cursor.
+    """
+    def render_in_thread(cursor):
+        close_old_connections()
+        return render_changes(cursor)
+
+    # Streams render in parallel threads so one slow client does not hold
+    # up the others
+    render = sync_to_async(render_in_thread, thread_sensitive=False)
+    queue = broker.subscribe(board.id)
+    try:
+        # Catch up on anything the broker will not report
+        await broker.ready()
+        changes = await render(since)
+        if changes['cards'] or changes['removed'] or changes['reset']:
+            since = changes['cursor']
+            yield format_event('changes', changes, since)
+        else:
+            yield ': connected\n\n'
+
+        while True:
+            try:
+                await asyncio.wait_for(queue.get(), LIVE_KEEPALIVE_INTERVAL)
+            except asyncio.TimeoutError:
+                yield ': keep-alive\n\n'
+                continue
+            # Coalesce notifications that queued up while rendering
+            while not queue.empty():
+                queue.get_nowait()
+            changes = await render(since)
+            if changes['cursor'] != since or changes['reset']:
+                since = changes['cursor']
+                yield format_event('changes', changes, since)
+            if changes['reset']:
+                return
+    finally:
+        broker.unsubscribe(board.id, queue)
@@ -0,0 +1,33 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from tasks.archive import ARCHIVE_BATCH_SIZE, archivable_tasks, archive_completed_tasks
+
+
+class Command(BaseCommand):
+    help = ('Move completed tasks that have not changed for a while, with '
+            'their dependencies and notifications, into the archive tables')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=90,
+            help='Archive tasks completed more than N days ago (default: 90)')
+        parser.add_argument(
+            '--batch-size', type=int, default=ARCHIVE_BATCH_SIZE,
+            help=f'Tasks moved per transaction (default: {ARCHIVE_BATCH_SIZE})')
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Only count the tasks that would be archived')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        if options['dry_run']:
+            count = archivable_tasks(cutoff).count()
+            self.stdout.write(self.style.SUCCESS(f'{count} tasks would be archived'))
+            return
+
+        archived = 0
+        for archived in archive_completed_tasks(cutoff, options['batch_size']):
+            self.stdout.write(f'Archived {archived} tasks...')
+        self.stdout.write(self.style.SUCCESS(f'Archived {archived} tasks'))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from tasks.query_plans import explain, hot_queries
+
+
+class Command(BaseCommand):
+    help = ('Run the hot view queries through EXPLAIN QUERY PLAN and fail '
+            'if any of them falls back to a full table scan (SQLite only)')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('check_query_plans only supports SQLite')
+
+        failures = []
+        for name, sql, params in hot_queries():
+            details, scans = explain(sql, params)
+            if scans:
+                failures.append(name)
+                self.stdout.write(self.style.ERROR(f'FAIL {name}'))
+                for detail in details:
+                    self.stdout.write(f'    {detail}')
+            else:
+                self.stdout.write(f'ok   {name}')
+
+        if failures:
+            raise CommandError(
+                f'{len(failures)} hot queries scan a whole table: '
+                + ', '.join(failures))
+        self.stdout.write(self.style.SUCCESS('All hot queries use indexes'))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from tasks.recurrence import materialize, window_end
+
+
+class Command(BaseCommand):
+    help = ('Create the occurrences of recurring tasks due within the rolling '
+            'window; run daily so the window keeps moving forward')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Tasks inserted per query (default: 500)')
+
+    def handle(self, *args, **options):
+        until = window_end()
+        created = materialize(until=until, batch_size=options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {created} recurring task occurrences due by {until}'))
@@ -0,0 +1,55 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from tasks.importer import (
+    IMPORT_BATCH_SIZE, ImportFormatError, TaskImporter, format_for,
+    read_rows, text_stream)
+
+
+class Command(BaseCommand):
+    help = ('Import tasks from a CSV or JSON Lines file; invalid rows are '
+            'skipped and reported with their line numbers')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import (.csv or .jsonl)')
+        parser.add_argument(
+            '--format', choices=['csv', 'jsonl'],
+            help='File format (default: taken from the file extension)')
+        parser.add_argument(
+            '--user', required=True,
+            help='Username recorded as creator of rows without a created_by')
+        parser.add_argument(
+            '--batch-size', type=int, default=IMPORT_BATCH_SIZE,
+            help=f'Tasks inserted per transaction (default: {IMPORT_BATCH_SIZE})')
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Only validate the file')
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(username=options['user'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'Unknown user "{options["user"]}"')
+
+        importer = TaskImporter(
+            user, batch_size=options['batch_size'], dry_run=options['dry_run'])
+        started = time.monotonic()
+        try:
+            fmt = options['format'] or format_for(options['path'])
+            with open(options['path'], 'rb') as binary:
+                importer.run(read_rows(text_stream(binary), fmt))
+        except (ImportFormatError, OSError, UnicodeDecodeError) as exc:
+            raise CommandError(str(exc))
+
+        for line_number, message in importer.errors:
+            self.stderr.write(f'line {line_number}: {message}')
+        if importer.error_count > len(importer.errors):
+            self.stderr.write(
+                f'... and {importer.error_count - len(importer.errors)} more')
+
+        verb = 'Validated' if options['dry_run'] else 'Imported'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {importer.created} tasks in '
+            f'{time.monotonic() - started:.1f}s; '
+            f'{importer.error_count} rows rejected'))
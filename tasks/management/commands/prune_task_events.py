@@ -0,0 +1,26 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from tasks.models import TaskEvent
+
+
+class Command(BaseCommand):
+    help = ('Delete change feed events older than the retention period; '
+            'boards left open longer than that reload on their next poll')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=7,
+            help='Keep events from the last N days (default: 7)')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        # Never delete the newest event: its id is the cursor handed out
+        # to freshly loaded boards
+        latest = TaskEvent.latest_cursor()
+        deleted, _ = TaskEvent.objects.filter(
+            created_at__lt=cutoff, id__lt=latest).delete()
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Deleted {deleted} task events'))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from tasks.models import Task
+from tasks.ordering import COLUMN_ORDERING, needs_rebalance, rebalance_column
+
+
+class Command(BaseCommand):
+    help = 'Renumber kanban columns whose order keys have run out of gaps'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Renumber every column, not only the exhausted ones')
+
+    def handle(self, *args, **options):
+        columns = Task.objects.values_list(
+            'board_id', 'status').distinct().order_by()
+
+        rebalanced = written = 0
+        for board_id, status in columns:
+            if not options['all']:
+                orders = list(Task.objects.filter(
+                    board_id=board_id, status=status
+                ).order_by(*COLUMN_ORDERING).values_list('order', flat=True))
+                if not needs_rebalance(orders):
+                    continue
+            written += rebalance_column(board_id, status)
+            rebalanced += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Rebalanced {rebalanced} columns ({written} tasks updated)')
+        )
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from tasks.models import TaskCounter
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the denormalized task counters from the tasks table'
+
+    def handle(self, *args, **options):
+        count = TaskCounter.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(f'Rebuilt {count} task counter rows')
+        )
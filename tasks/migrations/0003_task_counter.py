@@ -0,0 +1,96 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:04
+
+from django.db import migrations, models
+
+
+def build_counters(apps, schema_editor):
+    from django.db.models import Count, Q
+    from django.utils import timezone
+
+    Task = apps.get_model("tasks", "Task")
+    TaskCounter = apps.get_model("tasks", "TaskCounter")
+
+    overdue = Q(due_date__lt=timezone.now().date()) & ~Q(status="completed")
+    counters = []
+    for scope_type, field in (
+        ("project", "board__project_id"),
+        ("board", "board_id"),
+        ("user", "assigned_to_id"),
+    ):
+        rows = (
+            Task.objects.filter(**{f"{field}__isnull": False})
+            .values(field, "status")
+            .annotate(total=Count("id"), overdue=Count("id", filter=overdue))
+            .order_by()
+        )
+        for row in rows:
+            for is_overdue, count in (
+                (False, row["total"] - row["overdue"]),
+                (True, row["overdue"]),
+            ):
+                if count:
+                    counters.append(
+                        TaskCounter(
+                            scope_type=scope_type,
+                            scope_id=row[field],
+                            status=row["status"],
+                            is_overdue=is_overdue,
+                            count=count,
+                        )
+                    )
+    TaskCounter.objects.bulk_create(counters, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tasks", "0002_task_notes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TaskCounter",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "scope_type",
+                    models.CharField(
+                        choices=[
+                            ("project", "Project"),
+                            ("board", "Board"),
+                            ("user", "User"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("scope_id", models.BigIntegerField()),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("todo", "To Do"),
+                            ("in_progress", "In Progress"),
+                            ("waiting", "Waiting/Blocked"),
+                            ("completed", "Completed"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("is_overdue", models.BooleanField(default=False)),
+                ("count", models.IntegerField(default=0)),
+            ],
+            options={
+                "db_table": "task_counters",
+                "unique_together": {("scope_type", "scope_id", "status", "is_overdue")},
+            },
+        ),
+        migrations.RunPython(build_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:06
+
+from django.db import migrations
+
+ORDER_GAP = 1024
+
+
+def spread_task_order(apps, schema_editor):
+    """Give every existing column ORDER_GAP-spaced order keys"""
+    Task = apps.get_model("tasks", "Task")
+
+    columns = {}
+    for task_id, board_id, status in Task.objects.order_by(
+        "board_id", "status", "order", "-created_at", "-id"
+    ).values_list("id", "board_id", "status"):
+        columns.setdefault((board_id, status), []).append(task_id)
+
+    changed = []
+    for task_ids in columns.values():
+        for index, task_id in enumerate(task_ids, start=1):
+            changed.append(Task(id=task_id, order=index * ORDER_GAP))
+    Task.objects.bulk_update(changed, ["order"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tasks", "0003_task_counter"),
+    ]
+
+    operations = [
+        migrations.RunPython(spread_task_order, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:09
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("projects", "0003_remove_project_team"),
+        ("tasks", "0004_sparse_task_order"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(
+                fields=["board", "start_date", "due_date"], name="tasks_board_dates_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("projects", "0003_remove_project_team"),
+        ("tasks", "0005_task_board_dates_index"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(
+                fields=["board", "status", "order"], name="tasks_board_status_order_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(
+                fields=["assigned_to", "status"], name="tasks_assignee_status_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(
+                fields=["due_date", "status"], name="tasks_due_status_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,26 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    from tasks.search import install_search_index
+
+    install_search_index(schema_editor.connection)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for trigger in ("tasks_fts_insert", "tasks_fts_delete", "tasks_fts_update"):
+        schema_editor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    schema_editor.execute("DROP TABLE IF EXISTS tasks_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tasks", "0006_task_composite_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tasks", "0007_task_search_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TaskEvent",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                ("board_id", models.BigIntegerField()),
+                ("task_id", models.BigIntegerField()),
+                (
+                    "action",
+                    models.CharField(
+                        choices=[
+                            ("created", "Created"),
+                            ("updated", "Updated"),
+                            ("deleted", "Deleted"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "db_table": "task_events",
+                "indexes": [
+                    models.Index(
+                        fields=["board_id", "id"], name="task_events_board_id_idx"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:26
+
+from django.db import migrations
+
+
+def clear_counters(apps, schema_editor):
+    """The overdue and not-overdue rows of a key would collide once merged"""
+    apps.get_model("tasks", "TaskCounter").objects.all().delete()
+
+
+def build_counters(apps, schema_editor):
+    from django.db.models import Count
+
+    Task = apps.get_model("tasks", "Task")
+    TaskCounter = apps.get_model("tasks", "TaskCounter")
+
+    counters = []
+    for scope_type, field in (
+        ("project", "board__project_id"),
+        ("board", "board_id"),
+        ("user", "assigned_to_id"),
+    ):
+        rows = (
+            Task.objects.filter(**{f"{field}__isnull": False})
+            .values(field, "status")
+            .annotate(total=Count("id"))
+            .order_by()
+        )
+        counters += [
+            TaskCounter(
+                scope_type=scope_type,
+                scope_id=row[field],
+                status=row["status"],
+                count=row["total"],
+            )
+            for row in rows
+        ]
+    TaskCounter.objects.bulk_create(counters, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tasks", "0010_archived_task"),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_counters, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name="taskcounter",
+            unique_together={("scope_type", "scope_id", "status")},
+        ),
+        migrations.RemoveField(
+            model_name="taskcounter",
+            name="is_overdue",
+        ),
+        migrations.RunPython(build_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:30
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("projects", "0005_project_created_index"),
+        ("tasks", "0011_task_counter_drop_overdue"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(fields=["created_at"], name="tasks_created_idx"),
+        ),
+    ]
@@ -1,7 +1,7 @@
 # tasks/models.py
 from django.db import models
 from django.conf import settings
-from projects.models import Board
+from projects.models import Board, Project
 
 
 class Task(models.Model):
@@ -46,14 +46,52 @@ class Task(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     order = models.IntegerField(default=0)
+    # Set on occurrences generated from a recurrence rule
+    recurrence = models.ForeignKey(
+        'RecurringTask',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='occurrences'
+    )
+    occurrence_date = models.DateField(null=True, blank=True)
 
     class Meta:
         db_table = 'tasks'
         ordering = ['order', '-created_at']
+        constraints = [
+            # A rule never materializes the same date twice
+            models.UniqueConstraint(
+                fields=['recurrence', 'occurrence_date'],
+                name='tasks_recurrence_date_uniq'),
+        ]
+        indexes = [
+            # Kanban columns (see tasks.kanban)
+            models.Index(fields=['board', 'status', 'order'],
+                         name='tasks_board_status_order_idx'),
+            # "My tasks" on the dashboard, reports and counters
+            models.Index(fields=['assigned_to', 'status'],
+                         name='tasks_assignee_status_idx'),
+            # Overdue and due-soon scans
+            models.Index(fields=['due_date', 'status'],
+                         name='tasks_due_status_idx'),
+            # Gantt window queries (see tasks.api.gantt_data)
+            models.Index(fields=['board', 'start_date', 'due_date'],
+                         name='tasks_board_dates_idx'),
+            # Newest tasks across all boards on the admin dashboard
+            models.Index(fields=['created_at'], name='tasks_created_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        if self._state.adding and not self.order:
+            # New cards go to the top of their column (see tasks.ordering)
+            from .ordering import top_of_column_order
+            self.order = top_of_column_order(self.board_id, self.status)
+        super().save(*args, **kwargs)
+
     def is_overdue(self):
         if self.due_date and self.status != 'completed':
             from django.utils import timezone
@@ -61,6 +99,61 @@ class Task(models.Model):
         return False
 
 
+class RecurringTask(models.Model):
+    """
+    Template of a task that repeats on a schedule.
+
+    Occurrences are ordinary Task rows, materialized only for a rolling
+    window ahead of today (settings.RECURRING_TASK_WINDOW_DAYS) by
+    tasks.recurrence and the daily ``generate_recurring_tasks`` command.
+    ``generated_until`` is the last date already materialized.
+    """
+    FREQUENCY_CHOICES = [
+        ('daily', 'Daily'),
+        ('weekly', 'Weekly'),
+        ('monthly', 'Monthly'),
+        ('yearly', 'Yearly'),
+    ]
+
+    board = models.ForeignKey(
+        Board, on_delete=models.CASCADE, related_name='recurring_tasks')
+    title = models.CharField(max_length=200)
+    description = models.TextField(blank=True)
+    assigned_to = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='recurring_tasks'
+    )
+    priority = models.CharField(
+        max_length=10, choices=Task.PRIORITY_CHOICES, default='medium')
+    frequency = models.CharField(max_length=10, choices=FREQUENCY_CHOICES)
+    interval = models.PositiveSmallIntegerField(
+        default=1, help_text="Repeat every N days, weeks, months or years")
+    starts_on = models.DateField(help_text="Due date of the first occurrence")
+    ends_on = models.DateField(
+        null=True, blank=True, help_text="No occurrences are due after this date")
+    lead_days = models.PositiveSmallIntegerField(
+        default=0, help_text="Each occurrence starts this many days before it is due")
+    is_active = models.BooleanField(default=True)
+    generated_until = models.DateField(null=True, blank=True, editable=False)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='created_recurring_tasks'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'recurring_tasks'
+        ordering = ['title']
+
+    def __str__(self):
+        return f"{self.title} ({self.get_frequency_display().lower()})"
+
+
 class TaskDependency(models.Model):
     task = models.ForeignKey(
         Task, on_delete=models.CASCADE, related_name='dependencies')
@@ -73,3 +166,280 @@ class TaskDependency(models.Model):
 
     def __str__(self):
         return f"{self.task.title} depends on {self.depends_on.title}"
+
+    def clean(self):
+        from django.core.exceptions import ValidationError
+        from .graph import DependencyGraph
+
+        if not self.task_id or not self.depends_on_id:
+            return
+        if self.task_id == self.depends_on_id:
+            raise ValidationError('A task cannot depend on itself.')
+
+        project_id = self.task.board.project_id
+        if self.depends_on.board.project_id != project_id:
+            raise ValidationError(
+                'A task can only depend on tasks in the same project.')
+        # Read fresh: a graph cached by another process may miss edges
+        if DependencyGraph.load(project_id).would_create_cycle(
+                self.task_id, self.depends_on_id):
+            raise ValidationError(
+                f'"{self.depends_on}" already depends on "{self.task}"; '
+                'this dependency would create a cycle.')
+
+    def save(self, *args, **kwargs):
+        from django.db import transaction
+
+        # Cycles are rejected on every insert, not only through forms. The
+        # project row is locked first, so two edges inserted at the same
+        # time cannot close a cycle between them.
+        if not self._state.adding or not self.task_id:
+            return super().save(*args, **kwargs)
+        with transaction.atomic():
+            list(Project.objects.select_for_update().filter(
+                pk=self.task.board.project_id).values_list('id'))
+            self.clean()
+            super().save(*args, **kwargs)
+
+
+class ArchivedTask(models.Model):
+    """
+    A completed task moved out of the live ``tasks`` table by
+    ``archive_tasks`` (see tasks.archive). It keeps its original id, so
+    archived dependencies and notifications still point at it. Archived
+    tasks count in reports filtered by date, but not in the task counters
+    or on boards.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    board = models.ForeignKey(
+        Board, on_delete=models.CASCADE, related_name='archived_tasks')
+    title = models.CharField(max_length=200)
+    description = models.TextField(blank=True)
+    notes = models.TextField(blank=True)
+    assigned_to = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='archived_assigned_tasks'
+    )
+    status = models.CharField(max_length=20, choices=Task.STATUS_CHOICES)
+    priority = models.CharField(max_length=10, choices=Task.PRIORITY_CHOICES)
+    progress = models.IntegerField(default=0)
+    due_date = models.DateField(null=True, blank=True)
+    start_date = models.DateField(null=True, blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='archived_created_tasks'
+    )
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    order = models.IntegerField(default=0)
+    recurrence = models.ForeignKey(
+        RecurringTask,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='archived_occurrences'
+    )
+    occurrence_date = models.DateField(null=True, blank=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'archived_tasks'
+        ordering = ['-created_at']
+        indexes = [
+            # Reports filter by creation date
+            models.Index(fields=['created_at'], name='archived_tasks_created_idx'),
+        ]
+
+    def __str__(self):
+        return self.title
+
+
+class ArchivedTaskDependency(models.Model):
+    """A dependency that involved an archived task; either side may be archived"""
+    task_id = models.BigIntegerField()
+    depends_on_id = models.BigIntegerField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'archived_task_dependencies'
+        unique_together = ['task_id', 'depends_on_id']
+
+    def __str__(self):
+        return f"{self.task_id} depended on {self.depends_on_id}"
+
+
+class TaskCounter(models.Model):
+    """
+    Denormalized task counts per scope (project, board or assignee) and
+    status.
+
+    Rows are adjusted incrementally by the signal handlers in tasks.signals
+    whenever a task is created, changed or deleted. Run
+    ``rebuild_task_counters`` after any bulk change made outside the ORM to
+    repair drift. Overdue counts depend on today's date, so they are not
+    stored here; they are queried from tasks_due_status_idx instead.
+    """
+    SCOPE_CHOICES = [
+        ('project', 'Project'),
+        ('board', 'Board'),
+        ('user', 'User'),
+    ]
+
+    scope_type = models.CharField(max_length=10, choices=SCOPE_CHOICES)
+    scope_id = models.BigIntegerField()
+    status = models.CharField(max_length=20, choices=Task.STATUS_CHOICES)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'task_counters'
+        unique_together = ['scope_type', 'scope_id', 'status']
+
+    def __str__(self):
+        return f"{self.scope_type}:{self.scope_id} {self.status} = {self.count}"
+
+    @staticmethod
+    def keys_for(project_id, board_id, assigned_to_id, status):
+        """Counter keys a task with the given state contributes to"""
+        keys = [
+            ('project', project_id, status),
+            ('board', board_id, status),
+        ]
+        if assigned_to_id:
+            keys.append(('user', assigned_to_id, status))
+        return keys
+
+    @classmethod
+    def apply(cls, deltas):
+        """Apply a mapping of counter key -> delta with atomic updates"""
+        from django.db.models import F
+
+        for (scope_type, scope_id, status), delta in deltas.items():
+            if not delta:
+                continue
+            lookup = {
+                'scope_type': scope_type,
+                'scope_id': scope_id,
+                'status': status,
+            }
+            updated = cls.objects.filter(**lookup).update(count=F('count') + delta)
+            if not updated and delta > 0:
+                counter, created = cls.objects.get_or_create(
+                    **lookup, defaults={'count': delta})
+                if not created:
+                    cls.objects.filter(pk=counter.pk).update(
+                        count=F('count') + delta)
+
+    @classmethod
+    def rebuild(cls):
+        """Recount every scope from the tasks table; returns rows written"""
+        from django.db import transaction
+        from django.db.models import Count
+
+        scopes = [
+            ('project', 'board__project_id'),
+            ('board', 'board_id'),
+            ('user', 'assigned_to_id'),
+        ]
+
+        counters = []
+        for scope_type, field in scopes:
+            rows = Task.objects.filter(**{f'{field}__isnull': False}).values(
+                field, 'status'
+            ).annotate(total=Count('id')).order_by()
+            for row in rows:
+                counters.append(cls(
+                    scope_type=scope_type,
+                    scope_id=row[field],
+                    status=row['status'],
+                    count=row['total'],
+                ))
+
+        with transaction.atomic():
+            cls.objects.all().delete()
+            cls.objects.bulk_create(counters, batch_size=1000)
+        return len(counters)
+
+    @classmethod
+    def status_totals(cls, scope_type, scope_ids=None):
+        """
+        Task counts per status, summed over every scope of the given type
+        or only over scope_ids: {status: count}
+        """
+        from django.db.models import Sum
+
+        counters = cls.objects.filter(scope_type=scope_type)
+        if scope_ids is not None:
+            counters = counters.filter(scope_id__in=scope_ids)
+        totals = {status: 0 for status, _ in Task.STATUS_CHOICES}
+        for row in counters.values('status').annotate(total=Sum('count')).order_by():
+            totals[row['status']] = row['total']
+        return totals
+
+    @classmethod
+    def status_totals_by_scope(cls, scope_type, scope_ids=None):
+        """Task counts per status for each scope: {scope_id: {status: count}}"""
+        from django.db.models import Sum
+
+        counters = cls.objects.filter(scope_type=scope_type)
+        if scope_ids is not None:
+            counters = counters.filter(scope_id__in=scope_ids)
+        totals = {}
+        rows = counters.values('scope_id', 'status').annotate(
+            total=Sum('count')).order_by()
+        for row in rows:
+            scope = totals.setdefault(
+                row['scope_id'], {status: 0 for status, _ in Task.STATUS_CHOICES})
+            scope[row['status']] = row['total']
+        return totals
+
+
+class TaskEvent(models.Model):
+    """
+    Append-only log of task changes per board.
+
+    The auto-increment id doubles as the sync cursor of the kanban change
+    feed: a client that saw event N asks for everything after N. Rows are
+    written by the signal handlers in tasks.signals and by the bulk code
+    paths that bypass them. ``prune_task_events`` trims old rows; clients
+    whose cursor falls before the oldest row are told to reload.
+    """
+    ACTION_CHOICES = [
+        ('created', 'Created'),
+        ('updated', 'Updated'),
+        ('deleted', 'Deleted'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    board_id = models.BigIntegerField()
+    task_id = models.BigIntegerField()
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'task_events'
+        indexes = [
+            models.Index(fields=['board_id', 'id'], name='task_events_board_id_idx'),
+        ]
+
+    def __str__(self):
+        return f"#{self.id} task {self.task_id} {self.action} on board {self.board_id}"
+
+    @classmethod
+    def record(cls, action, pairs):
+        """Log one event per (board_id, task_id) pair with a single insert"""
+        events = [cls(board_id=board_id, task_id=task_id, action=action)
+                  for board_id, task_id in pairs]
+        if events:
+            from django.db import transaction
+            from .live import broker
+
+            cls.objects.bulk_create(events)
+            transaction.on_commit(broker.wakeup)
+
+    @classmethod
+    def latest_cursor(cls):
+        return cls.objects.aggregate(latest=models.Max('id'))['latest'] or 0
@@ -0,0 +1,80 @@
+"""
+Sparse ordering keys for kanban columns.
+
+Cards in a (board, status) column are ordered by Task.order, spaced
+ORDER_GAP apart. Moving a card between two neighbours takes the midpoint
+of their keys, so a move writes a single row; a column is only renumbered
+when two neighbours have no integer left between them.
+"""
+
+from django.db import transaction
+from django.db.models import F, Max, Min
+from django.utils import timezone
+
+from church_task_manager.bulk import update_rows
+
+ORDER_GAP = 1024
+
+# Card order within a column; id breaks ties between equal keys
+COLUMN_ORDERING = (F('order').asc(), F('created_at').desc(), F('id').desc())
+
+
+def top_of_column_order(board_id, status):
+    """Key placing a new card above every card in the column"""
+    from .models import Task
+
+    lowest = Task.objects.filter(board_id=board_id, status=status).aggregate(
+        lowest=Min('order'))['lowest']
+    return ORDER_GAP if lowest is None else lowest - ORDER_GAP
+
+
+def bottom_of_column_order(board_id, status):
+    """Key placing a new card below every card in the column"""
+    from .models import Task
+
+    highest = Task.objects.filter(board_id=board_id, status=status).aggregate(
+        highest=Max('order'))['highest']
+    return ORDER_GAP if highest is None else highest + ORDER_GAP
+
+
+def order_between(before, after):
+    """
+    Key strictly between two neighbouring keys (None meaning the column
+    edge), or None when the neighbours leave no room.
+    """
+    if before is None and after is None:
+        return ORDER_GAP
+    if before is None:
+        return after - ORDER_GAP
+    if after is None:
+        return before + ORDER_GAP
+    if after - before > 1:
+        return (before + after) // 2
+    return None
+
+
+def needs_rebalance(orders):
+    """True when some neighbours in an ordered key list have no gap left"""
+    return any(after - before <= 1 for before, after in zip(orders, orders[1:]))
+
+
+def rebalance_column(board_id, status):
+    """Renumber a column ORDER_GAP apart; returns the number of rows written"""
+    from .models import Task, TaskEvent
+
+    with transaction.atomic():
+        column = list(
+            Task.objects.select_for_update().filter(
+                board_id=board_id, status=status
+            ).order_by(*COLUMN_ORDERING).only('id', 'order')
+        )
+        now = timezone.now()
+        changed = []
+        for index, task in enumerate(column, start=1):
+            if task.order != index * ORDER_GAP:
+                task.order = index * ORDER_GAP
+                task.updated_at = now
+                changed.append(task)
+        update_rows(changed, ['order', 'updated_at'])
+        TaskEvent.record('updated', [(board_id, task.id) for task in changed])
+    return len(changed)
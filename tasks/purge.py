@@ -0,0 +1,79 @@
+"""
+Set-based deletion of tasks and the rows that hang off them.
+
+Deleting through the ORM sends pre/post_delete for every task and walks
+every cascade in Python. These helpers delete a chunk of ids with a few
+plain DELETE statements instead and do the bookkeeping the signal
+handlers would have done (task and notification counters, the change
+feed, cached graphs and schedules).
+Callers keep each chunk in a short transaction of its own.
+"""
+
+from collections import Counter
+
+from django.db import connection
+from django.db.models import Q
+
+from .graph import invalidate_graph
+from .models import (
+    ArchivedTask, ArchivedTaskDependency, Task, TaskCounter, TaskDependency,
+    TaskEvent)
+from .scheduling import invalidate_schedule
+
+
+def delete_rows(table, column, ids):
+    """DELETE FROM table WHERE column IN ids, without any signals"""
+    if not ids:
+        return 0
+    placeholders = ', '.join(['%s'] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {connection.ops.quote_name(table)} '
+            f'WHERE {connection.ops.quote_name(column)} IN ({placeholders})',
+            list(ids))
+        return cursor.rowcount
+
+
+def purge_tasks(ids):
+    """Delete live tasks with their dependencies and notifications"""
+    from notifications.models import Notification, NotificationCounter
+
+    rows = list(Task.objects.filter(id__in=ids).values_list(
+        'id', 'board__project_id', 'board_id', 'assigned_to_id', 'status'))
+    if not rows:
+        return 0
+    ids = [row[0] for row in rows]
+
+    # Children first: the foreign keys are checked at commit
+    unread_user_ids = set(Notification.objects.filter(
+        task_id__in=ids, is_read=False).values_list('user_id', flat=True))
+    delete_rows(Notification._meta.db_table, 'task_id', ids)
+    dependency_ids = list(TaskDependency.objects.filter(
+        Q(task_id__in=ids) | Q(depends_on_id__in=ids)).values_list('id', flat=True))
+    delete_rows(TaskDependency._meta.db_table, 'id', dependency_ids)
+    deleted = delete_rows(Task._meta.db_table, 'id', ids)
+
+    deltas = Counter()
+    for _, *state in rows:
+        for key in TaskCounter.keys_for(*state):
+            deltas[key] -= 1
+    TaskCounter.apply(deltas)
+    NotificationCounter.refresh(unread_user_ids)
+    TaskEvent.record('deleted', [(board_id, task_id)
+                                 for task_id, _, board_id, _, _ in rows])
+
+    project_ids = {row[1] for row in rows}
+    invalidate_graph(*project_ids)
+    invalidate_schedule(*project_ids)
+    return deleted
+
+
+def purge_archived_tasks(ids):
+    """Delete archived tasks with their archived dependencies and notifications"""
+    from notifications.models import ArchivedNotification
+
+    delete_rows(ArchivedNotification._meta.db_table, 'task_id', ids)
+    dependency_ids = list(ArchivedTaskDependency.objects.filter(
+        Q(task_id__in=ids) | Q(depends_on_id__in=ids)).values_list('id', flat=True))
+    delete_rows(ArchivedTaskDependency._meta.db_table, 'id', dependency_ids)
+    return delete_rows(ArchivedTask._meta.db_table, 'id', ids)
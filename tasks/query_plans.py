@@ -0,0 +1,104 @@
+"""
+EXPLAIN QUERY PLAN checks for the hot read paths (SQLite only).
+
+hot_queries() builds the SQL of the busiest pages through the same
+helpers the views use, for placeholder ids, so a view that drifts away
+from its index shows up here. It is run by QueryPlanTests in
+tasks/tests.py and by the ``check_query_plans`` command, which can also
+be pointed at a production-sized copy of the database.
+"""
+
+import re
+from datetime import date, datetime, timedelta, timezone
+
+from django.db import connection
+from django.db.models import Q
+
+from accounts.models import User
+from church_task_manager.pagination import encode_cursor, seek
+from notifications.models import (
+    DUE_ORDERING, DUE_STATUSES, DueDateScan, Notification, due_scan_window)
+from notifications.views import NOTIFICATION_ORDERING
+from projects.models import Board, Project
+from projects.views import PROJECT_ORDERING
+from reports.views import OVERDUE_ORDERING
+
+from .api import gantt_window
+from .kanban import (
+    CARD_ORDERING, board_queryset, board_tasks_for, column_queryset)
+from .models import Task, TaskCounter
+from .search import (
+    older_search_sql, search_sql, to_match_query, window_start_sql)
+from .views import dashboard_overdue_context, dashboard_recent_context
+
+# "SCAN tasks" (or "SCAN t" for an alias) reads the whole table; "SCAN
+# tasks USING INDEX ...", "SCAN f VIRTUAL TABLE ..." and "SEARCH ..."
+# lines are fine, and so are scans of a subquery's or CTE's own rows
+FULL_SCAN = re.compile(r'^SCAN (\w+)$')
+SUBQUERY = re.compile(r'^(?:CO-ROUTINE|MATERIALIZE) (\w+)$')
+
+
+def _sql(queryset):
+    return queryset.query.sql_with_params()
+
+
+def hot_queries():
+    """(name, sql, params) of the queries behind the busiest pages"""
+    admin = User(id=2, role='admin')
+    member = User(id=1, role='member')
+    board = Board(id=1, project=Project(id=1, created_by_id=2))
+    today = date.today()
+    now = datetime.now(timezone.utc)
+    overdue = Q(due_date__lt=today, status__in=['todo', 'in_progress', 'waiting'])
+
+    for user in (admin, member):
+        tasks = board_tasks_for(user, board)
+        yield f'kanban board ({user.role})', *_sql(board_queryset(tasks))
+        cursor = encode_cursor(
+            Task(id=1, order=1024, created_at=now), CARD_ORDERING)
+        yield f'kanban column page ({user.role})', *_sql(
+            seek(column_queryset(tasks, 'todo'), CARD_ORDERING, cursor)[:51])
+        yield f'dashboard overdue ({user.role})', *_sql(
+            dashboard_overdue_context(user)['overdue_tasks'])
+        yield f'dashboard recent ({user.role})', *_sql(
+            dashboard_recent_context(user)['recent_tasks'])
+        match = to_match_query('choir rehearsal')
+        yield f'search window ({user.role})', *window_start_sql(user, match)
+        yield f'search ({user.role})', *search_sql(user, match, 1000, (-1.5, 1))
+        yield f'search older ({user.role})', *older_search_sql(user, match, 1000)
+
+    yield 'gantt window', *_sql(
+        gantt_window([1, 2], today, today + timedelta(days=30)))
+    yield 'task counters', *_sql(TaskCounter.objects.filter(
+        scope_type='user', scope_id__in=[1]))
+    scan = DueDateScan(overdue_until=today - timedelta(days=1),
+                       due_soon_until=today + timedelta(days=1))
+    yield 'due date scan', *_sql(seek(Task.objects.filter(
+        due_scan_window(scan, today), status__in=DUE_STATUSES), DUE_ORDERING)[:2001])
+    yield 'due date scan with rechecks', *_sql(seek(Task.objects.filter(
+        due_scan_window(scan, today, [1, 2]), status__in=DUE_STATUSES),
+        DUE_ORDERING)[:2001])
+    yield 'digest pending users', *_sql(Notification.objects.filter(
+        emailed_at__isnull=True, created_at__lte=now, user_id__gt=0,
+    ).order_by('user_id').values_list('user_id', flat=True).distinct()[:100])
+    cursor = encode_cursor(Notification(id=1, created_at=now), NOTIFICATION_ORDERING)
+    yield 'notification list page', *_sql(seek(
+        Notification.objects.filter(user=member), NOTIFICATION_ORDERING, cursor)[:51])
+    cursor = encode_cursor(Task(id=1, due_date=today), OVERDUE_ORDERING)
+    yield 'report overdue page', *_sql(seek(
+        Task.objects.filter(overdue), OVERDUE_ORDERING, cursor)[:51])
+    cursor = encode_cursor(Project(id=1, created_at=now), PROJECT_ORDERING)
+    yield 'project list page', *_sql(seek(
+        Project.objects.live().filter(is_active=True), PROJECT_ORDERING, cursor)[:51])
+
+
+def explain(sql, params):
+    """Detail lines of the query plan, and those that scan a whole table"""
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        details = [row[-1] for row in cursor.fetchall()]
+    subqueries = {match.group(1) for detail in details
+                  if (match := SUBQUERY.match(detail))}
+    return details, [
+        detail for detail in details
+        if (match := FULL_SCAN.match(detail)) and match.group(1) not in subqueries]
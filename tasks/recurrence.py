@@ -0,0 +1,203 @@
+"""
+Materialization of recurring tasks.
+
+A RecurringTask is only a rule. Its occurrences become real Task rows
+lazily, for a rolling window of settings.RECURRING_TASK_WINDOW_DAYS
+ahead of today, so a weekly task is a handful of cards rather than
+years of them, and the kanban and Gantt queries stay small. The daily
+``generate_recurring_tasks`` command moves the window forward; a new
+rule is materialized as soon as it is created.
+
+Occurrences are written with bulk_create, which skips the Task signal
+handlers, so this module adjusts the counters, the cached graphs and
+schedules, the change feed and the notification queues itself.
+"""
+
+import calendar
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from notifications.models import DueDateRecheck, NotificationOutbox
+from .graph import invalidate_graph
+from .models import RecurringTask, Task, TaskCounter, TaskEvent
+from .ordering import ORDER_GAP, bottom_of_column_order
+from .scheduling import invalidate_schedule
+
+RECURRENCE_BATCH_SIZE = 500
+
+
+def window_end(today=None):
+    """Last date the rolling window materializes"""
+    today = today or timezone.now().date()
+    return today + timedelta(days=settings.RECURRING_TASK_WINDOW_DAYS)
+
+
+def _add_months(start, months):
+    # Days past the end of a shorter month fall on its last day, so a rule
+    # starting Jan 31 is due Feb 28, Mar 31, Apr 30, ...
+    month = start.month - 1 + months
+    year, month = start.year + month // 12, month % 12 + 1
+    day = min(start.day, calendar.monthrange(year, month)[1])
+    return start.replace(year=year, month=month, day=day)
+
+
+def occurrence_dates(rule, after, until):
+    """Due dates of the rule's occurrences in (after, until], in order"""
+    if rule.ends_on and rule.ends_on < until:
+        until = rule.ends_on
+    step = max(rule.interval, 1)
+
+    if rule.frequency in ('daily', 'weekly'):
+        days = step * (7 if rule.frequency == 'weekly' else 1)
+        # Jump straight to the first occurrence after the watermark
+        skipped = 0
+        if after is not None and after >= rule.starts_on:
+            skipped = (after - rule.starts_on).days // days + 1
+        current = rule.starts_on + timedelta(days=skipped * days)
+        while current <= until:
+            yield current
+            current += timedelta(days=days)
+        return
+
+    months = step * (12 if rule.frequency == 'yearly' else 1)
+    index = 0
+    if after is not None and after >= rule.starts_on:
+        elapsed = ((after.year - rule.starts_on.year) * 12
+                   + after.month - rule.starts_on.month)
+        index = max(elapsed // months - 1, 0)
+    while True:
+        current = _add_months(rule.starts_on, index * months)
+        if current > until:
+            return
+        if after is None or current > after:
+            yield current
+        index += 1
+
+
+def _occurrence(rule, due_date, order):
+    return Task(
+        board_id=rule.board_id,
+        title=rule.title,
+        description=rule.description,
+        assigned_to_id=rule.assigned_to_id,
+        priority=rule.priority,
+        status='todo',
+        due_date=due_date,
+        start_date=due_date - timedelta(days=rule.lead_days),
+        created_by_id=rule.created_by_id,
+        order=order,
+        recurrence=rule,
+        occurrence_date=due_date,
+    )
+
+
+def _write_batch(tasks, project_of):
+    """Insert one batch of occurrences and the bookkeeping bulk_create skips"""
+    Task.objects.bulk_create(tasks)
+
+    deltas = Counter()
+    for task in tasks:
+        for key in TaskCounter.keys_for(
+                project_of[task.board_id], task.board_id, task.assigned_to_id,
+                task.status):
+            deltas[key] += 1
+    TaskCounter.apply(deltas)
+    TaskEvent.record('created', [(task.board_id, task.id) for task in tasks])
+    NotificationOutbox.queue([(task, True, None) for task in tasks])
+    DueDateRecheck.queue([(task, None, None) for task in tasks])
+
+    project_ids = {project_of[task.board_id] for task in tasks}
+    invalidate_graph(*project_ids)
+    invalidate_schedule(*project_ids)
+
+
+def materialize(rules=None, until=None, batch_size=RECURRENCE_BATCH_SIZE):
+    """
+    Create the missing occurrences of active rules due from today up to
+    ``until`` (default: the end of the rolling window). Occurrences that
+    fell due before today are not backfilled, so a new rule with a past
+    start begins at today. Returns the number of tasks created.
+
+    New occurrences go to the bottom of their board's To Do column, in
+    due date order. Each batch of up to batch_size tasks is committed in a
+    transaction of its own, together with the generated_until of the rules
+    it covers, so a long run never holds the write lock throughout.
+    """
+    until = until or window_end()
+    if rules is None:
+        rules = RecurringTask.objects.all()
+    rules = rules.filter(is_active=True).exclude(generated_until__gte=until)
+    yesterday = timezone.now().date() - timedelta(days=1)
+
+    created = 0
+    while True:
+        with transaction.atomic():
+            written = _materialize_batch(rules, until, yesterday, batch_size)
+        if written is None:
+            return created
+        created += written
+
+
+def _materialize_batch(rules, until, yesterday, batch_size):
+    """
+    Create the next batch of occurrences. Returns the number of tasks
+    created, or None once every rule is materialized up to ``until``.
+    """
+    # Locked so two generators never materialize the same dates
+    rules = list(rules.select_for_update().select_related('board')
+                 .order_by('id')[:batch_size])
+    if not rules:
+        return None
+    project_of = {rule.board_id: rule.board.project_id for rule in rules}
+    after = {rule.id: max(rule.generated_until or yesterday, yesterday)
+             for rule in rules}
+    # Occurrences kept by reschedule() are not created again
+    existing = set(Task.objects.filter(
+        recurrence__in=rules, occurrence_date__gt=min(after.values()),
+    ).values_list('recurrence_id', 'occurrence_date'))
+
+    next_order = {}
+    batch = []
+    for rule in rules:
+        for due_date in occurrence_dates(rule, after[rule.id], until):
+            if len(batch) >= batch_size:
+                break
+            # A rule cut off by a full batch continues after this date
+            rule.generated_until = due_date
+            if (rule.id, due_date) in existing:
+                continue
+            if rule.board_id not in next_order:
+                next_order[rule.board_id] = bottom_of_column_order(
+                    rule.board_id, 'todo')
+            batch.append(_occurrence(rule, due_date, next_order[rule.board_id]))
+            next_order[rule.board_id] += ORDER_GAP
+        else:
+            rule.generated_until = until
+            continue
+        break
+
+    if batch:
+        _write_batch(batch, project_of)
+    RecurringTask.objects.bulk_update(
+        rules, ['generated_until'], batch_size=batch_size)
+    return len(batch)
+
+
+def reschedule(rule):
+    """
+    Replace the not yet started future occurrences of an edited rule with
+    ones that follow its new schedule. Occurrences that are in progress,
+    done or due today or earlier are left alone. Returns the number of
+    tasks created.
+    """
+    today = timezone.now().date()
+    with transaction.atomic():
+        rule.occurrences.filter(
+            occurrence_date__gt=today, status='todo', progress=0).delete()
+        RecurringTask.objects.filter(pk=rule.pk).update(generated_until=today)
+        rule.generated_until = today
+        return materialize(RecurringTask.objects.filter(pk=rule.pk))
@@ -0,0 +1,204 @@
+"""
+Critical-path scheduling over a project's dependency graph.
+
+Days are handled as date ordinals and every task occupies the half-open
+interval [start, start + duration). Tasks without both a start and a due
+date have no duration of their own; they pass their dependencies' finish
+on to their dependents. All passes walk the graph once in topological
+order, so a schedule costs O(V+E).
+"""
+
+from array import array
+from datetime import date, timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from church_task_manager.bulk import update_rows
+
+from .graph import DependencyCycleError, DependencyGraph, graph_version
+from .models import Task, TaskEvent
+
+SCHEDULE_CACHE_TIMEOUT = 60 * 60
+
+
+class ProjectSchedule:
+    """Earliest/latest start, slack and critical path of a project"""
+
+    def __init__(self, graph, dates):
+        self.graph = graph
+        count = len(graph)
+        order = [graph.index[task_id] for task_id in graph.topological_order()]
+
+        own_start = array('q', [0] * count)
+        duration = array('q', [0] * count)
+        dated = bytearray(count)
+        for i, task_id in enumerate(graph.ids):
+            start_date, due_date = dates.get(task_id, (None, None))
+            if start_date and due_date:
+                dated[i] = 1
+                own_start[i] = start_date.toordinal()
+                duration[i] = max((due_date - start_date).days + 1, 0)
+
+        project_start = min(
+            (own_start[i] for i in range(count) if dated[i]),
+            default=timezone.now().date().toordinal())
+
+        # Forward pass: earliest start and finish
+        earliest = array('q', [project_start] * count)
+        for i in order:
+            start = own_start[i] if dated[i] else project_start
+            for j in graph._dependencies(i):
+                start = max(start, earliest[j] + duration[j])
+            earliest[i] = start
+        project_end = max(
+            (earliest[i] + duration[i] for i in range(count)),
+            default=project_start)
+
+        # Backward pass: latest start that does not delay the project
+        latest = array('q', [0] * count)
+        for i in reversed(order):
+            finish = project_end
+            for j in graph._dependents(i):
+                finish = min(finish, latest[j])
+            latest[i] = finish - duration[i]
+
+        self.dated = dated
+        self.duration = duration
+        self.earliest = earliest
+        self.latest = latest
+        self.project_start = date.fromordinal(project_start)
+        self.project_end = date.fromordinal(project_end)
+        self.critical_path = [
+            graph.ids[i] for i in order
+            if dated[i] and latest[i] == earliest[i]
+        ]
+
+    @classmethod
+    def load(cls, project_id):
+        dates = {
+            task_id: (start_date, due_date) for task_id, start_date, due_date
+            in Task.objects.filter(board__project_id=project_id)
+            .values_list('id', 'start_date', 'due_date')
+        }
+        return cls(DependencyGraph.load(project_id), dates)
+
+    def earliest_start(self, task_id):
+        return date.fromordinal(self.earliest[self.graph.index[task_id]])
+
+    def latest_start(self, task_id):
+        return date.fromordinal(self.latest[self.graph.index[task_id]])
+
+    def slack(self, task_id):
+        """Days the task can slip without delaying the project end"""
+        i = self.graph.index[task_id]
+        return self.latest[i] - self.earliest[i]
+
+    def is_critical(self, task_id):
+        i = self.graph.index[task_id]
+        return bool(self.dated[i]) and self.latest[i] == self.earliest[i]
+
+
+def _cache_key(project_id):
+    return f'tasks:schedule:{project_id}'
+
+
+def get_schedule(project_id):
+    """
+    Cached schedule of a project, or None if its dependencies contain a
+    cycle (rows written around TaskDependency.save(), e.g. legacy data).
+    Like the graphs, schedules are cached with the project's graph_version
+    and rebuilt once it changes, whichever process made the change.
+    """
+    version = graph_version(project_id)
+    cached = cache.get(_cache_key(project_id))
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    try:
+        schedule = ProjectSchedule.load(project_id)
+    except DependencyCycleError:
+        return None
+    cache.set(_cache_key(project_id), (version, schedule), SCHEDULE_CACHE_TIMEOUT)
+    return schedule
+
+
+def invalidate_schedule(*project_ids):
+    cache.delete_many([_cache_key(project_id) for project_id in project_ids])
+
+
+def propagate_dates(task):
+    """
+    Push a task's new dates down to every task that depends on it.
+
+    Each downstream task that would now start before one of its
+    dependencies finishes is shifted later, keeping its duration. All
+    shifted tasks are written with one UPDATE statement. Returns the number of
+    tasks moved. Raises DependencyCycleError if the project's dependencies
+    contain a cycle.
+    """
+    project_id = task.board.project_id
+    # Not the cached graph: this writes, and must see the current edges
+    graph = DependencyGraph.load(project_id)
+    if task.id not in graph.index:
+        return 0
+
+    # Descendants of the task, in topological order
+    reachable = {graph.index[task.id]}
+    stack = [graph.index[task.id]]
+    while stack:
+        for j in graph._dependents(stack.pop()):
+            if j not in reachable:
+                reachable.add(j)
+                stack.append(j)
+    order = [graph.index[task_id] for task_id in graph.topological_order()
+             if graph.index[task_id] in reachable]
+
+    affected = {graph.ids[i] for i in reachable}
+    for i in reachable:
+        affected.update(graph.ids[j] for j in graph._dependencies(i))
+    rows = Task.objects.filter(id__in=affected).in_bulk()
+
+    # finish[i] is the first free day after the task (exclusive end)
+    finish = {}
+    moved = []
+    for i in order:
+        required = None
+        for j in graph._dependencies(i):
+            if j not in finish:
+                # Missing if deleted or archived since the graph was read
+                dependency = rows.get(graph.ids[j])
+                finish[j] = (dependency.due_date + timedelta(days=1)
+                             if dependency and dependency.start_date
+                             and dependency.due_date else None)
+            if finish[j] is not None:
+                required = max(required or finish[j], finish[j])
+
+        current = rows.get(graph.ids[i])
+        if current is None:
+            # Gone, so it no longer holds its dependents back
+            finish[i] = None
+            continue
+        if (graph.ids[i] != task.id and required and current.start_date
+                and current.due_date and current.start_date < required):
+            shift = required - current.start_date
+            current.start_date += shift
+            current.due_date += shift
+            moved.append(current)
+
+        if current.start_date and current.due_date:
+            finish[i] = current.due_date + timedelta(days=1)
+        else:
+            # Undated tasks pass their dependencies' finish through
+            finish[i] = required
+
+    if moved:
+        now = timezone.now()
+        for current in moved:
+            current.updated_at = now
+        with transaction.atomic():
+            update_rows(moved, ['start_date', 'due_date', 'updated_at'])
+            TaskEvent.record(
+                'updated', [(current.board_id, current.id) for current in moved])
+        invalidate_schedule(project_id)
+    return len(moved)
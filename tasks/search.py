@@ -0,0 +1,304 @@
+"""
+Full-text search over task titles, descriptions and notes.
+
+On SQLite the text is indexed by an FTS5 external-content table,
+``tasks_fts``, kept in sync with the ``tasks`` table by triggers, so
+inserts from bulk_create and raw SQL are indexed too. Results are ranked
+by bm25 (title matches weigh most) and paged by a (rank, id) keyset
+cursor. Only the newest SEARCH_RANK_WINDOW matches are ranked; once they
+are exhausted, paging carries on through the older matches, newest
+first, so every match can be reached. Other databases fall back to a
+case-insensitive scan.
+"""
+
+from django.db import connection
+from django.db.models import Q
+from django.utils.html import escape
+
+from .models import Task
+
+SEARCH_PAGE_SIZE = 20
+
+# Only the newest matches are ranked. Words that occur in most tasks would
+# otherwise make bm25 score every row, and their scores are close to
+# zero anyway, so recency is the better tie-breaker for them. Older
+# matches follow the ranked ones, newest first.
+SEARCH_RANK_WINDOW = 5000
+
+FTS_TABLE = 'tasks_fts'
+
+# Column weights for bm25(): title, description, notes
+FTS_RANK = 'bm25(10.0, 2.0, 1.0)'
+
+FTS_SCHEMA = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, description, notes,
+        content='tasks', content_rowid='id',
+        tokenize='porter unicode61'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS tasks_fts_insert AFTER INSERT ON tasks BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, description, notes)
+        VALUES (new.id, new.title, new.description, new.notes);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS tasks_fts_delete AFTER DELETE ON tasks BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description, notes)
+        VALUES ('delete', old.id, old.title, old.description, old.notes);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS tasks_fts_update
+    AFTER UPDATE OF title, description, notes ON tasks BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description, notes)
+        VALUES ('delete', old.id, old.title, old.description, old.notes);
+        INSERT INTO {FTS_TABLE}(rowid, title, description, notes)
+        VALUES (new.id, new.title, new.description, new.notes);
+    END
+    """,
+]
+
+FTS_TRIGGERS = {'tasks_fts_insert', 'tasks_fts_delete', 'tasks_fts_update'}
+
+
+def fts_available(using=None):
+    return (using or connection).vendor == 'sqlite'
+
+
+def install_search_index(using=None, repair_only=False):
+    """
+    Create the FTS table and its triggers if they are missing.
+
+    SQLite drops a table's triggers whenever a migration rebuilds the
+    table, so this also runs after every migrate with repair_only set,
+    which only restores the triggers of an existing index. The index is
+    rebuilt from the tasks table whenever anything had to be recreated.
+    """
+    conn = using or connection
+    if not fts_available(conn):
+        return False
+
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger') "
+            "AND name IN (%s, %s, %s, %s)",
+            [FTS_TABLE, *sorted(FTS_TRIGGERS)])
+        existing = {row[0] for row in cursor.fetchall()}
+        if existing == FTS_TRIGGERS | {FTS_TABLE}:
+            return False
+        if repair_only and FTS_TABLE not in existing:
+            return False
+
+        for statement in FTS_SCHEMA:
+            cursor.execute(statement)
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) VALUES ('rank', %s)",
+            [FTS_RANK])
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    return True
+
+
+def to_match_query(text):
+    """
+    Turn free text into a safe FTS5 query: every word must match, and the
+    last one may be a prefix so results show up while typing.
+    """
+    words = [word.replace('"', '""') for word in text.split()]
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+# snippet() copies the stored text verbatim, so matches are marked with
+# control characters and only turned into <mark> after escaping
+MATCH_START = '\x02'
+MATCH_END = '\x03'
+
+
+def highlight(snippet):
+    return (escape(snippet or '')
+            .replace(MATCH_START, '<mark>').replace(MATCH_END, '</mark>'))
+
+
+def encode_cursor(rank, task_id, window_start=0):
+    """Cursor after a result; rank is None for results past the rank window"""
+    return f"{'older' if rank is None else repr(rank)}:{task_id}:{window_start}"
+
+
+def decode_cursor(value):
+    """
+    Parse a search cursor into (rank, task_id, window_start), raising
+    ValueError if it is invalid
+    """
+    rank, task_id, window_start = value.split(':')
+    return (None if rank == 'older' else float(rank)), int(task_id), int(window_start)
+
+
+def _visible_matches(user, match):
+    """FROM clause, WHERE condition and params of the matches the user can see"""
+    joins = f"""
+        FROM {FTS_TABLE} AS f
+        JOIN tasks AS t ON t.id = f.rowid
+        JOIN boards AS b ON b.id = t.board_id
+        JOIN projects AS p ON p.id = b.project_id"""
+    # Deleted boards and projects are hidden until they are purged
+    visible = f"{FTS_TABLE} MATCH %s AND b.deleted_at IS NULL AND p.deleted_at IS NULL"
+    params = [match]
+    if not user.is_admin():
+        visible += " AND (t.assigned_to_id = %s OR p.created_by_id = %s)"
+        params += [user.id, user.id]
+    return joins, visible, params
+
+
+def window_start_sql(user, match):
+    """
+    (sql, params) of the oldest id in the rank window and the window's
+    size. The window holds the newest matches the user can see, so other
+    people's tasks cannot crowd theirs out of it.
+    """
+    joins, visible, params = _visible_matches(user, match)
+    sql = f"""
+        SELECT min(rowid), count(*) FROM (
+            SELECT f.rowid {joins} WHERE {visible}
+            ORDER BY f.rowid DESC LIMIT %s)
+    """
+    return sql, [*params, SEARCH_RANK_WINDOW]
+
+
+def _page_sql(joins, where, order):
+    return f"""
+        SELECT f.rowid, f.rank,
+               snippet({FTS_TABLE}, -1, %s, %s, '…', 16),
+               t.title, t.status, b.id, b.name, p.name {joins}
+        WHERE {' AND '.join(where)}
+        ORDER BY {order}
+        LIMIT %s
+    """
+
+
+def search_sql(user, match, window_start=0, after=None, limit=SEARCH_PAGE_SIZE):
+    """
+    (sql, params) of one page of ranked matches the user can see, from the
+    rank window starting at id window_start; after is a (rank, task_id)
+    pair
+    """
+    joins, visible, params = _visible_matches(user, match)
+    where = [visible, "f.rowid >= %s"]
+    params = [MATCH_START, MATCH_END, *params, window_start]
+    if after:
+        rank, task_id = after
+        where.append("(f.rank > %s OR (f.rank = %s AND f.rowid > %s))")
+        params += [rank, rank, task_id]
+    return _page_sql(joins, where, 'f.rank, f.rowid'), [*params, limit + 1]
+
+
+def older_search_sql(user, match, before, limit=SEARCH_PAGE_SIZE):
+    """(sql, params) of the matches older than id before, newest first"""
+    joins, visible, params = _visible_matches(user, match)
+    where = [visible, "f.rowid < %s"]
+    params = [MATCH_START, MATCH_END, *params, before]
+    return _page_sql(joins, where, 'f.rowid DESC'), [*params, limit + 1]
+
+
+def search_tasks(user, text, after=None, limit=SEARCH_PAGE_SIZE):
+    """
+    Search the tasks the user can see: best match first among the newest
+    SEARCH_RANK_WINDOW matches they can see, then the older matches,
+    newest first.
+
+    Returns (results, next_cursor) where results is a list of dicts with
+    the task id, title, status, board and project names, rank and an HTML
+    snippet with the matched words wrapped in <mark>. Raises ValueError
+    for an invalid cursor.
+    """
+    if not fts_available():
+        return _search_fallback(user, text, after, limit)
+
+    match = to_match_query(text)
+    if match is None:
+        return [], None
+
+    with connection.cursor() as cursor:
+        if after:
+            rank, task_id, window_start = decode_cursor(after)
+        else:
+            rank = task_id = None
+            cursor.execute(*window_start_sql(user, match))
+            oldest, size = cursor.fetchone()
+            # 0: every match fits in the window, there is nothing older
+            window_start = oldest if size >= SEARCH_RANK_WINDOW else 0
+
+        rows = []
+        if not after or rank is not None:
+            cursor.execute(*search_sql(
+                user, match, window_start,
+                (rank, task_id) if after else None, limit))
+            rows = cursor.fetchall()
+        ranked = len(rows)
+        if ranked <= limit and window_start:
+            before = task_id if after and rank is None else window_start
+            cursor.execute(*older_search_sql(user, match, before, limit - ranked))
+            rows += cursor.fetchall()
+
+    statuses = dict(Task.STATUS_CHOICES)
+    results = [{
+        'id': task_id,
+        'title': title,
+        'status': status,
+        'status_display': statuses.get(status, status),
+        'board_id': board_id,
+        'board': board_name,
+        'project': project_name,
+        'rank': rank,
+        'snippet': highlight(snippet),
+    } for task_id, rank, snippet, title, status, board_id, board_name, project_name
+        in rows[:limit]]
+
+    next_cursor = None
+    if len(rows) > limit:
+        last = results[-1]
+        next_cursor = encode_cursor(
+            last['rank'] if limit <= ranked else None, last['id'], window_start)
+    return results, next_cursor
+
+
+def _search_fallback(user, text, after, limit):
+    words = text.split()
+    if not words:
+        return [], None
+
+    tasks = Task.objects.select_related('board__project').filter(
+        board__deleted_at__isnull=True, board__project__deleted_at__isnull=True)
+    if not user.is_admin():
+        tasks = tasks.filter(
+            Q(assigned_to=user) | Q(board__project__created_by=user))
+    for word in words:
+        tasks = tasks.filter(
+            Q(title__icontains=word) | Q(description__icontains=word) |
+            Q(notes__icontains=word))
+    if after:
+        tasks = tasks.filter(id__gt=decode_cursor(after)[1])
+    rows = list(tasks.order_by('id')[:limit + 1])
+
+    results = [{
+        'id': task.id,
+        'title': task.title,
+        'status': task.status,
+        'status_display': task.get_status_display(),
+        'board_id': task.board_id,
+        'board': task.board.name,
+        'project': task.board.project.name,
+        'rank': 0.0,
+        'snippet': escape(task.description[:120]),
+    } for task in rows[:limit]]
+
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = encode_cursor(0.0, results[-1]['id'])
+    return results, next_cursor
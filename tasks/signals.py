@@ -0,0 +1,133 @@
+from collections import Counter
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models.signals import (
+    pre_save, post_save, pre_delete, post_delete, post_migrate)
+from django.dispatch import receiver
+
+from projects.models import Board
+from .graph import invalidate_graph
+from .models import Task, TaskCounter, TaskDependency, TaskEvent
+from .scheduling import invalidate_schedule
+from .search import install_search_index
+
+
+def _task_counter_keys(task, project_id):
+    return TaskCounter.keys_for(
+        project_id, task.board_id, task.assigned_to_id, task.status)
+
+
+def _project_id(task):
+    board = Task.board.field.get_cached_value(task, default=None)
+    if board is not None and board.pk == task.board_id:
+        return board.project_id
+    return Board.objects.filter(pk=task.board_id).values_list(
+        'project_id', flat=True).first()
+
+
+@receiver(pre_save, sender=Task)
+def remember_task_counters(sender, instance, raw=False, **kwargs):
+    """Capture the counter keys of the stored row before it changes"""
+    instance._counter_keys_before = []
+    instance._stored_state = None
+    if raw or instance._state.adding or instance.pk is None:
+        return
+
+    stored = Task.objects.filter(pk=instance.pk).values_list(
+        'board__project_id', 'board_id', 'assigned_to_id', 'status',
+        'due_date', 'start_date'
+    ).first()
+    if stored is not None:
+        instance._counter_keys_before = TaskCounter.keys_for(*stored[:4])
+        instance._stored_state = stored
+
+
+@receiver(post_save, sender=Task)
+def update_task_counters(sender, instance, raw=False, **kwargs):
+    """Move the task's contribution from its old counters to its new ones"""
+    if raw:
+        return
+
+    deltas = Counter()
+    for key in getattr(instance, '_counter_keys_before', []):
+        deltas[key] -= 1
+    for key in _task_counter_keys(instance, _project_id(instance)):
+        deltas[key] += 1
+    TaskCounter.apply(deltas)
+    instance._counter_keys_before = []
+
+
+@receiver(post_save, sender=Task)
+def invalidate_task_graph(sender, instance, created, raw=False, **kwargs):
+    """Drop cached graphs and schedules the saved task took part in"""
+    if raw:
+        return
+    stored = getattr(instance, '_stored_state', None)
+    project_id = _project_id(instance)
+    if created or stored is None:
+        invalidate_graph(project_id)
+        invalidate_schedule(project_id)
+        return
+
+    if stored[1] != instance.board_id or stored[3] != instance.status:
+        invalidate_graph(stored[0], project_id)
+    dates = Task._meta.get_field('due_date').to_python
+    if (stored[1] != instance.board_id or
+            stored[4] != dates(instance.due_date) or
+            stored[5] != dates(instance.start_date)):
+        invalidate_schedule(stored[0], project_id)
+
+
+@receiver(pre_delete, sender=Task)
+def remember_deleted_task_counters(sender, instance, **kwargs):
+    # The board may already be gone by post_delete during a cascade
+    instance._counter_keys_before = _task_counter_keys(instance, _project_id(instance))
+
+
+@receiver(post_delete, sender=Task)
+def release_task_counters(sender, instance, **kwargs):
+    deltas = Counter()
+    for key in getattr(instance, '_counter_keys_before', []):
+        deltas[key] -= 1
+    TaskCounter.apply(deltas)
+    if instance._counter_keys_before:
+        project_id = instance._counter_keys_before[0][1]
+        invalidate_graph(project_id)
+        invalidate_schedule(project_id)
+
+
+@receiver(post_save, sender=Task)
+def record_task_saved(sender, instance, created, raw=False, **kwargs):
+    """Log the change for the kanban change feed"""
+    if raw:
+        return
+    stored = getattr(instance, '_stored_state', None)
+    if stored is not None and stored[1] != instance.board_id:
+        # Moved to another board: it disappears from the old one
+        TaskEvent.record('deleted', [(stored[1], instance.pk)])
+    TaskEvent.record(
+        'created' if created else 'updated', [(instance.board_id, instance.pk)])
+
+
+@receiver(post_delete, sender=Task)
+def record_task_deleted(sender, instance, **kwargs):
+    TaskEvent.record('deleted', [(instance.board_id, instance.pk)])
+
+
+@receiver(post_save, sender=TaskDependency)
+@receiver(post_delete, sender=TaskDependency)
+def invalidate_dependency_graph(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    project_id = Board.objects.filter(tasks__id=instance.task_id).values_list(
+        'project_id', flat=True).first()
+    if project_id is not None:
+        invalidate_graph(project_id)
+        invalidate_schedule(project_id)
+
+
+@receiver(post_migrate)
+def ensure_search_index(sender, using=DEFAULT_DB_ALIAS, **kwargs):
+    """Recreate the FTS triggers if a migration rebuilt the tasks table"""
+    if sender.name == 'tasks':
+        install_search_index(connections[using], repair_only=True)
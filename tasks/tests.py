@@ -1,3 +1,1110 @@
+import asyncio
+import io
+import random
+import re
+import time
+from datetime import timedelta
+from unittest import mock, skipUnless
+
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import User
+from notifications.models import ArchivedNotification, Notification, NotificationCounter
+from projects.models import Board, Project
+from projects.purge import delete_boards, delete_projects
+from .archive import archive_batch
+from .graph import DependencyGraph, get_graph
+from .graph import _cache_key as graph_cache_key
+from .importer import TaskImporter, read_rows
+from .kanban import CARD_ORDERING, CARDS_PER_COLUMN, apply_moves, board_changes
+from .live import board_stream, format_event
+from .models import (
+    ArchivedTask, ArchivedTaskDependency, RecurringTask, Task, TaskCounter,
+    TaskDependency, TaskEvent)
+from .ordering import ORDER_GAP
+from .query_plans import explain, hot_queries
+from .recurrence import _write_batch, materialize, window_end
+from .scheduling import ProjectSchedule, get_schedule, propagate_dates
+from .scheduling import _cache_key as schedule_cache_key
+from .search import search_tasks
+
+
+class TaskFixtureMixin:
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            'admin', 'admin@example.com', 'password', role='admin')
+        cls.project = Project.objects.create(name='Outreach', created_by=cls.admin)
+        cls.board = Board.objects.create(project=cls.project, name='Main')
+
+    def setUp(self):
+        # Graphs, schedules and card markup are cached by id, and ids are
+        # reused between tests
+        for backend in caches.all():
+            backend.clear()
+
+    def make_task(self, **fields):
+        fields = {'board': self.board, 'title': 'Task', 'created_by': self.admin,
+                  **fields}
+        return Task.objects.create(**fields)
+
+
+class TaskCounterTests(TaskFixtureMixin, TestCase):
+    def test_status_change_after_due_date_passes(self):
+        today = timezone.now()
+        task = self.make_task(
+            status='todo', assigned_to=self.admin,
+            due_date=(today + timedelta(days=1)).date())
+
+        with mock.patch('django.utils.timezone.now',
+                        return_value=today + timedelta(days=3)):
+            task.status = 'in_progress'
+            task.save()
+
+        expected = {'todo': 0, 'in_progress': 1, 'waiting': 0, 'completed': 0}
+        for scope_type, scope_id in (('project', self.project.id),
+                                     ('board', self.board.id),
+                                     ('user', self.admin.id)):
+            self.assertEqual(
+                TaskCounter.status_totals(scope_type, [scope_id]), expected)
+
+    def test_rebuild_matches_incremental_counts(self):
+        self.make_task(status='todo', due_date=timezone.now().date() - timedelta(days=5))
+        self.make_task(status='completed', assigned_to=self.admin)
+        before = TaskCounter.status_totals_by_scope('board')
+        TaskCounter.rebuild()
+        self.assertEqual(TaskCounter.status_totals_by_scope('board'), before)
+
+
+class KanbanQueryTests(TaskFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.admin)
+        self.url = reverse('kanban', args=[self.board.id])
+        # Creates the user's notification counter row
+        self.client.get(self.url)
+
+    def fill_columns(self, per_column):
+        for status, _ in Task.STATUS_CHOICES:
+            for index in range(per_column):
+                self.make_task(title=f'{status} {index}', status=status,
+                               assigned_to=self.admin)
+
+    def test_board_query_count(self):
+        # session, user, ETag (board, events, notification counter),
+        # board, change cursor and one windowed query for all columns
+        self.fill_columns(60)
+        with self.assertNumQueries(8):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        for column in response.context['columns']:
+            self.assertEqual(column['total'], 60)
+            self.assertEqual(len(column['tasks']), 50)
+
+    def test_board_query_count_does_not_grow_with_tasks(self):
+        self.fill_columns(1)
+        with self.assertNumQueries(8):
+            self.client.get(self.url)
+        self.fill_columns(20)
+        with self.assertNumQueries(8):
+            self.client.get(self.url)
+
+
+class DashboardQueryTests(TaskFixtureMixin, TestCase):
+    """The admin dashboard charts every active user from the counter table"""
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.admin)
+        self.url = reverse('dashboard')
+        self.client.get(self.url)
+
+    def add_members(self, count):
+        start = User.objects.count()
+        members = User.objects.bulk_create([
+            User(username=f'member{index}', email=f'member{index}@example.com')
+            for index in range(start, start + count)])
+        for member in members:
+            self.make_task(title=f'Task for {member.username}', assigned_to=member)
+
+    def assertDashboardQueries(self, users):
+        # session, user, ETag (events, projects, users, notification
+        # counter), boards waiting for the purge, status totals, users,
+        # per-user totals, overdue count and list, recent list
+        with self.assertNumQueries(13):
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.context['tasks_per_user']), users)
+
+    def test_query_count_does_not_grow_with_users(self):
+        self.add_members(3)
+        self.assertDashboardQueries(4)
+        self.add_members(27)
+        self.assertDashboardQueries(31)
+
+    def test_deleted_projects_and_boards_are_not_counted(self):
+        member = User.objects.create_user('member', 'member@example.com', 'password')
+        self.make_task(status='completed', assigned_to=member)
+        self.make_task(status='todo', assigned_to=member)
+        deleted_board = Board.objects.create(project=self.project, name='Old')
+        self.make_task(board=deleted_board, status='todo', assigned_to=member)
+        other = Project.objects.create(name='Retreat', created_by=self.admin)
+        other_board = Board.objects.create(project=other, name='Main')
+        self.make_task(board=other_board, status='completed', assigned_to=member)
+        self.make_task(board=other_board, status='waiting')
+
+        # The purge starts on commit, which never comes inside the test
+        delete_boards(Board.objects.filter(id=deleted_board.id))
+        delete_projects(Project.objects.filter(id=other.id))
+
+        expected = {'todo': 1, 'in_progress': 0, 'waiting': 0, 'completed': 1}
+        response = self.client.get(self.url)
+        self.assertEqual(response.context['tasks_by_status'], expected)
+        self.assertEqual(response.context['completion_percentage'], 50.0)
+        self.assertIn({'user': 'member', 'total': 2, 'completed': 1},
+                      response.context['tasks_per_user'])
+        self.client.force_login(member)
+        response = self.client.get(self.url)
+        self.assertEqual(response.context['tasks_by_status'], expected)
+
+
+class MoveTasksTests(TaskFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.admin)
+        self.url = reverse('move_tasks')
+
+    def post(self, body):
+        return self.client.post(self.url, body, content_type='application/json')
+
+    def column(self, status='todo'):
+        return list(Task.objects.filter(status=status).order_by(*CARD_ORDERING)
+                    .values_list('title', flat=True))
+
+    def test_batch_reproduces_the_screen_order(self):
+        a, b, c, d = (self.make_task(title=title, order=(index + 1) * ORDER_GAP)
+                      for index, title in enumerate('ABCD'))
+        # A dragged to the bottom, then B to the third slot: the screen
+        # shows C, D, B, A and the moves are sent top to bottom
+        response = self.post({'moves': [
+            {'task_id': b.id, 'status': 'todo', 'after': d.id},
+            {'task_id': a.id, 'status': 'todo', 'after': b.id},
+        ]})
+        self.assertEqual(response.json(), {'success': True, 'updated': 2})
+        self.assertEqual(self.column(), ['C', 'D', 'B', 'A'])
+
+    def test_batch_across_columns(self):
+        a, b, c = (self.make_task(title=title, order=(index + 1) * ORDER_GAP)
+                   for index, title in enumerate('ABC'))
+        self.make_task(title='W', status='waiting')
+        response = self.post({'moves': [
+            {'task_id': c.id, 'status': 'todo', 'after': None},
+            {'task_id': b.id, 'status': 'waiting', 'after': None},
+            {'task_id': a.id, 'status': 'waiting', 'after': b.id},
+        ]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.column(), ['C'])
+        self.assertEqual(self.column('waiting'), ['B', 'A', 'W'])
+
+    def test_neighbour_missing_from_the_column_is_rejected(self):
+        task = self.make_task(title='A')
+        other = self.make_task(title='B', status='waiting')
+        for after, status in ((other.id, 409), (task.id, 400)):
+            response = self.post({'moves': [
+                {'task_id': task.id, 'status': 'todo', 'after': after}]})
+            self.assertEqual(response.status_code, status)
+        self.assertEqual(self.column(), ['A'])
+
+    def test_malformed_body_does_not_leak_exception_text(self):
+        for body in ('{not json', '[1, 2]'):
+            response = self.post(body)
+            self.assertEqual(response.status_code, 400)
+            self.assertNotIn('Expecting', response.json()['error'])
+
+
+class ChangeFeedTests(TaskFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.admin)
+        self.url = reverse('task_changes')
+
+    def poll(self, since, board=None):
+        response = self.client.get(
+            self.url, {'board': (board or self.board).id, 'since': since})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_cursor_advances_past_the_changes_it_returned(self):
+        task = self.make_task(title='Before')
+        cursor = TaskEvent.latest_cursor()
+        task.title = 'After'
+        task.save()
+
+        changes = self.poll(cursor)
+        self.assertFalse(changes['reset'])
+        self.assertEqual([card['id'] for card in changes['cards']], [task.id])
+        self.assertIn('After', changes['cards'][0]['html'])
+        self.assertEqual(changes['totals']['todo'], 1)
+        self.assertGreater(changes['cursor'], cursor)
+
+        changes = self.poll(changes['cursor'])
+        self.assertEqual(changes['cards'], [])
+        self.assertEqual(changes['removed'], [])
+
+    def test_changes_on_other_boards_are_left_out(self):
+        cursor = TaskEvent.latest_cursor()
+        other = Board.objects.create(project=self.project, name='Other')
+        self.make_task(board=other)
+        self.assertEqual(self.poll(cursor)['cards'], [])
+
+    def test_cards_that_left_the_board_or_the_view_are_removed(self):
+        member = User.objects.create_user('member', 'member@example.com', 'password')
+        other = Board.objects.create(project=self.project, name='Other')
+        deleted, moved, reassigned = (
+            self.make_task(title=title, assigned_to=member)
+            for title in ('Deleted', 'Moved', 'Reassigned'))
+        cursor = TaskEvent.latest_cursor()
+        deleted_id = deleted.id
+        deleted.delete()
+        moved.board = other
+        moved.save()
+        reassigned.assigned_to = self.admin
+        reassigned.save()
+
+        self.assertEqual(self.poll(cursor)['removed'], sorted([deleted_id, moved.id]))
+        # A member only sees their own cards
+        self.client.force_login(member)
+        self.assertEqual(self.poll(cursor)['removed'],
+                         sorted([deleted_id, moved.id, reassigned.id]))
+        self.assertEqual(self.poll(cursor, other)['cards'][0]['id'], moved.id)
+
+    def test_client_too_far_behind_is_reset(self):
+        cursor = TaskEvent.latest_cursor()
+        for index in range(3):
+            self.make_task(title=f'Card {index}')
+        changes = board_changes(self.admin, self.board, cursor, limit=2)
+        self.assertEqual(changes, {
+            'cursor': TaskEvent.latest_cursor(), 'reset': True, 'cards': [],
+            'removed': [], 'totals': None})
+        self.assertFalse(board_changes(self.admin, self.board, cursor, limit=3)['reset'])
+
+    def test_pruned_cursor_is_reset(self):
+        self.make_task(title='Seen')
+        cursor = TaskEvent.latest_cursor()
+        self.make_task(title='Unseen')
+        TaskEvent.objects.filter(id__lte=cursor).delete()
+        changes = self.poll(cursor)
+        self.assertTrue(changes['reset'])
+        self.assertEqual(changes['cursor'], TaskEvent.latest_cursor())
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.client.get(self.url, {'board': self.board.id,
+                                                    'since': 'x'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url).status_code, 400)
+        delete_boards(Board.objects.filter(id=self.board.id))
+        self.assertEqual(self.client.get(self.url, {'board': self.board.id,
+                                                    'since': 0}).status_code, 404)
+
+
+class FakeBroker:
+    """Stands in for live.broker so a test decides when boards change"""
+
+    def __init__(self):
+        self.queues = {}
+
+    def subscribe(self, board_id):
+        self.queues[board_id] = asyncio.Queue()
+        return self.queues[board_id]
+
+    async def ready(self):
+        pass
+
+    def unsubscribe(self, board_id, queue):
+        del self.queues[board_id]
+
+
+class LiveStreamTests(TaskFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.broker = FakeBroker()
+        patcher = mock.patch('tasks.live.broker', self.broker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.rendered = []
+        self.payloads = []
+
+    def render(self, since):
+        self.rendered.append(since)
+        return self.payloads.pop(0)
+
+    def changes(self, cursor, cards=(), reset=False):
+        return {'cursor': cursor, 'reset': reset, 'cards': list(cards),
+                'removed': [], 'totals': None}
+
+    def notify(self, *event_ids):
+        for event_id in event_ids:
+            self.broker.queues[self.board.id].put_nowait(event_id)
+
+    def stream(self, since, scenario):
+        async def run():
+            stream = board_stream(self.board, since, self.render)
+            try:
+                return await scenario(stream)
+            finally:
+                await stream.aclose()
+        return asyncio.run(run())
+
+    def test_catch_up_then_one_message_per_burst_of_changes(self):
+        self.payloads = [self.changes(6, [{'id': 1}]), self.changes(8, [{'id': 2}])]
+
+        async def scenario(stream):
+            first = await anext(stream)
+            self.notify(7, 8)
+            return first, await anext(stream)
+
+        first, second = self.stream(5, scenario)
+        self.assertEqual(first, format_event('changes', self.changes(6, [{'id': 1}]), 6))
+        self.assertTrue(second.startswith('id: 8\nevent: changes\ndata: {'))
+        self.assertEqual(self.rendered, [5, 6])
+
+    def test_idle_stream_is_kept_alive(self):
+        self.payloads = [self.changes(5)]
+
+        async def scenario(stream):
+            return [await anext(stream), await anext(stream)]
+
+        with mock.patch('tasks.live.LIVE_KEEPALIVE_INTERVAL', 0.01):
+            messages = self.stream(5, scenario)
+        self.assertEqual(messages, [': connected\n\n', ': keep-alive\n\n'])
+
+    def test_reset_ends_the_stream(self):
+        self.payloads = [self.changes(5), self.changes(40, reset=True)]
+
+        async def scenario(stream):
+            await anext(stream)
+            self.notify(40)
+            return [message async for message in stream]
+
+        messages = self.stream(5, scenario)
+        self.assertEqual(messages, [format_event(
+            'changes', self.changes(40, reset=True), 40)])
+
+    def test_disconnect_unsubscribes(self):
+        self.payloads = [self.changes(5)]
+
+        async def scenario(stream):
+            await anext(stream)
+            self.assertIn(self.board.id, self.broker.queues)
+
+        self.stream(5, scenario)
+        self.assertEqual(self.broker.queues, {})
+
+    def test_view_without_live_updates_tells_the_client_to_poll(self):
+        self.client.force_login(self.admin)
+        url = reverse('board_events', args=[self.board.id])
+        with self.settings(LIVE_UPDATES=False):
+            self.assertEqual(self.client.get(url).status_code, 204)
+        with self.settings(LIVE_UPDATES=True):
+            response = self.client.get(url, HTTP_LAST_EVENT_ID='x')
+        self.assertEqual(response.status_code, 400)
+
+
+class TaskDependencyTests(TaskFixtureMixin, TestCase):
+    def test_cycle_check_ignores_a_stale_cached_graph(self):
+        first, second = self.make_task(title='First'), self.make_task(title='Second')
+        get_graph(self.project.id)
+        # Written by another process: this process's cache is not cleared
+        TaskDependency.objects.bulk_create(
+            [TaskDependency(task=second, depends_on=first)])
+        with self.assertRaises(ValidationError):
+            TaskDependency.objects.create(task=first, depends_on=second)
+        self.assertEqual(TaskDependency.objects.count(), 1)
+
+
+class DependencyCycleTests(TaskFixtureMixin, TestCase):
+    """Pages keep working when the stored dependencies contain a cycle"""
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.admin)
+        today = timezone.now().date()
+        self.first = self.make_task(
+            title='First', start_date=today, due_date=today + timedelta(days=2))
+        self.second = self.make_task(
+            title='Second', start_date=today, due_date=today + timedelta(days=2))
+        # Written around TaskDependency.save(), as legacy rows or imports are
+        TaskDependency.objects.bulk_create([
+            TaskDependency(task=self.first, depends_on=self.second),
+            TaskDependency(task=self.second, depends_on=self.first),
+        ])
+
+    def test_gantt_page_without_critical_path(self):
+        response = self.client.get(reverse('gantt', args=[self.project.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.context['schedule'])
+        self.assertContains(response, 'contain a cycle')
+
+    def test_gantt_data_without_critical_path(self):
+        today = timezone.now().date()
+        response = self.client.get(reverse('gantt_data', args=[self.project.id]), {
+            'from': today.isoformat(),
+            'to': (today + timedelta(days=7)).isoformat(),
+        })
+        self.assertEqual(response.status_code, 200)
+        columns = response.json()['columns']
+        self.assertEqual(columns['critical'], [False, False])
+        self.assertEqual(columns['slack'], [None, None])
+
+    def test_task_edit_skips_date_propagation(self):
+        due_date = timezone.now().date() + timedelta(days=5)
+        response = self.client.post(reverse('task_edit', args=[self.first.id]), {
+            'title': 'First', 'status': 'todo', 'priority': 'medium',
+            'start_date': self.first.start_date.isoformat(),
+            'due_date': due_date.isoformat(), 'progress': 0,
+        }, follow=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'were not rescheduled')
+        self.first.refresh_from_db()
+        self.assertEqual(self.first.due_date, due_date)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN output is SQLite specific')
+class QueryPlanTests(TestCase):
+    def test_hot_queries_use_indexes(self):
+        for name, sql, params in hot_queries():
+            with self.subTest(name):
+                details, scans = explain(sql, params)
+                self.assertEqual(scans, [], '\n'.join(details))
+
+
+class SearchTests(TaskFixtureMixin, TestCase):
+    def test_member_matches_outside_the_newest_window(self):
+        member = User.objects.create_user('member', 'member@example.com', 'password')
+        own = [self.make_task(title=f'Choir rehearsal {index}', assigned_to=member)
+               for index in range(2)]
+        for index in range(3):
+            self.make_task(title=f'Choir rehearsal admin {index}')
+
+        with mock.patch('tasks.search.SEARCH_RANK_WINDOW', 3):
+            results, _ = search_tasks(member, 'choir')
+        self.assertEqual({result['id'] for result in results},
+                         {task.id for task in own})
+
+    def search_all(self, text, limit):
+        found, cursor = [], None
+        while True:
+            results, cursor = search_tasks(self.admin, text, cursor, limit)
+            found += [result['id'] for result in results]
+            if cursor is None:
+                return found
+
+    def test_matches_older_than_the_window_are_reached(self):
+        tasks = [self.make_task(title=f'Choir rehearsal {index}') for index in range(5)]
+
+        with mock.patch('tasks.search.SEARCH_RANK_WINDOW', 3):
+            found = self.search_all('choir', limit=2)
+            # A match added while paging joins the ranked window without
+            # pushing an older one out of reach
+            results, cursor = search_tasks(self.admin, 'choir', limit=2)
+            latest = self.make_task(title='Choir rehearsal latest')
+            paged = [result['id'] for result in results]
+            while cursor:
+                results, cursor = search_tasks(self.admin, 'choir', cursor, limit=2)
+                paged += [result['id'] for result in results]
+
+        # The newest three ranked, then the older ones, newest first
+        self.assertEqual(sorted(found[:3]), [task.id for task in tasks[2:]])
+        self.assertEqual(found[3:], [tasks[1].id, tasks[0].id])
+        self.assertEqual(sorted(paged), sorted([*found, latest.id]))
+
+    def test_old_match_is_found_on_the_first_page_of_few_results(self):
+        old = self.make_task(title='Harvest supper')
+        for index in range(4):
+            self.make_task(title=f'Harvest supper volunteers {index}')
+
+        with mock.patch('tasks.search.SEARCH_RANK_WINDOW', 3):
+            results, cursor = search_tasks(self.admin, 'harvest')
+        self.assertIsNone(cursor)
+        self.assertEqual(results[-1]['id'], old.id)
+
+
+class NotModifiedTests(TaskFixtureMixin, TestCase):
+    """Unchanged pages are answered with 304 from a few version lookups"""
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.admin)
+        today = timezone.now().date()
+        for status, _ in Task.STATUS_CHOICES:
+            self.make_task(title=status, status=status, assigned_to=self.admin,
+                           start_date=today, due_date=today + timedelta(days=3))
+
+    def assertNotModified(self, url, queries):
+        # The first page view creates the notification counter row
+        self.client.get(url)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        with self.assertNumQueries(queries):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_kanban(self):
+        # session, user, board, newest event, notification counter
+        self.assertNotModified(reverse('kanban', args=[self.board.id]), 5)
+
+    def test_dashboard(self):
+        # session, user, newest event, projects, active users,
+        # notification counter
+        self.assertNotModified(reverse('dashboard'), 6)
+
+    def test_gantt(self):
+        # session, user, project, boards, newest event, dependencies,
+        # notification counter
+        self.assertNotModified(reverse('gantt', args=[self.project.id]), 7)
+
+    def test_change_invalidates_the_etag(self):
+        url = reverse('kanban', args=[self.board.id])
+        etag = self.client.get(url)['ETag']
+        self.make_task(title='New card')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_soft_deleted_board_gets_no_304(self):
+        url = reverse('kanban', args=[self.board.id])
+        self.client.get(url)
+        etag = self.client.get(url)['ETag']
+        delete_boards(Board.objects.filter(id=self.board.id))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 404)
+
+    def test_soft_deleted_board_leaves_the_dashboard(self):
+        url = reverse('dashboard')
+        self.make_task(title='Overdue card', assigned_to=self.admin,
+                       due_date=timezone.now().date() - timedelta(days=1))
+        self.client.get(url)
+        response = self.client.get(url)
+        self.assertContains(response, 'Overdue card')
+        delete_boards(Board.objects.filter(id=self.board.id))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'Overdue card')
+        self.assertEqual(response.context['overdue_task_count'], 0)
+
+    def test_soft_deleted_board_leaves_the_gantt_bounds(self):
+        url = reverse('gantt', args=[self.project.id])
+        today = timezone.now().date()
+        old = Board.objects.create(project=self.project, name='Old')
+        self.make_task(board=old, title='Last year', start_date=today - timedelta(days=400),
+                       due_date=today + timedelta(days=400))
+        self.client.get(url)
+        etag = self.client.get(url)['ETag']
+        delete_boards(Board.objects.filter(id=old.id))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['bounds'],
+                         {'first': today, 'last': today + timedelta(days=3)})
+
+    def test_soft_deleted_project_gets_no_304(self):
+        url = reverse('gantt', args=[self.project.id])
+        self.client.get(url)
+        etag = self.client.get(url)['ETag']
+        delete_projects(Project.objects.filter(id=self.project.id))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 404)
+
+
+class SparseOrderTests(TaskFixtureMixin, TestCase):
+    """A kanban move writes one row until its column runs out of gaps"""
+
+    def setUp(self):
+        super().setUp()
+        self.cards = [self.make_task(title=f'Card {index}', order=(index + 1) * ORDER_GAP)
+                      for index in range(20)]
+
+    def orders(self):
+        return dict(Task.objects.values_list('id', 'order'))
+
+    def move(self, task, after, status='todo'):
+        with CaptureQueriesContext(connection) as queries:
+            apply_moves(self.admin, [
+                {'task_id': task.id, 'status': status, 'after': after.id}])
+        # executemany is logged as 'N times: UPDATE ...'
+        return [query['sql'] for query in queries
+                if 'UPDATE "tasks"' in query['sql']]
+
+    def test_move_writes_one_row(self):
+        before = self.orders()
+        updates = self.move(self.cards[15], self.cards[2])
+        self.assertEqual(len(updates), 1)
+        changed = {task_id for task_id, order in self.orders().items()
+                   if before[task_id] != order}
+        self.assertEqual(changed, {self.cards[15].id})
+        column = list(Task.objects.filter(status='todo').order_by(*CARD_ORDERING)
+                      .values_list('id', flat=True))
+        self.assertEqual(column[3], self.cards[15].id)
+
+    def test_column_is_renumbered_once_the_gap_runs_out(self):
+        # Dropping cards into the same slot halves the gap each time
+        rows_written = []
+        for task in self.cards[8:]:
+            before = self.orders()
+            self.move(task, self.cards[0])
+            rows_written.append(sum(
+                before[task_id] != order for task_id, order in self.orders().items()))
+        # 1024 halves 10 times before the neighbours are adjacent
+        self.assertEqual(rows_written[:10], [1] * 10)
+        self.assertGreater(rows_written[10], 1)
+        self.assertEqual(rows_written[11], 1)
+        orders = sorted(Task.objects.values_list('order', flat=True))
+        self.assertEqual(len(set(orders)), 20)
+
+
+    def test_moves_in_a_large_column_within_budget(self):
+        board = Board.objects.create(project=self.project, name='Large')
+        Task.objects.bulk_create([
+            Task(board=board, title=f'Card {index}', created_by=self.admin,
+                 order=(index + 1) * ORDER_GAP)
+            for index in range(5000)])
+        cards = list(Task.objects.filter(board=board).order_by('order'))
+        picks = random.Random(5000)
+
+        # About 16 ms per move, one row each
+        started = time.perf_counter()
+        for _ in range(50):
+            task, after = picks.sample(cards, 2)
+            self.assertEqual(len(self.move(task, after)), 1)
+        self.assertLess(time.perf_counter() - started, 2.5)
+
+        # The eleventh drop into one slot renumbers the whole column
+        started = time.perf_counter()
+        for task in cards[-11:]:
+            self.move(task, cards[0])
+        self.assertLess(time.perf_counter() - started, 2)
+        orders = list(Task.objects.filter(board=board).order_by('order')
+                      .values_list('order', flat=True))
+        self.assertEqual(orders, [(index + 1) * ORDER_GAP for index in range(5000)])
+
+
+class ScheduleTests(TaskFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.today = timezone.now().date()
+        # first -> second -> third, two days each, plus a short side task
+        self.chain = []
+        for index in range(3):
+            start = self.today + timedelta(days=2 * index)
+            self.chain.append(self.make_task(
+                title=f'Step {index}', start_date=start,
+                due_date=start + timedelta(days=1)))
+        for before, after in zip(self.chain, self.chain[1:]):
+            TaskDependency.objects.create(task=after, depends_on=before)
+        self.side = self.make_task(
+            title='Side', start_date=self.today, due_date=self.today)
+        for backend in caches.all():
+            backend.clear()
+
+    def test_schedule_is_built_from_three_queries(self):
+        # task dates, graph tasks, graph edges
+        with self.assertNumQueries(3):
+            schedule = ProjectSchedule.load(self.project.id)
+        self.assertEqual(schedule.critical_path, [task.id for task in self.chain])
+        self.assertEqual(schedule.slack(self.side.id), 5)
+        self.assertEqual(schedule.project_end, self.today + timedelta(days=6))
+
+    def test_propagation_writes_dependents_in_one_update(self):
+        first = self.chain[0]
+        first.due_date += timedelta(days=3)
+        first.save()
+        with CaptureQueriesContext(connection) as queries:
+            moved = propagate_dates(first)
+        self.assertEqual(moved, 2)
+        updates = [query for query in queries
+                   if 'UPDATE "tasks"' in query['sql']]
+        self.assertEqual(len(updates), 1)
+        for index, task in enumerate(self.chain[1:], start=1):
+            task.refresh_from_db()
+            self.assertEqual(
+                task.start_date, self.today + timedelta(days=2 * index + 3))
+
+    def test_large_project_within_budget(self):
+        # 5,000 tasks and about 10,000 dependencies on earlier tasks
+        project = Project.objects.create(name='Campus build', created_by=self.admin)
+        board = Board.objects.create(project=project, name='Main')
+        Task.objects.bulk_create([
+            Task(board=board, title=f'Step {index}', created_by=self.admin,
+                 order=index, start_date=self.today + timedelta(days=index % 30),
+                 due_date=self.today + timedelta(days=index % 30 + 1))
+            for index in range(5000)])
+        ids = list(Task.objects.filter(board=board).order_by('id')
+                   .values_list('id', flat=True))
+        picks = random.Random(5000)
+        TaskDependency.objects.bulk_create([
+            TaskDependency(task_id=ids[index], depends_on_id=ids[earlier])
+            for index in range(2, 5000)
+            for earlier in picks.sample(range(index), 2)]
+            + [TaskDependency(task_id=ids[1], depends_on_id=ids[0])])
+
+        started = time.perf_counter()
+        with self.assertNumQueries(3):
+            schedule = ProjectSchedule.load(project.id)
+        self.assertLess(time.perf_counter() - started, 1)
+        self.assertTrue(schedule.critical_path)
+        self.assertEqual({schedule.slack(task_id) for task_id in schedule.critical_path},
+                         {0})
+
+        root = Task.objects.get(id=ids[0])
+        root.due_date += timedelta(days=60)
+        root.save()
+        started = time.perf_counter()
+        with CaptureQueriesContext(connection) as queries:
+            moved = propagate_dates(root)
+        self.assertLess(time.perf_counter() - started, 2)
+        self.assertGreater(moved, 4000)
+        self.assertEqual(Task.objects.filter(
+            board=board, start_date__gt=root.due_date).count(), moved)
+        # board, graph tasks and edges, rows and one UPDATE in a savepoint;
+        # the change feed rows are inserted in the backend's batch size
+        self.assertEqual(len([query for query in queries
+                              if 'task_events' not in query['sql']]), 7)
+
+    def in_other_process(self, change):
+        """Run change, then restore this process's cache as it was before"""
+        cache = caches['default']
+        keys = [graph_cache_key(self.project.id), schedule_cache_key(self.project.id)]
+        stale = cache.get_many(keys)
+        change()
+        cache.set_many(stale)
+
+    def test_cached_schedule_follows_changes_from_other_processes(self):
+        get_graph(self.project.id)
+        self.assertEqual(get_schedule(self.project.id).project_end,
+                         self.today + timedelta(days=6))
+
+        def stretch_side_task():
+            self.side.due_date = self.today + timedelta(days=10)
+            self.side.save()
+        self.in_other_process(stretch_side_task)
+        self.assertEqual(get_schedule(self.project.id).project_end,
+                         self.today + timedelta(days=11))
+        self.assertEqual(len(get_graph(self.project.id)), 4)
+
+    def test_propagation_after_a_dependency_was_archived_elsewhere(self):
+        first, second, third = self.chain
+        second.status = 'completed'
+        second.save()
+        get_graph(self.project.id)
+        get_schedule(self.project.id)
+        self.in_other_process(lambda: archive_batch([second.id]))
+
+        first.due_date += timedelta(days=3)
+        first.save()
+        self.assertEqual(propagate_dates(first), 0)
+
+    def test_propagation_skips_tasks_removed_after_the_graph_was_read(self):
+        first, second, third = self.chain
+        graph = DependencyGraph.load(self.project.id)
+        second.delete()
+        first.due_date += timedelta(days=3)
+        first.save()
+        with mock.patch.object(DependencyGraph, 'load', return_value=graph):
+            self.assertEqual(propagate_dates(first), 0)
+
+
+class CardCacheTests(TaskFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.admin)
+        self.url = reverse('kanban', args=[self.board.id])
+        self.cards = [self.make_task(title=f'Card {index}', assigned_to=self.admin)
+                      for index in range(5)]
+        self.fragments = caches['template_fragments']
+
+    def page(self):
+        # The Delete forms carry a fresh CSRF token on every request
+        return re.sub(r'name="csrfmiddlewaretoken" value="[^"]*"', '',
+                      self.client.get(self.url).content.decode())
+
+    def test_warm_render_matches_cold_render(self):
+        cold = self.page()
+        self.assertEqual(len(self.fragments._cache), len(self.cards))
+        self.assertEqual(self.page(), cold)
+        self.assertEqual(len(self.fragments._cache), len(self.cards))
+
+    def test_saving_a_task_retires_its_markup(self):
+        self.page()
+        card = self.cards[0]
+        card.title = 'Renamed card'
+        card.save()
+        page = self.page()
+        self.assertIn('Renamed card', page)
+        # Only the changed card was rendered again
+        self.assertEqual(len(self.fragments._cache), len(self.cards) + 1)
+
+
+    def test_warm_board_skips_card_rendering(self):
+        # Four full columns: the most cards a board page shows
+        Task.objects.bulk_create([
+            Task(board=self.board, title=f'{status} {index}', status=status,
+                 assigned_to=self.admin, created_by=self.admin,
+                 order=(index + 1) * ORDER_GAP)
+            for status, _ in Task.STATUS_CHOICES for index in range(CARDS_PER_COLUMN)])
+        rendered = []
+
+        def priority(task):
+            rendered.append(task.id)
+            return task.priority
+
+        with mock.patch.object(Task, 'get_priority_display', priority):
+            cold = self.page()
+            self.assertEqual(len(rendered), 4 * CARDS_PER_COLUMN)
+            rendered.clear()
+            started = time.perf_counter()
+            warm = self.page()
+            # About 40 ms here, half the cold render
+            self.assertLess(time.perf_counter() - started, 0.5)
+        self.assertEqual(rendered, [])
+        self.assertEqual(warm, cold)
+
+
+class FragmentTests(TaskFixtureMixin, TestCase):
+    """htmx fragments follow the data they show"""
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.admin)
+        # Creates the notification counter row
+        self.client.get(reverse('dashboard'))
+
+    def column(self, status):
+        return self.client.get(reverse('kanban_column', args=[self.board.id, status]))
+
+    def test_widget_answers_304_until_its_data_changes(self):
+        url = reverse('dashboard_widget', args=['overdue'])
+        response = self.client.get(url)
+        self.assertNotContains(response, 'Late card')
+        etag = response['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.make_task(title='Late card',
+                       due_date=timezone.now().date() - timedelta(days=1))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Late card')
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_each_widget_has_its_own_etag(self):
+        etags = {self.client.get(reverse('dashboard_widget', args=[widget]))['ETag']
+                 for widget in ('stats', 'overdue', 'recent')}
+        self.assertEqual(len(etags), 3)
+        self.assertEqual(self.client.get(
+            reverse('dashboard_widget', args=['calendar'])).status_code, 404)
+
+    def test_column_follows_moves_and_edits(self):
+        task = self.make_task(title='Rehearsal')
+        self.assertContains(self.column('todo'), 'Rehearsal')
+        apply_moves(self.admin, [{'task_id': task.id, 'status': 'waiting', 'after': None}])
+        self.assertNotContains(self.column('todo'), 'Rehearsal')
+        self.assertContains(self.column('waiting'), 'Rehearsal')
+
+        task.refresh_from_db()
+        task.title = 'Dress rehearsal'
+        task.save()
+        response = self.column('waiting')
+        self.assertContains(response, 'Dress rehearsal')
+        self.assertEqual(response.context['column']['total'], 1)
+
+    def test_column_is_one_query(self):
+        for index in range(60):
+            self.make_task(title=f'Card {index}')
+        # session, user, board and the column: no page header, no badges
+        with self.assertNumQueries(4):
+            response = self.column('todo')
+        self.assertEqual(len(response.context['column']['tasks']), CARDS_PER_COLUMN)
+        self.assertEqual(self.column('blocked').status_code, 404)
+
+
+class ImporterTests(TaskFixtureMixin, TestCase):
+    def run_import(self, text, fmt='csv', **options):
+        return TaskImporter(self.admin, **options).run(read_rows(io.StringIO(text), fmt))
+
+    def test_bad_rows_are_reported_and_skipped(self):
+        importer = self.run_import(
+            'Title,Board,Status,Progress,Start Date,Due Date\n'
+            'Print bulletins,Main,In Progress,50%,2026-03-01,2026-03-02\n'
+            ',Main,,,,\n'
+            'Stack chairs,Garage,,,,\n'
+            'Book hall,Main,someday,,,\n'
+            'Order flowers,Main,,150,,\n'
+            'Call caterer,Main,,,next week,\n'
+            'Tune piano,Main,,,2026-03-05,2026-03-01\n')
+        self.assertEqual(importer.created, 1)
+        self.assertEqual(importer.errors, [
+            (3, 'title is required'),
+            (4, 'unknown board "Garage"'),
+            (5, 'invalid status "someday"'),
+            (6, 'progress must be between 0 and 100'),
+            (7, 'start_date must be a YYYY-MM-DD date, got "next week"'),
+            (8, 'start date must be before due date'),
+        ])
+        task = Task.objects.get()
+        self.assertEqual((task.title, task.status, task.progress),
+                         ('Print bulletins', 'in_progress', 50))
+
+    def test_bad_json_lines_are_reported(self):
+        importer = self.run_import(
+            '{"title": "Print bulletins", "board": "Main"}\n'
+            '{"title": \n'
+            '\n'
+            '["Stack chairs", "Main"]\n', fmt='jsonl')
+        self.assertEqual(importer.created, 1)
+        self.assertEqual([line for line, _ in importer.errors], [2, 4])
+        self.assertEqual(importer.errors[1][1], 'Each line must be a JSON object')
+
+    def test_ambiguous_boards_and_users_are_rejected(self):
+        other = Project.objects.create(name='Youth', created_by=self.admin)
+        youth_main = Board.objects.create(project=other, name='Main')
+        for username in ('sam1', 'sam2'):
+            User.objects.create_user(username, f'{username}@example.com', 'password',
+                                     first_name='Sam', last_name='Lee')
+
+        importer = self.run_import(
+            'title,board,project,assigned_to\n'
+            'Ambiguous board,Main,,\n'
+            'Named project,Main,Youth,sam2\n'
+            'Compound name,Youth - Main,,\n'
+            'Ambiguous user,Main,Outreach,Sam Lee\n')
+        self.assertEqual(importer.errors, [
+            (2, 'board "Main" exists in several projects; add a project column'),
+            (5, 'assigned_to "Sam Lee" matches several users'),
+        ])
+        self.assertEqual(
+            list(Task.objects.order_by('id').values_list('board', 'assigned_to__username')),
+            [(youth_main.id, 'sam2'), (youth_main.id, None)])
+
+    def test_batches_do_the_bookkeeping_bulk_create_skips(self):
+        self.make_task(title='Existing')
+        cursor = TaskEvent.latest_cursor()
+        rows = ''.join(f'Card {index},Main,{self.admin.username}\n' for index in range(5))
+
+        with CaptureQueriesContext(connection) as queries:
+            importer = self.run_import('title,board,assigned_to\n' + rows, batch_size=2)
+        self.assertEqual(importer.created, 5)
+        inserts = [query for query in queries
+                   if query['sql'].startswith('INSERT INTO "tasks"')]
+        self.assertEqual(len(inserts), 3)
+
+        column = list(Task.objects.filter(status='todo').order_by(*CARD_ORDERING)
+                      .values_list('title', flat=True))
+        self.assertEqual(column, ['Existing', *(f'Card {index}' for index in range(5))])
+        self.assertEqual(TaskEvent.objects.filter(id__gt=cursor, action='created').count(), 5)
+        self.assertEqual(TaskCounter.status_totals('user', [self.admin.id])['todo'], 5)
+        before = TaskCounter.status_totals_by_scope('board')
+        TaskCounter.rebuild()
+        self.assertEqual(TaskCounter.status_totals_by_scope('board'), before)
+
+    def test_dry_run_only_validates(self):
+        importer = self.run_import('title,board\nCard,Main\nCard,Garage\n', dry_run=True)
+        self.assertEqual((importer.created, importer.error_count), (1, 1))
+        self.assertFalse(Task.objects.exists())
+
+
+class ArchiveTests(TaskFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.old = [self.make_task(title=f'Old {index}', status='completed',
+                                   assigned_to=self.admin) for index in range(3)]
+        self.recent = self.make_task(title='Recent', status='completed',
+                                     assigned_to=self.admin)
+        self.open = self.make_task(title='Open', assigned_to=self.admin)
+        TaskDependency.objects.create(task=self.open, depends_on=self.old[0])
+        Notification.objects.create(user=self.admin, type='completed', title='Done',
+                                    message='Old 0 is done', task=self.old[0])
+        Task.objects.exclude(id=self.recent.id).update(
+            updated_at=timezone.now() - timedelta(days=100))
+
+    def archive(self, *options):
+        out = io.StringIO()
+        call_command('archive_tasks', '--days', '90', *options, stdout=out)
+        return out.getvalue()
+
+    def test_dry_run_only_counts(self):
+        self.assertIn('3 tasks would be archived', self.archive('--dry-run'))
+        self.assertFalse(ArchivedTask.objects.exists())
+
+    def test_tasks_move_with_their_rows_and_bookkeeping(self):
+        cursor = TaskEvent.latest_cursor()
+        self.assertIn('Archived 3 tasks', self.archive('--batch-size', '2'))
+
+        old_ids = sorted(task.id for task in self.old)
+        self.assertEqual(sorted(ArchivedTask.objects.values_list('id', flat=True)), old_ids)
+        self.assertEqual(sorted(Task.objects.values_list('id', flat=True)),
+                         [self.recent.id, self.open.id])
+        self.assertEqual(list(ArchivedTaskDependency.objects.values_list(
+            'task_id', 'depends_on_id')), [(self.open.id, self.old[0].id)])
+        self.assertFalse(TaskDependency.objects.exists())
+        self.assertEqual(ArchivedNotification.objects.get().task_id, self.old[0].id)
+        self.assertEqual(NotificationCounter.objects.get(user=self.admin).unread, 0)
+
+        events = TaskEvent.objects.filter(id__gt=cursor)
+        self.assertEqual(sorted(events.values_list('board_id', 'task_id', 'action')),
+                         [(self.board.id, task_id, 'deleted') for task_id in old_ids])
+        self.assertEqual(TaskCounter.status_totals('user', [self.admin.id]),
+                         {'todo': 1, 'in_progress': 0, 'waiting': 0, 'completed': 1})
+        before = TaskCounter.status_totals_by_scope('project')
+        TaskCounter.rebuild()
+        self.assertEqual(TaskCounter.status_totals_by_scope('project'), before)
+
+    def test_task_reopened_before_its_batch_stays(self):
+        self.old[1].status = 'in_progress'
+        self.old[1].save()
+        self.assertEqual(archive_batch([task.id for task in self.old]), 2)
+        self.assertTrue(Task.objects.filter(id=self.old[1].id).exists())
+
+
+class RecurrenceTests(TaskFixtureMixin, TestCase):
+    def make_rule(self, frequency, starts_on):
+        return RecurringTask.objects.create(
+            board=self.board, title=f'{frequency} rule', frequency=frequency,
+            starts_on=starts_on, created_by=self.admin)
+
+    def test_past_start_is_not_backfilled(self):
+        today = timezone.now().date()
+        rule = self.make_rule('weekly', today - timedelta(days=7 * 100 + 3))
+        created = materialize(RecurringTask.objects.filter(pk=rule.pk))
+        dates = list(rule.occurrences.order_by('occurrence_date')
+                     .values_list('occurrence_date', flat=True))
+        self.assertEqual(len(dates), created)
+        self.assertEqual(dates[0], today + timedelta(days=4))
+        self.assertEqual(dates[-1], window_end() - timedelta(
+            days=(window_end() - dates[0]).days % 7))
+
+    def test_each_batch_is_committed_on_its_own(self):
+        today = timezone.now().date()
+        daily = self.make_rule('daily', today)
+        weekly = self.make_rule('weekly', today)
+        days = (window_end() - today).days + 1
+        batches = []
+
+        def write_batch(tasks, project_of):
+            # The innermost transaction around each batch
+            batches.append((len(tasks), connection.savepoint_ids[-1]))
+            return _write_batch(tasks, project_of)
 
-# Create your tests here.
+        with mock.patch('tasks.recurrence._write_batch', write_batch):
+            created = materialize(batch_size=10)
+        self.assertEqual(created, days + (days + 6) // 7)
+        sizes = [size for size, _ in batches]
+        full, rest = divmod(created, 10)
+        self.assertEqual(sizes, [10] * full + ([rest] if rest else []))
+        self.assertEqual(len({savepoint for _, savepoint in batches}), len(batches))
+        for rule in (daily, weekly):
+            rule.refresh_from_db()
+            self.assertEqual(rule.generated_until, window_end())
+        self.assertEqual(materialize(batch_size=10), 0)
@@ -4,14 +4,25 @@ from . import views, api
 urlpatterns = [
     path('', views.dashboard_view, name='dashboard'),
     path('dashboard/', views.dashboard_view, name='dashboard'),
+    path('dashboard/widgets/<str:widget>/',
+         views.dashboard_widget, name='dashboard_widget'),
     path('kanban/<int:board_id>/', views.kanban_view, name='kanban'),
+    path('kanban/<int:board_id>/column/<str:status>/',
+         views.kanban_column, name='kanban_column'),
     path('gantt/<int:project_id>/', views.gantt_view, name='gantt'),
+    path('search/', views.search_view, name='task_search'),
     path('task/create/<int:board_id>/', views.task_create, name='task_create'),
     path('task/<int:task_id>/edit/', views.task_edit, name='task_edit'),
     path('task/<int:task_id>/delete/', views.task_delete, name='task_delete'),
 
     # API endpoints
     path('api/task/status/', api.update_task_status, name='update_task_status'),
+    path('api/tasks/move/', api.move_tasks, name='move_tasks'),
+    path('api/changes/', api.task_changes, name='task_changes'),
+    path('api/boards/<int:board_id>/events/',
+         api.board_events, name='board_events'),
+    path('api/search/', api.search_tasks, name='search_tasks'),
+    path('api/gantt/<int:project_id>/', api.gantt_data, name='gantt_data'),
     path('api/task/<int:task_id>/progress/',
          api.update_task_progress, name='update_task_progress'),
 ]
@@ -1,112 +1,257 @@
 # tasks/views.py
+from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Count, Q
+from django.db.models import Count, Max, Min, Q
+from django.http import Http404, HttpResponseBadRequest
 from django.utils import timezone
-from .models import Task, Board
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+from . import etags
+from .graph import DependencyCycleError
+from .kanban import board_tasks_for, load_board, load_board_column, load_column
+from .models import RecurringTask, Task, TaskCounter, TaskEvent, Board
+from .recurrence import materialize, window_end
+from .scheduling import get_schedule, propagate_dates
 from projects.models import Project
-from notifications.models import Notification
+
+DASHBOARD_OVERDUE_LIMIT = 5
+DASHBOARD_RECENT_LIMIT = 10
 
 
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=etags.kanban_etag)
 def kanban_view(request, board_id):
-    board = get_object_or_404(Board, id=board_id)
-
-    if not request.user.is_admin() and board.project.created_by != request.user:
-        tasks = board.tasks.filter(assigned_to=request.user)
-    else:
-        tasks = board.tasks.all()
-
-    tasks_by_status = {
-        'todo': tasks.filter(status='todo'),
-        'in_progress': tasks.filter(status='in_progress'),
-        'waiting': tasks.filter(status='waiting'),
-        'completed': tasks.filter(status='completed'),
-    }
+    board = get_object_or_404(
+        Board.objects.live().select_related('project'), id=board_id)
+    tasks = board_tasks_for(request.user, board)
 
     context = {
         'board': board,
-        'tasks_by_status': tasks_by_status,
-        'statuses': Task.STATUS_CHOICES,
+        # Read before the cards so no change falls between the two
+        'change_cursor': TaskEvent.latest_cursor(),
+        'columns': load_board(tasks),
+        'live_updates': settings.LIVE_UPDATES,
     }
     return render(request, 'tasks/kanban.html', context)
 
 
 @login_required
-def dashboard_view(request):
-    from django.contrib.auth import get_user_model
-    User = get_user_model()
+def kanban_column(request, board_id, status):
+    """
+    Fragment for one kanban column: the whole column with its header, or
+    with ?after= the next page of its cards
+    """
+    board = get_object_or_404(
+        Board.objects.live().select_related('project'), id=board_id)
+    if status not in dict(Task.STATUS_CHOICES):
+        raise Http404('Unknown status')
+
+    tasks = board_tasks_for(request.user, board)
+    if 'after' not in request.GET:
+        context = {
+            'board': board,
+            'column': load_board_column(tasks, status),
+        }
+        return render(request, 'tasks/partials/kanban_column.html', context)
+
+    try:
+        cards, next_cursor = load_column(
+            tasks, status, after=request.GET.get('after'))
+    except ValueError:
+        return HttpResponseBadRequest('Invalid cursor')
+
+    context = {
+        'board': board,
+        'status': status,
+        'cards': cards,
+        'next_cursor': next_cursor,
+    }
+    return render(request, 'tasks/partials/kanban_cards.html', context)
 
-    if request.user.is_admin():
-        tasks = Task.objects.all()
-    else:
-        tasks = Task.objects.filter(assigned_to=request.user)
 
-    total_tasks = tasks.count()
-    completed_tasks = tasks.filter(status='completed').count()
-    overdue_tasks = tasks.filter(
+def _dashboard_tasks(user):
+    tasks = Task.objects.filter(
+        board__deleted_at__isnull=True, board__project__deleted_at__isnull=True)
+    if user.is_admin():
+        return tasks
+    return tasks.filter(assigned_to=user)
+
+
+def _overdue_filter():
+    return Q(
         due_date__lt=timezone.now().date(),
         status__in=['todo', 'in_progress', 'waiting']
     )
 
-    tasks_by_status = {
-        'todo': tasks.filter(status='todo').count(),
-        'in_progress': tasks.filter(status='in_progress').count(),
-        'waiting': tasks.filter(status='waiting').count(),
-        'completed': completed_tasks,
-    }
 
-    if request.user.is_admin():
-        users = User.objects.filter(is_active=True)
-        tasks_per_user = []
-        for user in users:
-            user_tasks = Task.objects.filter(assigned_to=user)
+def dashboard_stats_context(user):
+    """Status totals and charts, read from the maintained counter table"""
+    from django.contrib.auth import get_user_model
+    User = get_user_model()
+
+    # Status totals are O(1) lookups in the maintained counter table. The
+    # counters keep the tasks of deleted projects and boards until the
+    # purge has removed them, so those are subtracted.
+    pending = _pending_purge_tasks(user)
+    if user.is_admin():
+        tasks_by_status = TaskCounter.status_totals('project')
+    else:
+        tasks_by_status = TaskCounter.status_totals('user', [user.id])
+    for totals in pending.values():
+        _subtract(tasks_by_status, totals)
+    total_tasks = sum(tasks_by_status.values())
+    completed_tasks = tasks_by_status['completed']
+
+    tasks_per_user = []
+    if user.is_admin():
+        users = User.objects.filter(is_active=True).only(
+            'username', 'first_name', 'last_name').order_by('username')
+        user_totals = TaskCounter.status_totals_by_scope('user')
+        for member in users:
+            totals = user_totals.get(member.id, {})
+            if member.id in pending:
+                totals = _subtract(dict(totals), pending[member.id])
             tasks_per_user.append({
-                'user': user.get_full_name() or user.username,
-                'total': user_tasks.count(),
-                'completed': user_tasks.filter(status='completed').count(),
+                'user': member.get_full_name() or member.username,
+                'total': sum(totals.values()),
+                'completed': totals.get('completed', 0),
             })
-    else:
-        tasks_per_user = []
 
     completion_percentage = (
         completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
-    recent_tasks = tasks.order_by('-created_at')[:10]
-
-    context = {
+    return {
         'total_tasks': total_tasks,
         'tasks_by_status': tasks_by_status,
-        'overdue_tasks': overdue_tasks,
         'tasks_per_user': tasks_per_user,
         'completion_percentage': round(completion_percentage, 1),
-        'recent_tasks': recent_tasks,
-        'unread_count': Notification.get_unread_count(request.user),
-        'overdue_count': Notification.get_overdue_count(request.user),
+    }
+
+
+def _pending_purge_tasks(user):
+    """
+    Task counts per status of the deleted projects and boards that are
+    waiting for the purge, per assignee: {user_id: {status: count}}. Only
+    the user's own tasks unless they are an admin.
+    """
+    from projects.purge import pending_boards
+
+    board_ids = list(pending_boards().values_list('id', flat=True))
+    if not board_ids:
+        return {}
+    tasks = Task.objects.filter(board_id__in=board_ids)
+    if not user.is_admin():
+        tasks = tasks.filter(assigned_to=user)
+    pending = {}
+    for row in tasks.order_by().values('assigned_to_id', 'status').annotate(
+            count=Count('id')):
+        totals = pending.setdefault(row['assigned_to_id'], {})
+        totals[row['status']] = row['count']
+    return pending
+
+
+def _subtract(totals, pending):
+    for status, count in pending.items():
+        if status in totals:
+            totals[status] = max(totals[status] - count, 0)
+    return totals
+
+
+def dashboard_overdue_context(user):
+    overdue = _dashboard_tasks(user).filter(_overdue_filter())
+    return {
+        'overdue_tasks': overdue.select_related(
+            'board__project').order_by('due_date')[:DASHBOARD_OVERDUE_LIMIT],
+        'overdue_task_count': overdue.count(),
+    }
+
+
+def dashboard_recent_context(user):
+    return {
+        'recent_tasks': _dashboard_tasks(user).select_related(
+            'board__project', 'assigned_to'
+        ).order_by('-created_at')[:DASHBOARD_RECENT_LIMIT],
+    }
+
+
+@login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=etags.dashboard_etag)
+def dashboard_view(request):
+    context = {
+        **dashboard_stats_context(request.user),
+        **dashboard_overdue_context(request.user),
+        **dashboard_recent_context(request.user),
     }
     return render(request, 'tasks/dashboard.html', context)
 
 
+DASHBOARD_WIDGETS = {
+    'stats': (dashboard_stats_context, 'tasks/partials/dashboard_stats.html'),
+    'overdue': (dashboard_overdue_context, 'tasks/partials/dashboard_overdue.html'),
+    'recent': (dashboard_recent_context, 'tasks/partials/dashboard_recent.html'),
+}
+
+
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=etags.dashboard_widget_etag)
+def dashboard_widget(request, widget):
+    """Fragment with one dashboard widget, refreshed by htmx"""
+    if widget not in DASHBOARD_WIDGETS:
+        raise Http404('Unknown widget')
+    build_context, template = DASHBOARD_WIDGETS[widget]
+    return render(request, template, build_context(request.user))
+
+
+@login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=etags.gantt_etag)
 def gantt_view(request, project_id):
-    project = get_object_or_404(Project, id=project_id)
+    project = get_object_or_404(Project.objects.live(), id=project_id)
 
-    tasks = Task.objects.filter(
-        board__project=project,
+    # Rows are fetched window by window from api.gantt_data by gantt.js
+    bounds = Task.objects.filter(
+        board__in=Board.objects.live().filter(project=project),
         start_date__isnull=False,
         due_date__isnull=False
-    ).select_related('assigned_to', 'board')
+    ).aggregate(first=Min('start_date'), last=Max('due_date'))
 
     can_edit = request.user.is_admin() or project.created_by == request.user
 
     context = {
         'project': project,
-        'tasks': tasks,
+        'bounds': bounds,
         'can_edit': can_edit,
+        'schedule': get_schedule(project.id),
     }
     return render(request, 'tasks/gantt.html', context)
 
 
+@login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=etags.search_etag)
+def search_view(request):
+    """Full-text search over the tasks the user can see"""
+    from .search import search_tasks
+
+    query = request.GET.get('q', '').strip()
+    try:
+        results, next_cursor = search_tasks(
+            request.user, query, after=request.GET.get('cursor') or None)
+    except ValueError:
+        return HttpResponseBadRequest('Invalid cursor')
+
+    context = {
+        'query': query,
+        'results': results,
+        'next_cursor': next_cursor,
+    }
+    return render(request, 'tasks/search.html', context)
+
+
 @login_required
 def task_create(request, board_id):
     """Create new task"""
@@ -114,7 +259,7 @@ def task_create(request, board_id):
     from django.contrib.auth import get_user_model
     User = get_user_model()
 
-    board = get_object_or_404(Board, id=board_id)
+    board = get_object_or_404(Board.objects.live(), id=board_id)
 
     # Check permissions - admins, project creators, and team members can create tasks
     if not request.user.is_admin() and board.project.created_by != request.user and request.user not in board.project.members.all():
@@ -140,6 +285,7 @@ def task_create(request, board_id):
                         'users': users,
                         'priorities': Task.PRIORITY_CHOICES,
                         'statuses': Task.STATUS_CHOICES,
+                        'frequencies': RecurringTask.FREQUENCY_CHOICES,
                     }
                     return render(request, 'tasks/task_form.html', context)
             except ValueError:
@@ -150,9 +296,14 @@ def task_create(request, board_id):
                     'users': users,
                     'priorities': Task.PRIORITY_CHOICES,
                     'statuses': Task.STATUS_CHOICES,
+                    'frequencies': RecurringTask.FREQUENCY_CHOICES,
                 }
                 return render(request, 'tasks/task_form.html', context)
         
+        frequency = request.POST.get('frequency')
+        if frequency:
+            return _create_recurring_task(request, board, frequency)
+
         task = Task.objects.create(
             board=board,
             title=request.POST.get('title'),
@@ -183,10 +334,62 @@ def task_create(request, board_id):
         'users': users,
         'priorities': Task.PRIORITY_CHOICES,
         'statuses': Task.STATUS_CHOICES,
+        'frequencies': RecurringTask.FREQUENCY_CHOICES,
     }
     return render(request, 'tasks/task_form.html', context)
 
 
+def _create_recurring_task(request, board, frequency):
+    """Create a recurrence rule from the task form and its first occurrences"""
+    from datetime import datetime
+
+    def form_error(message):
+        messages.error(request, message)
+        return redirect('task_create', board_id=board.id)
+
+    due_date = request.POST.get('due_date')
+    if not due_date:
+        return form_error('A repeating task needs the due date of its first occurrence')
+    if frequency not in dict(RecurringTask.FREQUENCY_CHOICES):
+        return form_error('Invalid repeat frequency')
+    try:
+        due_dt = datetime.strptime(due_date, '%Y-%m-%d').date()
+        start_date = request.POST.get('start_date')
+        start_dt = (datetime.strptime(start_date, '%Y-%m-%d').date()
+                    if start_date else due_dt)
+        ends_on = request.POST.get('ends_on')
+        ends_dt = datetime.strptime(ends_on, '%Y-%m-%d').date() if ends_on else None
+        interval = int(request.POST.get('interval') or 1)
+    except ValueError:
+        return form_error('Invalid date or repeat interval')
+    if interval < 1:
+        return form_error('Repeat interval must be at least 1')
+    if ends_dt and ends_dt < due_dt:
+        return form_error('The repeat end date must be after the first due date')
+
+    rule = RecurringTask.objects.create(
+        board=board,
+        title=request.POST.get('title'),
+        description=request.POST.get('description', ''),
+        priority=request.POST.get('priority', 'medium'),
+        assigned_to_id=request.POST.get('assigned_to') or None,
+        frequency=frequency,
+        interval=interval,
+        starts_on=due_dt,
+        ends_on=ends_dt,
+        lead_days=(due_dt - start_dt).days,
+        created_by=request.user,
+    )
+    until = window_end()
+    created = materialize(RecurringTask.objects.filter(pk=rule.pk), until)
+
+    messages.success(
+        request, f'Recurring task created: {created} occurrence(s) scheduled '
+        f'through {until:%b %d, %Y}. Later ones are added as '
+        'their dates approach.')
+    return redirect('kanban', board_id=board.id)
+
+
 @login_required
 def task_edit(request, task_id):
     """Edit task"""
@@ -234,6 +437,8 @@ def task_edit(request, task_id):
                 }
                 return render(request, 'tasks/task_form.html', context)
         
+        old_dates = (str(task.start_date or ''), str(task.due_date or ''))
+
         task.title = request.POST.get('title')
         task.description = request.POST.get('description', '')
         task.notes = request.POST.get('notes', '')
@@ -246,6 +451,17 @@ def task_edit(request, task_id):
         task.save()
 
         messages.success(request, 'Task updated successfully!')
+        if old_dates != (start_date or '', due_date or ''):
+            try:
+                rescheduled = propagate_dates(task)
+            except DependencyCycleError:
+                messages.warning(
+                    request, 'Dependent tasks were not rescheduled: the '
+                    "project's task dependencies contain a cycle.")
+            else:
+                if rescheduled:
+                    messages.info(
+                        request, f'{rescheduled} dependent task(s) rescheduled.')
         return redirect('kanban', board_id=task.board.id)
 
     users = User.objects.filter(is_active=True)
@@ -3,6 +3,8 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
 from django.db.models import Q
+from django.http import HttpResponseBadRequest
+from church_task_manager.pagination import paginate
 from .models import Team, TeamMembership
 from accounts.models import User
 
@@ -23,6 +25,11 @@ def team_list(request):
             memberships__user=request.user,
             memberships__is_active=True
         ).distinct()
+
+    try:
+        teams = paginate(teams, ('name',), request.GET.get('cursor') or None)
+    except ValueError:
+        return HttpResponseBadRequest('Invalid cursor')
     
     context = {'teams': teams}
     return render(request, 'teams/team_list.html', context)